@@ -0,0 +1,261 @@
+# app/compressed_text.py
+import asyncio
+import logging
+import struct
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import LargeBinary, Text
+from sqlalchemy.orm import synonym
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.types import TypeDecorator
+
+from app.config import settings
+
+try:
+    import zstandard
+except ImportError:  # Без пакета тексты пишутся несжатыми, сжатые строки прочитать нельзя
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Формат значения в bytea. Байты 0xFE и 0xFF не встречаются в UTF-8,
+# поэтому строки без маркера - несжатый текст (короткие ответы и строки до сжатия)
+MARKER_PLAIN_ZSTD = b"\xfe"  # zstd без словаря
+MARKER_DICT_ZSTD = b"\xff"  # zstd со словарем: маркер + версия словаря (4 байта) + кадр
+_VERSION = struct.Struct(">I")
+
+
+class CompressedValue:
+    """Сжатое значение колонки, прочитанное из БД; распаковывается при первом обращении к атрибуту"""
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return f"<CompressedValue {len(self.data)} bytes>"
+
+
+class TextCodec:
+    """
+    Сжатие AI-текстов zstd со словарем, обученным на сохраненных ответах колонки
+    (scripts/text_dictionary.py). Словари версионируются в таблице text_dictionaries:
+    новые значения сжимаются последней версией словаря колонки, старые читаются той
+    версией, что записана в значении. Компрессоры не потокобезопасны - у каждого потока свои.
+    """
+
+    def __init__(self):
+        self._dictionaries: Dict[int, Any] = {}
+        self._active: Dict[str, int] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._warned_unavailable = False
+
+        self.compressed = 0
+        self.stored_plain = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+        self.compress_seconds = 0.0
+        self.decompressed = 0
+        self.decompress_seconds = 0.0
+
+    @property
+    def available(self) -> bool:
+        return zstandard is not None
+
+    def register(self, version: int, column_key: str, dictionary: bytes):
+        """Добавляет версию словаря; последняя по номеру версия колонки становится активной"""
+        if zstandard is None:
+            return
+        with self._lock:
+            self._dictionaries[version] = zstandard.ZstdCompressionDict(dictionary)
+            if version >= self._active.get(column_key, 0):
+                self._active[column_key] = version
+
+    def reload(self):
+        """Загружает словари из БД (при старте и при встрече незнакомой версии)"""
+        from app.crud import crud_text_dictionary
+        from app.database import run_in_session
+
+        for row in run_in_session(crud_text_dictionary.get_all):
+            if row.id not in self._dictionaries:
+                self.register(row.id, row.column_key, row.dictionary)
+
+    async def load(self):
+        """Загружает словари при старте приложения (если сжатие включено)"""
+        if not settings.AI_TEXT_COMPRESSION_ENABLED:
+            return
+        if zstandard is None:
+            logger.warning("Пакет zstandard не установлен, AI-тексты сохраняются без сжатия")
+            return
+        try:
+            await asyncio.to_thread(self.reload)
+        except Exception as e:
+            logger.warning(f"Сжатие текстов: не удалось загрузить словари из БД: {e}")
+            return
+        logger.info(f"Сжатие текстов: словарей загружено - {len(self._dictionaries)}, активные: {self._active}")
+
+    def _compressor(self, version: Optional[int], level: int):
+        cache = self._local.__dict__.setdefault("compressors", {})
+        key = (version, level)
+        if key not in cache:
+            dictionary = self._dictionaries.get(version) if version else None
+            cache[key] = zstandard.ZstdCompressor(level=level, dict_data=dictionary, write_dict_id=False)
+        return cache[key]
+
+    def _decompressor(self, version: Optional[int]):
+        cache = self._local.__dict__.setdefault("decompressors", {})
+        if version not in cache:
+            dictionary = None
+            if version:
+                dictionary = self._dictionaries.get(version)
+                if dictionary is None:
+                    # Словарь обучен после старта (другим процессом) - подгружаем из БД
+                    self.reload()
+                    dictionary = self._dictionaries.get(version)
+                if dictionary is None:
+                    raise ValueError(f"Неизвестная версия словаря сжатия: {version}")
+            cache[version] = zstandard.ZstdDecompressor(dict_data=dictionary)
+        return cache[version]
+
+    def compress(self, column_key: str, text: str, version: Optional[int] = None, level: Optional[int] = None) -> bytes:
+        """Текст -> значение bytea; version - явная версия словаря (0 - без словаря), иначе активная"""
+        raw = text.encode("utf-8")
+        self.raw_bytes += len(raw)
+        if zstandard is None or len(raw) < settings.AI_TEXT_COMPRESSION_MIN_BYTES:
+            if zstandard is None and not self._warned_unavailable:
+                self._warned_unavailable = True
+                logger.warning("Пакет zstandard не установлен, AI-тексты сохраняются без сжатия")
+            self.stored_plain += 1
+            self.stored_bytes += len(raw)
+            return raw
+
+        started_at = time.perf_counter()
+        if version is None:
+            version = self._active.get(column_key)
+        frame = self._compressor(version, level or settings.AI_TEXT_COMPRESSION_LEVEL).compress(raw)
+        value = MARKER_DICT_ZSTD + _VERSION.pack(version) + frame if version else MARKER_PLAIN_ZSTD + frame
+        self.compress_seconds += time.perf_counter() - started_at
+        self.compressed += 1
+        self.stored_bytes += len(value)
+        return value
+
+    def decompress(self, data: bytes) -> str:
+        """Значение bytea -> текст (понимает все три формата хранения)"""
+        marker = data[:1]
+        if marker not in (MARKER_PLAIN_ZSTD, MARKER_DICT_ZSTD):
+            return bytes(data).decode("utf-8")
+        if zstandard is None:
+            raise RuntimeError("Для чтения сжатых AI-текстов нужен пакет zstandard")
+        started_at = time.perf_counter()
+        version = value_version(data)
+        frame = data[1 + _VERSION.size:] if version else data[1:]
+        text = self._decompressor(version).decompress(frame).decode("utf-8")
+        self.decompress_seconds += time.perf_counter() - started_at
+        self.decompressed += 1
+        return text
+
+    def active_version(self, column_key: str) -> Optional[int]:
+        return self._active.get(column_key)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.AI_TEXT_COMPRESSION_ENABLED,
+            "zstandard_available": self.available,
+            "level": settings.AI_TEXT_COMPRESSION_LEVEL,
+            "dictionaries": len(self._dictionaries),
+            "active_versions": dict(self._active),
+            "compressed": self.compressed,
+            "stored_plain": self.stored_plain,
+            "raw_bytes": self.raw_bytes,
+            "stored_bytes": self.stored_bytes,
+            "ratio": round(self.raw_bytes / self.stored_bytes, 2) if self.stored_bytes else 0.0,
+            "avg_compress_us": round(self.compress_seconds / self.compressed * 1e6, 1) if self.compressed else 0.0,
+            "decompressed": self.decompressed,
+            "avg_decompress_us": round(self.decompress_seconds / self.decompressed * 1e6, 1) if self.decompressed else 0.0,
+        }
+
+
+def value_version(data: bytes) -> Optional[int]:
+    """Версия словаря в значении bytea: None - без словаря или без сжатия"""
+    if data[:1] != MARKER_DICT_ZSTD:
+        return None
+    return _VERSION.unpack_from(data, 1)[0]
+
+
+def as_text(value: Any) -> Any:
+    """Текст из значения сжатой колонки (для запросов отдельных колонок, минуя модель)"""
+    if isinstance(value, CompressedValue):
+        return text_codec.decompress(value.data)
+    return value
+
+
+class CompressedText(TypeDecorator):
+    """
+    Текстовая колонка со сжатием. При выключенном AI_TEXT_COMPRESSION_ENABLED - обычный Text.
+    При включенном - bytea: запись сжимает текст активным словарем колонки, чтение
+    возвращает CompressedValue без распаковки (распаковывает атрибут модели, см. compressed_synonym).
+    """
+    impl = Text
+    cache_ok = True
+
+    def __init__(self, column_key: str):
+        super().__init__()
+        self.column_key = column_key
+
+    def load_dialect_impl(self, dialect):
+        if settings.AI_TEXT_COMPRESSION_ENABLED:
+            return dialect.type_descriptor(LargeBinary())
+        return dialect.type_descriptor(Text())
+
+    def process_bind_param(self, value, dialect):
+        if value is None or not settings.AI_TEXT_COMPRESSION_ENABLED:
+            return value
+        if isinstance(value, CompressedValue):
+            return value.data
+        return text_codec.compress(self.column_key, value)
+
+    def process_result_value(self, value, dialect):
+        if value is None or isinstance(value, str):
+            return value
+        data = bytes(value)
+        if data[:1] in (MARKER_PLAIN_ZSTD, MARKER_DICT_ZSTD):
+            return CompressedValue(data)
+        return data.decode("utf-8")
+
+
+def compressed_synonym(column_attr: str):
+    """
+    Публичный атрибут модели для сжатой колонки: при первом чтении распаковывает
+    CompressedValue и кладет текст в загруженное состояние объекта (без пометки об изменении).
+    """
+    def getter(obj):
+        value = getattr(obj, column_attr)
+        if isinstance(value, CompressedValue):
+            value = text_codec.decompress(value.data)
+            set_committed_value(obj, column_attr, value)
+        return value
+
+    def setter(obj, value):
+        setattr(obj, column_attr, value)
+
+    return synonym(column_attr, descriptor=property(getter, setter))
+
+
+def compressed_columns(metadata) -> Dict[str, Tuple[Any, Any]]:
+    """Все сжатые колонки метаданных: column_key -> (таблица, колонка)"""
+    return {
+        column.type.column_key: (table, column)
+        for table in metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, CompressedText)
+    }
+
+
+# Общий кодек сжатых AI-текстов
+text_codec = TextCodec()
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     DATABASE_URL: str
@@ -7,20 +7,158 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     OPENROUTER_API_KEY: Optional[str] = None
+    # Адрес chat/completions (для замеров - локальная заглушка scripts/openrouter_stub.py)
+    OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1/chat/completions"
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
     TELEGRAM_BOT_TOKEN: Optional[str] = None
     TELEGRAM_BOT_USERNAME: Optional[str] = None  # ← ДОБАВЛЕНО
-    
+
+    # HTTP-клиент для OpenRouter (общий пул соединений)
+    AI_HTTP2_ENABLED: bool = True
+    AI_HTTP_MAX_CONNECTIONS: int = 20
+    AI_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    AI_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    AI_HTTP_CONNECT_TIMEOUT: float = 5.0
+    AI_HTTP_READ_TIMEOUT: float = 30.0
+    AI_HTTP_WRITE_TIMEOUT: float = 10.0
+    AI_HTTP_POOL_TIMEOUT: float = 5.0
+
+    # Кэш ответов AI (LRU в памяти + таблица ai_response_cache в Postgres)
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_DB_ENABLED: bool = True
+    AI_CACHE_TTL_SECONDS: int = 86400
+    AI_CACHE_MAX_ENTRIES: int = 1000
+    # Эндпоинты, для которых включен кэш (через запятую)
+    AI_CACHE_ENDPOINTS: str = "workout_plan,exercise_recommendations,weekly_challenge"
+
+    # Хеджирование: если модель не ответила за перцентиль задержки, параллельно запускаем следующую
+    AI_HEDGING_ENABLED: bool = True
+    AI_HEDGE_LATENCY_PERCENTILE: float = 0.95
+    AI_HEDGE_MIN_DELAY_SECONDS: float = 2.0
+    AI_HEDGE_DEFAULT_DELAY_SECONDS: float = 10.0
+    AI_HEDGE_MAX_CONCURRENT: int = 2
+    AI_HEDGE_LATENCY_WINDOW: int = 200
+
+    # Здоровье моделей и предохранители (closed/open/half-open)
+    AI_HEALTH_EWMA_ALPHA: float = 0.2
+    AI_HEALTH_DECAY_SECONDS: float = 300.0
+    AI_CIRCUIT_FAILURE_THRESHOLD: int = 3
+    AI_CIRCUIT_ERROR_RATE_THRESHOLD: float = 0.5
+    AI_CIRCUIT_OPEN_SECONDS: float = 30.0
+
+    # Фоновые AI-задачи (202 Accepted + GET /jobs/{id})
+    AI_JOB_BACKEND: str = "memory"  # memory - очередь в процессе, postgres - общая таблица ai_jobs
+    AI_JOB_WORKERS: int = 4
+    AI_JOB_QUEUE_SIZE: int = 100
+    AI_JOB_MAX_ATTEMPTS: int = 3
+    AI_JOB_RETRY_DELAY_SECONDS: float = 10.0
+    AI_JOB_TIMEOUT_SECONDS: float = 180.0
+    AI_JOB_POLL_INTERVAL_SECONDS: float = 1.0
+
+    # Дневной AI-бюджет, общий для всех воркеров (аренда частей бюджета в Postgres)
+    AI_BUDGET_BACKEND: str = "postgres"  # postgres - общий учет в ai_budget_days, memory - учет в процессе
+    AI_DAILY_BUDGET_RUB: float = 100.0
+    AI_BUDGET_LEASE_RUB: float = 2.0  # Сколько бюджета воркер резервирует за один запрос к БД
+    AI_BUDGET_LEASE_TTL_SECONDS: float = 120.0  # Аренда упавшего воркера перестает учитываться
+    AI_BUDGET_SETTLE_INTERVAL_SECONDS: float = 5.0
+    AI_USD_RUB_RATE: float = 90.0
+    # Переопределение цен: {"модель": [вход, выход]} в USD за 1M токенов
+    AI_MODEL_PRICES: Dict[str, List[float]] = {}
+
+    # Промпты: максимальная длина одного пользовательского поля (оценка в токенах)
+    AI_PROMPT_MAX_INPUT_TOKENS: int = 800
+
+    # Допуск запросов к OpenRouter: лимиты одновременных вызовов и очередь с приоритетами
+    AI_ADMISSION_MAX_CONCURRENT: int = 8
+    AI_ADMISSION_MODEL_MAX_CONCURRENT: int = 4
+    AI_ADMISSION_MODEL_LIMITS: Dict[str, int] = {}  # Переопределение лимита для отдельных моделей
+    AI_ADMISSION_QUEUE_SIZE: int = 50
+    AI_ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 20.0
+    AI_ADMISSION_BACKGROUND_QUEUE_TIMEOUT_SECONDS: float = 120.0
+
+    # Журнал AI-запросов (ai_interactions): фоновая пакетная запись
+    AI_LOG_ENABLED: bool = True
+    AI_LOG_QUEUE_SIZE: int = 5000
+    AI_LOG_BATCH_SIZE: int = 200
+    AI_LOG_FLUSH_INTERVAL_SECONDS: float = 2.0
+    AI_LOG_MAX_TEXT_CHARS: int = 8000
+
+    # Крайний срок AI-запроса на всю цепочку моделей: заголовок клиента или значение для маршрута.
+    # После истечения новые модели не запускаются - отвечаем офлайн-генератором
+    AI_DEADLINE_HEADER: str = "X-Request-Timeout"  # Секунды
+    AI_DEADLINE_SECONDS: float = 25.0
+    AI_DEADLINE_ROUTES: Dict[str, float] = {"/injury-predictions": 40.0, "/workout-plans/batch": 60.0}  # Префикс -> секунды
+    AI_DEADLINE_MAX_SECONDS: float = 120.0
+    AI_DEADLINE_MIN_ATTEMPT_SECONDS: float = 2.0  # Меньше этого остатка новую модель не запускаем
+
+    # Пакетная генерация планов ("сгенерировать неделю"): число планов и одновременных генераций
+    AI_BATCH_MAX_ITEMS: int = 7
+    AI_BATCH_CONCURRENCY: int = 3
+
+    # Предгенерация недельных испытаний в непиковые часы перед началом недели (часы - UTC)
+    AI_PREGEN_ENABLED: bool = True
+    AI_PREGEN_DAYS_AHEAD: int = 2  # За сколько дней до понедельника начинать
+    AI_PREGEN_WINDOW_START_HOUR: int = 0
+    AI_PREGEN_WINDOW_END_HOUR: int = 5
+    AI_PREGEN_REQUESTS_PER_MINUTE: float = 20.0
+    AI_PREGEN_ACTIVE_DAYS: int = 28  # Активный пользователь - создавал испытание за этот срок
+    AI_PREGEN_BATCH_SIZE: int = 100
+    AI_PREGEN_CHECK_INTERVAL_SECONDS: float = 600.0
+
+    # Семантический кэш рекомендаций: похожие описания ограничений (MinHash/LSH + сходство Жаккара)
+    AI_SEMANTIC_CACHE_ENABLED: bool = True
+    # Минимальное сходство для выдачи сохраненного ответа. Общий для всех пользователей -
+    # меняется только настройкой (низкий порог отдает чужие ответы на непохожие запросы)
+    AI_SEMANTIC_CACHE_THRESHOLD: float = 0.6
+    AI_SEMANTIC_CACHE_NUM_PERM: int = 64
+    AI_SEMANTIC_CACHE_BANDS: int = 16  # Больше полос - больше кандидатов при низком сходстве
+    AI_SEMANTIC_CACHE_MAX_ENTRIES: int = 5000  # Столько же последних рекомендаций загружается при старте
+
+    # Пул соединений к БД (на процесс; у приложения два движка - синхронный и async).
+    # Всего соединений до WEB_CONCURRENCY * 2 * (DB_POOL_SIZE + DB_MAX_OVERFLOW);
+    # DB_MAX_CONNECTIONS > 0 - бюджет соединений сервера, пулы урезаются под него
+    WEB_CONCURRENCY: int = 1  # Число воркеров uvicorn (та же переменная окружения, что читает uvicorn)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_MAX_CONNECTIONS: int = 0
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # Ожидание свободного соединения до ошибки
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Пересоздавать соединения старше (обрывы по простою у облачных БД)
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 0 - без ограничения
+    # Подключение через PgBouncer в режиме transaction: без своего пула (NullPool)
+    # и без именованных prepared statements у asyncpg. statement_timeout в этом режиме
+    # не передается при подключении - задать на роли: ALTER ROLE ... SET statement_timeout
+    DB_PGBOUNCER_MODE: bool = False
+
+    # Метрики пула соединений к БД: число последних замеров ожидания и удержания соединения
+    DB_POOL_METRICS_WINDOW: int = 1000
+
+    # Сжатие больших AI-текстов (планы, рекомендации, испытания, анализ риска): zstd со словарем,
+    # обученным на сохраненных ответах. Колонки хранятся как bytea - перед включением
+    # выполнить python -m scripts.text_dictionary migrate (перевод колонок и сжатие старых строк)
+    AI_TEXT_COMPRESSION_ENABLED: bool = False
+    AI_TEXT_COMPRESSION_LEVEL: int = 6
+    AI_TEXT_COMPRESSION_MIN_BYTES: int = 256  # Короткие тексты храним без сжатия
+    AI_TEXT_DICT_SIZE: int = 32 * 1024
+    AI_TEXT_DICT_SAMPLES: int = 2000  # Последних ответов на обучение словаря одной колонки
+
+    # Офлайн-генератор из каталога упражнений: ответ без OpenRouter, если нет ключа,
+    # исчерпан бюджет или все модели недоступны (иначе - демо-заглушка или сообщение о бюджете)
+    AI_OFFLINE_FALLBACK_ENABLED: bool = True
+
+    # Логирование: запись через очередь в отдельном потоке, JSON с request_id, ротация файла
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json - одна строка JSON на запись, text - человекочитаемый формат
+    LOG_FILE: Optional[str] = None  # Путь файла с ротацией; по умолчанию только stdout (Render собирает его сам)
+    LOG_FILE_MAX_BYTES: int = 10 * 1024 * 1024
+    LOG_FILE_BACKUP_COUNT: int = 5
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_LEVELS: Dict[str, str] = {"httpx": "WARNING"}  # Уровни отдельных логгеров
+    LOG_DEBUG_SAMPLE_RATE: float = 1.0  # Доля запросов, чьи DEBUG-трассы попадают в лог
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
 
 settings = Settings()
-
-# Добавьте для отладки
-print(f"=== CONFIG LOADED ===")
-print(f"Database URL: {settings.DATABASE_URL[:30]}...")
-print(f"Telegram Token: {settings.TELEGRAM_BOT_TOKEN[:10] if settings.TELEGRAM_BOT_TOKEN else 'NOT SET'}")
-print(f"Telegram Username: {settings.TELEGRAM_BOT_USERNAME}")
-print(f"=====================")
\ No newline at end of file
@@ -1,11 +1,16 @@
-from app.crud.crud_user import crud_user
-from app.crud.crud_anthropometrics import crud_anthropometrics
-from app.crud.crud_workout_plan import crud_workout_plan
-from app.crud.crud_exercise_recommendation import crud_exercise_recommendation
-from app.crud.crud_weekly_challenge import crud_weekly_challenge
-from app.crud.crud_workout_history import crud_workout_history
-from app.crud.crud_injury_prediction import crud_injury_prediction
-from app.crud.crud_ai_interaction import crud_ai_interaction
+from app.crud.crud_user import crud_user, async_crud_user
+from app.crud.crud_anthropometrics import crud_anthropometrics, async_crud_anthropometrics
+from app.crud.crud_workout_plan import crud_workout_plan, async_crud_workout_plan
+from app.crud.crud_exercise_recommendation import crud_exercise_recommendation, async_crud_exercise_recommendation
+from app.crud.crud_weekly_challenge import crud_weekly_challenge, async_crud_weekly_challenge
+from app.crud.crud_workout_history import crud_workout_history, async_crud_workout_history
+from app.crud.crud_injury_prediction import crud_injury_prediction, async_crud_injury_prediction
+from app.crud.crud_ai_interaction import crud_ai_interaction, async_crud_ai_interaction
+from app.crud.crud_ai_response_cache import crud_ai_response_cache, async_crud_ai_response_cache
+from app.crud.crud_ai_job import crud_ai_job, async_crud_ai_job
+from app.crud.crud_ai_budget import crud_ai_budget, async_crud_ai_budget
+from app.crud.crud_text_dictionary import crud_text_dictionary, async_crud_text_dictionary
+from app.crud.async_crud import AsyncCRUD
 
 __all__ = [
     "crud_user",
@@ -15,5 +20,22 @@ __all__ = [
     "crud_weekly_challenge",
     "crud_workout_history",
     "crud_injury_prediction",
-    "crud_ai_interaction"
+    "crud_ai_interaction",
+    "crud_ai_response_cache",
+    "crud_ai_job",
+    "crud_ai_budget",
+    "crud_text_dictionary",
+    "AsyncCRUD",
+    "async_crud_user",
+    "async_crud_anthropometrics",
+    "async_crud_workout_plan",
+    "async_crud_exercise_recommendation",
+    "async_crud_weekly_challenge",
+    "async_crud_workout_history",
+    "async_crud_injury_prediction",
+    "async_crud_ai_interaction",
+    "async_crud_ai_response_cache",
+    "async_crud_ai_job",
+    "async_crud_ai_budget",
+    "async_crud_text_dictionary"
 ]
\ No newline at end of file
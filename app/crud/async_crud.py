@@ -0,0 +1,32 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Callable, Dict
+
+class AsyncCRUD:
+    """
+    Асинхронный вариант CRUD-класса: те же методы и аргументы, но первым аргументом
+    AsyncSession, а результат нужно ожидать (await). Метод синхронного CRUD выполняется
+    через AsyncSession.run_sync: запросы идут через asyncpg и не блокируют event loop,
+    а логика запросов остается в одном месте - в синхронном классе.
+    """
+
+    def __init__(self, crud):
+        self._crud = crud
+        self._methods: Dict[str, Callable] = {}
+
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = self._methods.get(name)
+        if method is None:
+            sync_method = getattr(self._crud, name)
+
+            async def method(db: AsyncSession, *args, **kwargs) -> Any:
+                return await db.run_sync(sync_method, *args, **kwargs)
+
+            method.__name__ = name
+            method.__doc__ = sync_method.__doc__
+            self._methods[name] = method
+        return method
+
+    def __repr__(self):
+        return f"AsyncCRUD({type(self._crud).__name__})"
@@ -0,0 +1,93 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from app.crud.async_crud import AsyncCRUD
+from app.models.ai_budget import AIBudgetDay, AIBudgetLease
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+class CRUDAIBudget:
+    def _lock_day(self, db: Session, day: date, default_budget: float) -> AIBudgetDay:
+        """Создает строку дня при необходимости и блокирует ее до конца транзакции"""
+        db.execute(
+            insert(AIBudgetDay)
+            .values(day=day, budget_rub=default_budget, spent_rub=0.0)
+            .on_conflict_do_nothing(index_elements=[AIBudgetDay.day])
+        )
+        return db.query(AIBudgetDay).filter(AIBudgetDay.day == day).with_for_update().one()
+    
+    def get_day(self, db: Session, day: date) -> Optional[AIBudgetDay]:
+        return db.query(AIBudgetDay).filter(AIBudgetDay.day == day).first()
+    
+    def get_reserved(self, db: Session, day: date, lease_ttl_seconds: float) -> float:
+        """Сумма активных аренд за день (аренды без продления дольше TTL не учитываются)"""
+        cutoff = datetime.utcnow() - timedelta(seconds=lease_ttl_seconds)
+        return db.query(func.coalesce(func.sum(AIBudgetLease.reserved_rub), 0.0)).filter(
+            AIBudgetLease.day == day,
+            AIBudgetLease.renewed_at >= cutoff
+        ).scalar()
+    
+    def acquire_lease(self, db: Session, day: date, holder: str, amount: float,
+                      default_budget: float, lease_ttl_seconds: float) -> float:
+        """
+        Атомарно резервирует до amount руб. дневного бюджета за воркером holder.
+        Строка дня блокируется (FOR UPDATE), поэтому одновременные воркеры
+        не могут зарезервировать больше остатка. Возвращает выделенную сумму.
+        """
+        budget_day = self._lock_day(db, day, default_budget)
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=lease_ttl_seconds)
+        reserved_by_others = db.query(func.coalesce(func.sum(AIBudgetLease.reserved_rub), 0.0)).filter(
+            AIBudgetLease.day == day,
+            AIBudgetLease.holder != holder,
+            AIBudgetLease.renewed_at >= cutoff
+        ).scalar()
+        
+        lease = db.query(AIBudgetLease).filter(
+            AIBudgetLease.day == day,
+            AIBudgetLease.holder == holder
+        ).first()
+        if lease is None:
+            lease = AIBudgetLease(day=day, holder=holder, reserved_rub=0.0, renewed_at=now)
+            db.add(lease)
+        
+        available = budget_day.budget_rub - budget_day.spent_rub - reserved_by_others - lease.reserved_rub
+        granted = max(0.0, min(amount, available))
+        lease.reserved_rub += granted
+        lease.renewed_at = now
+        db.commit()
+        return granted
+    
+    def settle(self, db: Session, day: date, holder: str, spent: float,
+               default_budget: float, release: bool = False) -> AIBudgetDay:
+        """
+        Списывает фактические расходы воркера с его аренды в итог дня и продлевает аренду.
+        release=True - возвращает остаток аренды в общий бюджет (остановка воркера, смена дня).
+        """
+        budget_day = self._lock_day(db, day, default_budget)
+        budget_day.spent_rub += spent
+        lease = db.query(AIBudgetLease).filter(
+            AIBudgetLease.day == day,
+            AIBudgetLease.holder == holder
+        ).first()
+        if lease is not None:
+            if release:
+                db.delete(lease)
+            else:
+                lease.reserved_rub = max(0.0, lease.reserved_rub - spent)
+                lease.renewed_at = datetime.utcnow()
+        db.commit()
+        db.refresh(budget_day)
+        return budget_day
+    
+    def set_budget(self, db: Session, day: date, budget_rub: float) -> AIBudgetDay:
+        budget_day = self._lock_day(db, day, budget_rub)
+        budget_day.budget_rub = budget_rub
+        db.commit()
+        db.refresh(budget_day)
+        return budget_day
+
+crud_ai_budget = CRUDAIBudget()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_ai_budget = AsyncCRUD(crud_ai_budget)
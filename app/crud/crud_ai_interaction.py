@@ -1,4 +1,7 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from app.crud.async_crud import AsyncCRUD
+from app.pagination import Cursor, keyset_page
 from app.models.ai_interaction import AIInteraction
 from app.schemas.ai_interaction import AIInteractionCreate
 from typing import Optional, List
@@ -7,8 +10,11 @@ class CRUDAIInteraction:
     def get_by_id(self, db: Session, interaction_id: int) -> Optional[AIInteraction]:
         return db.query(AIInteraction).filter(AIInteraction.id == interaction_id).first()
     
-    def get_by_user_id(self, db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[AIInteraction]:
-        return db.query(AIInteraction).filter(AIInteraction.user_id == user_id).offset(skip).limit(limit).all()
+    def get_by_user_id(
+        self, db: Session, user_id: int, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None
+    ) -> List[AIInteraction]:
+        query = db.query(AIInteraction).filter(AIInteraction.user_id == user_id)
+        return keyset_page(query, AIInteraction.created_at, AIInteraction.id, after, skip, limit)
     
     def get_by_type(self, db: Session, interaction_type: str, skip: int = 0, limit: int = 100) -> List[AIInteraction]:
         return db.query(AIInteraction).filter(AIInteraction.interaction_type == interaction_type).offset(skip).limit(limit).all()
@@ -23,6 +29,13 @@ class CRUDAIInteraction:
         db.refresh(db_interaction)
         return db_interaction
     
+    def create_many(self, db: Session, interactions: List[dict]) -> None:
+        """Пакетная вставка журнала одним INSERT (без загрузки объектов обратно)"""
+        if not interactions:
+            return
+        db.execute(insert(AIInteraction), interactions)
+        db.commit()
+    
     def delete(self, db: Session, interaction_id: int) -> bool:
         db_interaction = self.get_by_id(db, interaction_id)
         if db_interaction:
@@ -31,4 +44,7 @@ class CRUDAIInteraction:
             return True
         return False
 
-crud_ai_interaction = CRUDAIInteraction()
\ No newline at end of file
+crud_ai_interaction = CRUDAIInteraction()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_ai_interaction = AsyncCRUD(crud_ai_interaction)
\ No newline at end of file
@@ -0,0 +1,74 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, func, or_
+from app.crud.async_crud import AsyncCRUD
+from app.models.ai_job import AIJob
+from datetime import timedelta
+from typing import Optional
+
+class CRUDAIJob:
+    def get_by_id(self, db: Session, job_id: str) -> Optional[AIJob]:
+        return db.query(AIJob).filter(AIJob.id == job_id).first()
+    
+    def create(self, db: Session, job_data: dict) -> AIJob:
+        db_job = AIJob(**job_data)
+        db.add(db_job)
+        db.commit()
+        db.refresh(db_job)
+        return db_job
+    
+    def claim_next(self, db: Session, worker_id: str, stale_after_seconds: float) -> Optional[AIJob]:
+        """
+        Забирает следующую задачу из очереди.
+        FOR UPDATE SKIP LOCKED позволяет нескольким экземплярам приложения
+        разбирать одну таблицу без блокировок друг друга.
+        Задачи, зависшие в статусе running (упал воркер), тоже забираются повторно.
+        Все времена задач - по часам БД (now()), как и server_default колонок:
+        TIMESTAMP без зоны, и время приложения в UTC разошлось бы с ним на сдвиг зоны сервера.
+        """
+        stale_cutoff = func.now() - timedelta(seconds=stale_after_seconds)
+        db_job = db.query(AIJob).filter(
+            or_(
+                and_(AIJob.status == "queued", AIJob.run_after <= func.now()),
+                and_(AIJob.status == "running", AIJob.locked_at < stale_cutoff)
+            )
+        ).order_by(AIJob.created_at).with_for_update(skip_locked=True).first()
+        
+        if db_job:
+            db_job.status = "running"
+            db_job.attempts += 1
+            db_job.locked_by = worker_id
+            db_job.locked_at = func.now()
+            db.commit()
+            db.refresh(db_job)
+        return db_job
+    
+    def mark_succeeded(self, db: Session, job_id: str, result_id: Optional[int]) -> Optional[AIJob]:
+        db_job = self.get_by_id(db, job_id)
+        if db_job:
+            db_job.status = "succeeded"
+            db_job.result_id = result_id
+            db_job.error = None
+            db_job.finished_at = func.now()
+            db.commit()
+        return db_job
+    
+    def mark_failed(self, db: Session, job_id: str, error: str, retry_delay_seconds: float) -> Optional[AIJob]:
+        """Возвращает задачу в очередь с задержкой или переводит в dead после исчерпания попыток"""
+        db_job = self.get_by_id(db, job_id)
+        if db_job:
+            db_job.error = error
+            db_job.locked_by = None
+            db_job.locked_at = None
+            if db_job.attempts >= db_job.max_attempts:
+                db_job.status = "dead"
+                db_job.finished_at = func.now()
+            else:
+                db_job.status = "queued"
+                db_job.run_after = func.now() + timedelta(seconds=retry_delay_seconds)
+            db.commit()
+        return db_job
+
+crud_ai_job = CRUDAIJob()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_ai_job = AsyncCRUD(crud_ai_job)
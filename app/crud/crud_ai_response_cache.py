@@ -0,0 +1,55 @@
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects.postgresql import insert
+from app.crud.async_crud import AsyncCRUD
+from app.models.ai_response_cache import AIResponseCache
+from datetime import datetime
+from typing import Optional
+
+class CRUDAIResponseCache:
+    def get_valid(self, db: Session, cache_key: str) -> Optional[AIResponseCache]:
+        """Возвращает непросроченную запись кэша и увеличивает счетчик попаданий"""
+        entry = db.query(AIResponseCache).filter(
+            AIResponseCache.cache_key == cache_key,
+            AIResponseCache.expires_at > datetime.utcnow()
+        ).first()
+        if entry:
+            entry.hit_count = (entry.hit_count or 0) + 1
+            db.commit()
+        return entry
+    
+    def upsert(self, db: Session, cache_key: str, endpoint: Optional[str], model_used: str,
+               response: str, expires_at: datetime) -> None:
+        """Сохраняет ответ в кэш (перезаписывает существующую запись)"""
+        stmt = insert(AIResponseCache).values(
+            cache_key=cache_key,
+            endpoint=endpoint,
+            model_used=model_used,
+            response=response,
+            hit_count=0,
+            created_at=datetime.utcnow(),
+            expires_at=expires_at
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AIResponseCache.cache_key],
+            set_={
+                "model_used": stmt.excluded.model_used,
+                "response": stmt.excluded.response,
+                "created_at": stmt.excluded.created_at,
+                "expires_at": stmt.excluded.expires_at,
+            }
+        )
+        db.execute(stmt)
+        db.commit()
+    
+    def delete_expired(self, db: Session) -> int:
+        """Удаляет просроченные записи. Возвращает количество удалённых записей."""
+        count = db.query(AIResponseCache).filter(
+            AIResponseCache.expires_at <= datetime.utcnow()
+        ).delete(synchronize_session=False)
+        db.commit()
+        return count
+
+crud_ai_response_cache = CRUDAIResponseCache()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_ai_response_cache = AsyncCRUD(crud_ai_response_cache)
@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from app.crud.async_crud import AsyncCRUD
 from app.models.user_anthropometrics import UserAnthropometrics
 from app.schemas.anthropometrics import AnthropometricsCreate, AnthropometricsUpdate
 from typing import Optional, List
@@ -50,4 +51,7 @@ class CRUDAnthropometrics:
             return True
         return False
 
-crud_anthropometrics = CRUDAnthropometrics()
\ No newline at end of file
+crud_anthropometrics = CRUDAnthropometrics()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_anthropometrics = AsyncCRUD(crud_anthropometrics)
\ No newline at end of file
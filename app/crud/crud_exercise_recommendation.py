@@ -1,18 +1,39 @@
 from sqlalchemy.orm import Session
+from app.crud.async_crud import AsyncCRUD
+from app.pagination import Cursor, keyset_page
 from app.models.exercise_recommendation import ExerciseRecommendation
+from app.compressed_text import as_text
 from app.schemas.exercise_recommendation import ExerciseRecommendationCreate
-from typing import Optional, List
+from typing import Iterable, Optional, List, Tuple
 
 class CRUDExerciseRecommendation:
     def get_by_id(self, db: Session, recommendation_id: int) -> Optional[ExerciseRecommendation]:
         return db.query(ExerciseRecommendation).filter(ExerciseRecommendation.id == recommendation_id).first()
     
-    def get_by_user_id(self, db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[ExerciseRecommendation]:
-        return db.query(ExerciseRecommendation).filter(ExerciseRecommendation.user_id == user_id).offset(skip).limit(limit).all()
+    def get_by_user_id(
+        self, db: Session, user_id: int, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None
+    ) -> List[ExerciseRecommendation]:
+        query = db.query(ExerciseRecommendation).filter(ExerciseRecommendation.user_id == user_id)
+        return keyset_page(query, ExerciseRecommendation.created_at, ExerciseRecommendation.id, after, skip, limit)
     
     def get_all(self, db: Session, skip: int = 0, limit: int = 100) -> List[ExerciseRecommendation]:
         return db.query(ExerciseRecommendation).offset(skip).limit(limit).all()
     
+    def get_recent_for_index(self, db: Session, limit: int, exclude_sources: Iterable[str] = ()) -> List[Tuple[str, str, str]]:
+        """
+        Последние рекомендации (тип, описание, ответ) для семантического кэша, от новых к старым.
+        Только строки с известным источником ответа не из exclude_sources (старые строки без model_used пропускаются).
+        """
+        rows = db.query(
+            ExerciseRecommendation.limitations_type,
+            ExerciseRecommendation.user_limitations,
+            ExerciseRecommendation.ai_recommended_exercises
+        ).filter(
+            ExerciseRecommendation.model_used.isnot(None),
+            ExerciseRecommendation.model_used.notin_(list(exclude_sources))
+        ).order_by(ExerciseRecommendation.id.desc()).limit(limit).all()
+        return [(limitations_type, user_limitations, as_text(response)) for limitations_type, user_limitations, response in rows]
+    
     def create(self, db: Session, recommendation_data:  ExerciseRecommendationCreate) -> ExerciseRecommendation:
         db_recommendation = ExerciseRecommendation(**recommendation_data)
         db.add(db_recommendation)
@@ -36,4 +57,7 @@ class CRUDExerciseRecommendation:
             return True
         return False
 
-crud_exercise_recommendation = CRUDExerciseRecommendation()
\ No newline at end of file
+crud_exercise_recommendation = CRUDExerciseRecommendation()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_exercise_recommendation = AsyncCRUD(crud_exercise_recommendation)
\ No newline at end of file
@@ -1,4 +1,6 @@
 from sqlalchemy.orm import Session
+from app.crud.async_crud import AsyncCRUD
+from app.pagination import Cursor, keyset_page
 from app.models.injury_prediction import InjuryPrediction
 from app.schemas.injury_prediction import InjuryPredictionCreate
 from typing import Optional, List
@@ -7,8 +9,11 @@ class CRUDInjuryPrediction:
     def get_by_id(self, db: Session, prediction_id: int) -> Optional[InjuryPrediction]:
         return db.query(InjuryPrediction).filter(InjuryPrediction.id == prediction_id).first()
     
-    def get_by_user_id(self, db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[InjuryPrediction]:
-        return db.query(InjuryPrediction).filter(InjuryPrediction.user_id == user_id).offset(skip).limit(limit).all()
+    def get_by_user_id(
+        self, db: Session, user_id: int, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None
+    ) -> List[InjuryPrediction]:
+        query = db.query(InjuryPrediction).filter(InjuryPrediction.user_id == user_id)
+        return keyset_page(query, InjuryPrediction.created_at, InjuryPrediction.id, after, skip, limit)
     
     def get_by_plan_id(self, db: Session, plan_id: int) -> List[InjuryPrediction]:
         return db.query(InjuryPrediction).filter(InjuryPrediction.workout_plan_id == plan_id).all()
@@ -39,4 +44,7 @@ class CRUDInjuryPrediction:
             return True
         return False
 
-crud_injury_prediction = CRUDInjuryPrediction()
\ No newline at end of file
+crud_injury_prediction = CRUDInjuryPrediction()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_injury_prediction = AsyncCRUD(crud_injury_prediction)
\ No newline at end of file
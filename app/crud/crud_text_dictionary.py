@@ -0,0 +1,21 @@
+from sqlalchemy.orm import Session
+from app.crud.async_crud import AsyncCRUD
+from app.models.text_dictionary import TextDictionary
+from typing import List
+
+class CRUDTextDictionary:
+    def get_all(self, db: Session) -> List[TextDictionary]:
+        """Все версии словарей, от старых к новым (последняя версия колонки - активная)"""
+        return db.query(TextDictionary).order_by(TextDictionary.id).all()
+    
+    def create(self, db: Session, dictionary_data: dict) -> TextDictionary:
+        db_dictionary = TextDictionary(**dictionary_data)
+        db.add(db_dictionary)
+        db.commit()
+        db.refresh(db_dictionary)
+        return db_dictionary
+
+crud_text_dictionary = CRUDTextDictionary()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_text_dictionary = AsyncCRUD(crud_text_dictionary)
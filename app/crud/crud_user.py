@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from app.crud.async_crud import AsyncCRUD
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.security import get_password_hash
@@ -57,4 +58,7 @@ class CRUDUser:
             return True
         return False
 
-crud_user = CRUDUser()
\ No newline at end of file
+crud_user = CRUDUser()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_user = AsyncCRUD(crud_user)
\ No newline at end of file
@@ -1,25 +1,85 @@
 # app/crud/crud_weekly_challenge.py
-from sqlalchemy.orm import Session
+from datetime import datetime
+from sqlalchemy.orm import Session, aliased
+from app.crud.async_crud import AsyncCRUD
+from app.pagination import Cursor, keyset_page
 from app.models.weekly_challenge import WeeklyChallenge
-from sqlalchemy import func
+from sqlalchemy import func, exists
 # --- ИЗМЕНЕНО: Убираем WeeklyChallengeCreate из импорта, так как create теперь принимает dict ---
 # from app.schemas.weekly_challenge import WeeklyChallengeCreate, WeeklyChallengeUpdate
 from app.schemas.weekly_challenge import WeeklyChallengeUpdate # <-- WeeklyChallengeUpdate всё ещё нужен
 # --- /ИЗМЕНЕНО ---
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 class CRUDWeeklyChallenge:
     def get_by_id(self, db: Session, challenge_id: int) -> Optional[WeeklyChallenge]:
         return db.query(WeeklyChallenge).filter(WeeklyChallenge.id == challenge_id).first()
     
-    def get_by_user_id(self, db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[WeeklyChallenge]:
-        return db.query(WeeklyChallenge).filter(WeeklyChallenge.user_id == user_id).offset(skip).limit(limit).all()
+    def get_by_user_id(
+        self, db: Session, user_id: int, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None
+    ) -> List[WeeklyChallenge]:
+        query = db.query(WeeklyChallenge).filter(WeeklyChallenge.user_id == user_id)
+        return keyset_page(query, WeeklyChallenge.created_at, WeeklyChallenge.id, after, skip, limit)
     
-    def get_current_week(self, db: Session, user_id: int, week_number: int) -> Optional[WeeklyChallenge]:
+    def get_current_week(
+        self, db: Session, user_id: int, week_number: int, created_since: datetime
+    ) -> Optional[WeeklyChallenge]:
+        """
+        Последнее испытание пользователя на неделю week_number. week_number - номер недели ISO
+        без года, поэтому испытания той же недели прошлых лет отсекаются по created_since.
+        """
         return db.query(WeeklyChallenge).filter(
             WeeklyChallenge.user_id == user_id,
-            WeeklyChallenge.week_number == week_number
-        ).first()
+            WeeklyChallenge.week_number == week_number,
+            WeeklyChallenge.created_at >= created_since
+        ).order_by(WeeklyChallenge.created_at.desc(), WeeklyChallenge.id.desc()).first()
+    
+    def get_pregeneration_candidates(
+        self,
+        db: Session,
+        week_number: int,
+        created_since: datetime,
+        active_since: datetime,
+        after_user_id: int = 0,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Пользователи с испытанием, созданным не раньше active_since, у которых еще нет испытания
+        на неделю week_number (созданного не раньше created_since): последний тип и цели каждого (по возрастанию user_id, начиная после after_user_id).
+        """
+        existing = aliased(WeeklyChallenge)
+        rows = db.query(
+            WeeklyChallenge.user_id,
+            WeeklyChallenge.challenge_type,
+            WeeklyChallenge.target_metrics
+        ).filter(
+            WeeklyChallenge.user_id > after_user_id,
+            WeeklyChallenge.created_at >= active_since,
+            ~exists().where(
+                existing.user_id == WeeklyChallenge.user_id,
+                existing.week_number == week_number,
+                existing.created_at >= created_since
+            )
+        ).distinct(WeeklyChallenge.user_id).order_by(
+            WeeklyChallenge.user_id, WeeklyChallenge.id.desc()
+        ).limit(limit).all()
+        return [
+            {"user_id": user_id, "challenge_type": challenge_type, "target_metrics": target_metrics}
+            for user_id, challenge_type, target_metrics in rows
+        ]
+    
+    def create_if_absent(self, db: Session, challenge_dict: dict, created_since: datetime) -> Optional[WeeklyChallenge]:
+        """
+        Создает испытание, только если у пользователя еще нет испытания на эту неделю
+        (созданного не раньше created_since, см. get_current_week).
+        Транзакционная advisory-блокировка по пользователю не дает двум экземплярам
+        приложения одновременно вставить испытание на одну неделю. None - испытание уже есть.
+        """
+        db.execute(func.pg_advisory_xact_lock(func.hashtext(WeeklyChallenge.__tablename__), challenge_dict["user_id"]).select())
+        if self.get_current_week(db, challenge_dict["user_id"], challenge_dict["week_number"], created_since) is not None:
+            db.rollback()
+            return None
+        return self.create(db, challenge_dict)
     
     def get_all(self, db: Session, skip: int = 0, limit: int = 100) -> List[WeeklyChallenge]:
         return db.query(WeeklyChallenge).offset(skip).limit(limit).all()
@@ -76,4 +136,7 @@ class CRUDWeeklyChallenge:
             db.refresh(db_challenge)
         return db_challenge
 
-crud_weekly_challenge = CRUDWeeklyChallenge()
\ No newline at end of file
+crud_weekly_challenge = CRUDWeeklyChallenge()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_weekly_challenge = AsyncCRUD(crud_weekly_challenge)
\ No newline at end of file
@@ -1,4 +1,6 @@
 from sqlalchemy.orm import Session
+from app.crud.async_crud import AsyncCRUD
+from app.pagination import Cursor, keyset_page
 from app.models.workout_history import WorkoutHistory
 from app.schemas.workout_history import WorkoutHistoryCreate
 from typing import Optional, List, Union, Dict, Any
@@ -7,11 +9,11 @@ class CRUDWorkoutHistory:
     def get_by_id(self, db: Session, history_id: int) -> Optional[WorkoutHistory]:
         return db.query(WorkoutHistory).filter(WorkoutHistory.id == history_id).first()
     
-    def get_by_user_id(self, db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[WorkoutHistory]:
-        return db.query(WorkoutHistory)\
-            .filter(WorkoutHistory.user_id == user_id)\
-            .order_by(WorkoutHistory.completed_at.desc())\
-            .offset(skip).limit(limit).all()
+    def get_by_user_id(
+        self, db: Session, user_id: int, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None
+    ) -> List[WorkoutHistory]:
+        query = db.query(WorkoutHistory).filter(WorkoutHistory.user_id == user_id)
+        return keyset_page(query, WorkoutHistory.completed_at, WorkoutHistory.id, after, skip, limit)
     
     def get_by_plan_id(self, db: Session, plan_id: int) -> List[WorkoutHistory]:
         return db.query(WorkoutHistory).filter(WorkoutHistory.plan_id == plan_id).all()
@@ -48,4 +50,7 @@ class CRUDWorkoutHistory:
         db.commit()
         return count
 
-crud_workout_history = CRUDWorkoutHistory()
\ No newline at end of file
+crud_workout_history = CRUDWorkoutHistory()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_workout_history = AsyncCRUD(crud_workout_history)
\ No newline at end of file
@@ -1,14 +1,20 @@
 from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from app.crud.async_crud import AsyncCRUD
+from app.pagination import Cursor, keyset_page
 from app.models.workout_plan import WorkoutPlan
 
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 class CRUDWorkoutPlan:
     def get_by_id(self, db: Session, plan_id: int) -> Optional[WorkoutPlan]:
         return db.query(WorkoutPlan).filter(WorkoutPlan.id == plan_id).first()
     
-    def get_by_user_id(self, db: Session, user_id: int, skip: int = 0, limit: int = 100) -> List[WorkoutPlan]:
-        return db.query(WorkoutPlan).filter(WorkoutPlan.user_id == user_id).offset(skip).limit(limit).all()
+    def get_by_user_id(
+        self, db: Session, user_id: int, skip: int = 0, limit: int = 100, after: Optional[Cursor] = None
+    ) -> List[WorkoutPlan]:
+        query = db.query(WorkoutPlan).filter(WorkoutPlan.user_id == user_id)
+        return keyset_page(query, WorkoutPlan.created_at, WorkoutPlan.id, after, skip, limit)
     
     def get_all(self, db: Session, skip: int = 0, limit: int = 100) -> List[WorkoutPlan]:
         return db.query(WorkoutPlan).offset(skip).limit(limit).all()
@@ -25,6 +31,22 @@ class CRUDWorkoutPlan:
         db.refresh(db_plan)
         return db_plan
     
+    def create_many(self, db: Session, plans: List[dict]) -> List[Dict[str, Any]]:
+        """
+        Пакетная вставка планов одним INSERT ... RETURNING в одной транзакции.
+        Возвращает словари со всеми колонками в порядке plans (читаются и после commit).
+        Вставка идет по таблице: ключи plans - имена колонок, тексты из plans отдаются
+        как есть, без распаковки сжатой колонки из RETURNING.
+        """
+        if not plans:
+            return []
+        rows = db.execute(
+            insert(WorkoutPlan.__table__).returning(*WorkoutPlan.__table__.c, sort_by_parameter_order=True),
+            plans
+        ).all()
+        db.commit()
+        return [{**row._mapping, **plan} for row, plan in zip(rows, plans)]
+    
     def mark_completed(self, db: Session, plan_id: int) -> Optional[WorkoutPlan]:
         db_plan = self.get_by_id(db, plan_id)
         if db_plan:
@@ -41,4 +63,7 @@ class CRUDWorkoutPlan:
             return True
         return False
 
-crud_workout_plan = CRUDWorkoutPlan()
\ No newline at end of file
+crud_workout_plan = CRUDWorkoutPlan()
+
+# Асинхронный вариант для async-маршрутов (AsyncSession)
+async_crud_workout_plan = AsyncCRUD(crud_workout_plan)
\ No newline at end of file
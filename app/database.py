@@ -1,16 +1,127 @@
+from typing import Any, Dict, Tuple
+from uuid import uuid4
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from app.config import settings
+from app.pool_metrics import TimedQueuePool, TimedAsyncAdaptedQueuePool, instrument_engine
+
+
+def pool_sizing() -> Tuple[int, int]:
+    """Размер пула и overflow одного движка с учетом числа воркеров и DB_MAX_CONNECTIONS"""
+    pool_size, max_overflow = settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    if settings.DB_MAX_CONNECTIONS > 0:
+        # Бюджет соединений сервера делится между воркерами и двумя движками (sync + async)
+        per_engine = max(1, settings.DB_MAX_CONNECTIONS // (max(1, settings.WEB_CONCURRENCY) * 2))
+        pool_size = min(pool_size, per_engine)
+        max_overflow = max(0, min(max_overflow, per_engine - pool_size))
+    return pool_size, max_overflow
+
+
+def pool_options(poolclass) -> Dict[str, Any]:
+    """Параметры пула движка из настроек DB_POOL_* (в режиме PgBouncer - без своего пула)"""
+    if settings.DB_PGBOUNCER_MODE:
+        # Соединения пулит PgBouncer: процесс держит соединение только пока оно взято сессией
+        return {"poolclass": NullPool}
+    pool_size, max_overflow = pool_sizing()
+    return {
+        "poolclass": poolclass,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
 
-engine = create_engine(settings.DATABASE_URL)
+
+def sync_connect_args(url: str) -> Dict[str, Any]:
+    """Параметры подключения psycopg2: statement_timeout передается при подключении"""
+    if make_url(url).get_backend_name() != "postgresql":
+        return {}
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0 and not settings.DB_PGBOUNCER_MODE:
+        return {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return {}
+
+
+engine = create_engine(
+    settings.DATABASE_URL,
+    connect_args=sync_connect_args(settings.DATABASE_URL),
+    pool_logging_name="sync",
+    **pool_options(TimedQueuePool),
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+
+def async_database_url(url: str):
+    """Адрес для asyncpg из DATABASE_URL (postgresql:// или postgresql+psycopg2://) и параметры подключения"""
+    parsed = make_url(url)
+    connect_args = {}
+    if parsed.get_backend_name() == "postgresql":
+        # asyncpg не понимает sslmode в строке подключения - режим передается параметром ssl
+        sslmode = parsed.query.get("sslmode")
+        if sslmode:
+            parsed = parsed.difference_update_query(["sslmode"])
+            connect_args["ssl"] = sslmode
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+        if settings.DB_PGBOUNCER_MODE:
+            # PgBouncer (transaction) отдает каждую транзакцию любому серверному соединению:
+            # кэши prepared statements asyncpg и SQLAlchemy выключены, имена запросов уникальны
+            connect_args["statement_cache_size"] = 0
+            connect_args["prepared_statement_cache_size"] = 0
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+        elif settings.DB_STATEMENT_TIMEOUT_MS > 0:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    return parsed, connect_args
+
+
+# Асинхронный движок (asyncpg) для async-маршрутов: запросы к БД не блокируют event loop.
+# Работает рядом с синхронным движком, пока маршруты переводятся по одному
+_async_url, _async_connect_args = async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    _async_url,
+    connect_args=_async_connect_args,
+    pool_logging_name="async",
+    **pool_options(TimedAsyncAdaptedQueuePool),
+)
+# expire_on_commit=False: после commit атрибуты не перечитываются неявным запросом вне await
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Ожидание свободного соединения и время удержания - GET /ai/db-pool
+instrument_engine(engine, "sync")
+instrument_engine(async_engine, "async")
+
 # Dependency для получения сессии БД
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency для async-маршрутов. Сессия берет соединение из пула только при первом запросе
+# и держит его до commit/rollback; перед долгим ожиданием (генерация AI) - release_connection
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def release_connection(db: AsyncSession):
+    """
+    Возвращает соединение сессии в пул: завершает текущую транзакцию (только чтение до AI-вызова).
+    Загруженные объекты остаются доступны (expire_on_commit=False),
+    следующий запрос сессии - итоговая запись - возьмет соединение заново.
+    """
+    if db.in_transaction():
+        await db.commit()
+
+def run_in_session(func, *args, **kwargs):
+    """Выполняет func(db, ...) в отдельной сессии (фоновые задачи, потоковые ответы)"""
+    db = SessionLocal()
+    try:
+        return func(db, *args, **kwargs)
+    finally:
+        db.close()
@@ -0,0 +1,168 @@
+# app/logging_config.py
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.engine import make_url
+
+from app.config import settings
+
+# Идентификатор текущего запроса (middleware в main.py, воркеры задач - id задачи)
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+# Атрибуты LogRecord, которые не являются пользовательскими полями extra=...
+_RESERVED_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Добавляет request_id в запись; выполняется в потоке/задаче, где вызван логгер"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Пропускает только долю DEBUG-записей (LOG_DEBUG_SAMPLE_RATE).
+    Решение принимается по request_id, поэтому трасса запроса сохраняется целиком или не сохраняется вовсе.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            keep = zlib.crc32(request_id.encode()) % 10000 < self.rate * 10000
+        else:
+            keep = random.random() < self.rate
+        if not keep:
+            self.sampled_out += 1
+        return keep
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler с ограниченной очередью: при переполнении запись отбрасывается, а не блокирует цикл событий"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _build_handlers() -> List[logging.Handler]:
+    if settings.LOG_FORMAT == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s")
+
+    handlers: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if settings.LOG_FILE:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            settings.LOG_FILE,
+            maxBytes=settings.LOG_FILE_MAX_BYTES,
+            backupCount=settings.LOG_FILE_BACKUP_COUNT,
+            encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def setup_logging():
+    """
+    Настраивает логирование всего приложения (один раз, при импорте main).
+    Логгеры только кладут записи в очередь; форматирование и запись в stdout/файл
+    выполняет QueueListener в отдельном потоке.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(RequestContextFilter())
+    _queue_handler.addFilter(DebugSamplingFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in settings.LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, *_build_handlers(), respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    logging.getLogger(__name__).info(
+        "Конфигурация загружена",
+        extra={
+            "database_url": make_url(settings.DATABASE_URL).render_as_string(hide_password=True),
+            "telegram_token_set": bool(settings.TELEGRAM_BOT_TOKEN),
+            "telegram_username": settings.TELEGRAM_BOT_USERNAME,
+        }
+    )
+
+
+def shutdown_logging():
+    """Дописывает очередь и останавливает поток записи (при остановке приложения)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logging_statistics() -> Dict[str, Any]:
+    """Состояние очереди логов"""
+    if _queue_handler is None:
+        return {"enabled": False}
+    sampling = next(f for f in _queue_handler.filters if isinstance(f, DebugSamplingFilter))
+    return {
+        "enabled": True,
+        "queued": _queue_handler.queue.qsize(),
+        "queue_size": settings.LOG_QUEUE_SIZE,
+        "dropped": _queue_handler.dropped,
+        "debug_sampled_out": sampling.sampled_out,
+    }
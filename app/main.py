@@ -1,16 +1,59 @@
-from fastapi import FastAPI
+import uuid
+from contextlib import asynccontextmanager
+from app.logging_config import setup_logging, shutdown_logging, request_id_var, get_logging_statistics
+
+# Логирование настраиваем до импорта роутеров и сервисов
+setup_logging()
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import users, auth, workout_plans, exercise_recommendations, weekly_challenges, workout_history, injury_predictions
-from app.database import engine
-from app.models import user, user_anthropometrics, workout_plan, exercise_recommendation, weekly_challenge, workout_history as workout_history_model, injury_prediction, ai_interaction
+from app.routers import users, auth, workout_plans, exercise_recommendations, weekly_challenges, workout_history, injury_predictions, ai, jobs
+from app.database import async_engine
+from app.services.http_client import ai_http_client
+from app.services.jobs import job_manager
+from app.services.budget_ledger import budget_ledger
+from app.services.admission import AdmissionRejected
+from app.services.deadline import deadline_seconds_for, set_deadline, ai_deadline
+from app.config import settings
+from app.pagination import NEXT_CURSOR_HEADER
+from app.services.interaction_log import interaction_log
+from app.services.semantic_cache import semantic_cache
+from app.compressed_text import text_codec
+from app.services.challenge_pregeneration import challenge_pregenerator
+from app.models import user, user_anthropometrics, workout_plan, exercise_recommendation, weekly_challenge, workout_history as workout_history_model, injury_prediction, ai_interaction, ai_response_cache, ai_job, ai_budget, text_dictionary
+
+# Схема БД создается миграциями Alembic (migrations/): alembic upgrade head перед запуском
 
-# Создаем таблицы в БД
-user.Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Общий пул соединений к OpenRouter живет все время работы приложения
+    await ai_http_client.start()
+    # Воркеры фоновых AI-задач
+    await job_manager.start()
+    # Словари сжатия AI-текстов
+    await text_codec.load()
+    # Индекс семантического кэша из последних рекомендаций
+    await semantic_cache.load()
+    # Предгенерация недельных испытаний в непиковые часы
+    await challenge_pregenerator.start()
+    yield
+    await challenge_pregenerator.stop()
+    await job_manager.stop()
+    # Списываем накопленные расходы и сдаем аренду AI-бюджета
+    await budget_ledger.close()
+    # Дописываем буфер журнала AI-запросов
+    await interaction_log.close()
+    await ai_http_client.close()
+    await async_engine.dispose()
+    # Дописываем очередь логов
+    shutdown_logging()
 
 app = FastAPI(
     title="Fitness App API", 
     description="API для фитнес-приложения с ИИ",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # ============ ОБНОВЛЕННЫЕ CORS НАСТРОЙКИ ============
@@ -40,10 +83,42 @@ app.add_middleware(
     allow_credentials=True, 
     allow_methods=["*"],
     allow_headers=["*"],
-    expose_headers=["*"],  # Добавьте эту строку!
+    # С allow_credentials браузер не считает "*" шаблоном - заголовки перечисляются явно
+    expose_headers=["X-Request-ID", "Retry-After", NEXT_CURSOR_HEADER],
 )
 # ===================================================
 
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    # Идентификатор запроса попадает во все записи лога, сделанные при его обработке
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex[:16]
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+@app.middleware("http")
+async def request_deadline_middleware(request: Request, call_next):
+    # Крайний срок ответа: AI-запросы внутри обработчика получают только оставшееся время
+    seconds = deadline_seconds_for(request.url.path, request.headers.get(settings.AI_DEADLINE_HEADER))
+    token = set_deadline(seconds)
+    try:
+        return await call_next(request)
+    finally:
+        ai_deadline.reset(token)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    # Перегрузка AI: быстрый отказ вместо ожидания, клиент повторит через Retry-After
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Подключаем роутеры
 app.include_router(auth.router, prefix="/auth", tags=["authentication"])
 app.include_router(users.router, prefix="/users", tags=["users"])
@@ -52,6 +127,8 @@ app.include_router(exercise_recommendations.router, prefix="/exercise-recommenda
 app.include_router(weekly_challenges.router, prefix="/weekly-challenges", tags=["weekly-challenges"])
 app.include_router(workout_history.router, prefix="/workout-history", tags=["workout-history"])
 app.include_router(injury_predictions.router, prefix="/injury-predictions", tags=["injury-predictions"])
+app.include_router(ai.router, prefix="/ai", tags=["ai"])
+app.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
 
 @app.get("/")
 async def root():
@@ -59,4 +136,4 @@ async def root():
 
 @app.get("/health") 
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy", "logging": get_logging_statistics()}
\ No newline at end of file
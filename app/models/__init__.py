@@ -6,6 +6,10 @@ from app.models.weekly_challenge import WeeklyChallenge
 from app.models.workout_history import WorkoutHistory
 from app.models.injury_prediction import InjuryPrediction
 from app.models.ai_interaction import AIInteraction
+from app.models.ai_response_cache import AIResponseCache
+from app.models.ai_job import AIJob
+from app.models.ai_budget import AIBudgetDay, AIBudgetLease
+from app.models.text_dictionary import TextDictionary
 
 __all__ = [
     "User",
@@ -15,5 +19,10 @@ __all__ = [
     "WeeklyChallenge",
     "WorkoutHistory",
     "InjuryPrediction",
-    "AIInteraction"
+    "AIInteraction",
+    "AIResponseCache",
+    "AIJob",
+    "AIBudgetDay",
+    "AIBudgetLease",
+    "TextDictionary"
 ]
\ No newline at end of file
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Float, String, Date, TIMESTAMP, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AIBudgetDay(Base):
+    __tablename__ = "ai_budget_days"
+
+    day = Column(Date, primary_key=True)
+    budget_rub = Column(Float, nullable=False)
+    spent_rub = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+
+class AIBudgetLease(Base):
+    __tablename__ = "ai_budget_leases"
+
+    day = Column(Date, ForeignKey("ai_budget_days.day", ondelete="CASCADE"), primary_key=True)
+    holder = Column(String(100), primary_key=True)
+    reserved_rub = Column(Float, nullable=False, default=0.0)
+    renewed_at = Column(TIMESTAMP, nullable=False)
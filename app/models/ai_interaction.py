@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, Text, TIMESTAMP, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -14,6 +14,10 @@ class AIInteraction(Base):
     ai_response = Column(Text, nullable=False)
     model_used = Column(String(100), nullable=False)
     tokens_used = Column(Integer)
+    latency_ms = Column(Integer)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+    # Списки пользователя от новых к старым (постраничная выдача по курсору, app/pagination.py)
+    __table_args__ = (Index("ix_ai_interactions_user_created_at_id", user_id, created_at.desc(), id.desc()),)
+
     user = relationship("User")
\ No newline at end of file
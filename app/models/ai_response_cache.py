@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AIResponseCache(Base):
+    __tablename__ = "ai_response_cache"
+
+    cache_key = Column(String(64), primary_key=True)
+    endpoint = Column(String(50))
+    model_used = Column(String(100), nullable=False)
+    response = Column(Text, nullable=False)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    expires_at = Column(TIMESTAMP, nullable=False, index=True)
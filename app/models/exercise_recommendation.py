@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, Text, TIMESTAMP, ForeignKey
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.compressed_text import CompressedText, compressed_synonym
 
 class ExerciseRecommendation(Base):
     __tablename__ = "exercise_recommendations"
@@ -10,8 +11,13 @@ class ExerciseRecommendation(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     user_limitations = Column(Text, nullable=False)
     limitations_type = Column(String(100), nullable=False)
-    ai_recommended_exercises = Column(Text, nullable=False)
+    _ai_recommended_exercises = Column("ai_recommended_exercises", CompressedText("ai_recommended_exercises"), nullable=False)
+    ai_recommended_exercises = compressed_synonym("_ai_recommended_exercises")
+    model_used = Column(String(100))  # Источник ответа: модель OpenRouter или offline, demo, cache...
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+    # Списки пользователя от новых к старым (постраничная выдача по курсору, app/pagination.py)
+    __table_args__ = (Index("ix_exercise_recommendations_user_created_at_id", user_id, created_at.desc(), id.desc()),)
+
     # Связи
     user = relationship("User", back_populates="exercise_recommendations")
\ No newline at end of file
@@ -1,22 +1,27 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, Text, TIMESTAMP, ForeignKey
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.compressed_text import CompressedText, compressed_synonym
 
 class InjuryPrediction(Base):
     __tablename__ = "injury_predictions"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    workout_plan_id = Column(Integer, ForeignKey("workout_plans.id"))
+    workout_plan_id = Column(Integer, ForeignKey("workout_plans.id"), index=True)
     exercises_analyzed = Column(JSONB, nullable=False)
-    ai_risk_prediction = Column(Text, nullable=False)
+    _ai_risk_prediction = Column("ai_risk_prediction", CompressedText("ai_risk_prediction"), nullable=False)
+    ai_risk_prediction = compressed_synonym("_ai_risk_prediction")
     risk_level = Column(String(50))
     risk_factors = Column(JSONB)
     recommendations = Column(Text)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+    # Списки пользователя от новых к старым (постраничная выдача по курсору, app/pagination.py)
+    __table_args__ = (Index("ix_injury_predictions_user_created_at_id", user_id, created_at.desc(), id.desc()),)
+
     # # Связи
     user = relationship("User", back_populates="injury_predictions")
     workout_plan = relationship("WorkoutPlan", back_populates="injury_predictions")
\ No newline at end of file
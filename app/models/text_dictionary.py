@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Float, LargeBinary, TIMESTAMP
+from sqlalchemy.sql import func
+from app.database import Base
+
+class TextDictionary(Base):
+    __tablename__ = "text_dictionaries"
+
+    # Версия словаря записывается в каждое сжатое значение
+    id = Column(Integer, primary_key=True, index=True)
+    column_key = Column(String(64), nullable=False, index=True)
+    dictionary = Column(LargeBinary, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    sample_bytes = Column(Integer, nullable=False)
+    ratio = Column(Float)  # Степень сжатия на отложенной выборке
+    created_at = Column(TIMESTAMP, server_default=func.now())
@@ -7,7 +7,7 @@ class UserAnthropometrics(Base):
     __tablename__ = "user_anthropometrics"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     height_cm = Column(Integer, nullable=False)
     weight_kg = Column(Numeric(5, 2), nullable=False)
     age = Column(Integer, nullable=False)
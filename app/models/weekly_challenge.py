@@ -1,15 +1,17 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey, Boolean
+from sqlalchemy import Column, Index, Integer, String, TIMESTAMP, ForeignKey, Boolean
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.compressed_text import CompressedText, compressed_synonym
 
 class WeeklyChallenge(Base):
     __tablename__ = "weekly_challenges"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    ai_generated_challenge = Column(Text, nullable=False)
+    _ai_generated_challenge = Column("ai_generated_challenge", CompressedText("ai_generated_challenge"), nullable=False)
+    ai_generated_challenge = compressed_synonym("_ai_generated_challenge")
     week_number = Column(Integer, nullable=False)
     challenge_type = Column(String(50), nullable=False)
     target_metrics = Column(JSONB)
@@ -17,5 +19,13 @@ class WeeklyChallenge(Base):
     completed_at = Column(TIMESTAMP)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+    # Списки пользователя от новых к старым (постраничная выдача по курсору, app/pagination.py)
+    __table_args__ = (
+        Index("ix_weekly_challenges_user_created_at_id", user_id, created_at.desc(), id.desc()),
+        # Испытание пользователя на неделю. Не уникальный: week_number - номер недели ISO без года,
+        # и на одну неделю можно создать испытания разных типов
+        Index("ix_weekly_challenges_user_id_week_number", user_id, week_number),
+    )
+
     # Связи
     user = relationship("User", back_populates="weekly_challenges")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, Index, Integer, String, Text, TIMESTAMP, ForeignKey
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -9,7 +9,7 @@ class WorkoutHistory(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    plan_id = Column(Integer, ForeignKey("workout_plans.id"))
+    plan_id = Column(Integer, ForeignKey("workout_plans.id"), index=True)
     exercises_completed = Column(JSONB, nullable=False)
     session_duration = Column(Integer, nullable=False)
     perceived_exertion = Column(Integer)
@@ -17,6 +17,9 @@ class WorkoutHistory(Base):
     notes = Column(Text)
     completed_at = Column(TIMESTAMP, server_default=func.now())
 
+    # Списки пользователя от новых к старым (постраничная выдача по курсору, app/pagination.py)
+    __table_args__ = (Index("ix_workout_history_user_completed_at_id", user_id, completed_at.desc(), id.desc()),)
+
     # Связи
     user = relationship("User", back_populates="workout_history")
     workout_plan = relationship("WorkoutPlan", back_populates="workout_history")
\ No newline at end of file
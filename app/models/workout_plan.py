@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey, Boolean
+from sqlalchemy import Column, Index, Integer, String, Text, TIMESTAMP, ForeignKey, Boolean
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
+from app.compressed_text import CompressedText, compressed_synonym
 
 class WorkoutPlan(Base):
     __tablename__ = "workout_plans"
@@ -9,13 +10,17 @@ class WorkoutPlan(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     user_request = Column(Text, nullable=False)
-    ai_generated_plan = Column(Text, nullable=False)
+    _ai_generated_plan = Column("ai_generated_plan", CompressedText("ai_generated_plan"), nullable=False)
+    ai_generated_plan = compressed_synonym("_ai_generated_plan")
     plan_type = Column(String(50), nullable=False)
     difficulty = Column(String(20))
     duration_minutes = Column(Integer)
     is_completed = Column(Boolean, default=False)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+    # Списки пользователя от новых к старым (постраничная выдача по курсору, app/pagination.py)
+    __table_args__ = (Index("ix_workout_plans_user_created_at_id", user_id, created_at.desc(), id.desc()),)
+
     # Связи
     user = relationship("User", back_populates="workout_plans")
     workout_history = relationship("WorkoutHistory", back_populates="workout_plan")
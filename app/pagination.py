@@ -0,0 +1,63 @@
+# app/pagination.py
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+# Заголовок ответа со ссылкой на следующую страницу (тело списков не меняется)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Позиция в списке: (значение колонки сортировки, id) последней выданной строки
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Непрозрачный курсор для клиента: base64url от [время, id]"""
+    raw = json.dumps([sort_value.isoformat(), row_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Курсор -> (время, id); ValueError при поврежденном курсоре"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(f"Некорректный курсор: {cursor!r}") from e
+
+
+def parse_cursor(cursor: Optional[str]) -> Optional[Cursor]:
+    """Курсор из параметра запроса (для маршрутов: поврежденный курсор - 400)"""
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор страницы")
+
+
+def keyset_page(query, sort_column, id_column, after: Optional[Cursor], skip: int, limit: int) -> List[Any]:
+    """
+    Страница списка от новых к старым по (sort_column, id). С курсором строки берутся
+    сразу после него (условие по индексу (user_id, sort_column DESC, id DESC)) и skip
+    не применяется; без курсора - первая страница со старым смещением skip.
+    Колонки сортировки заполняются server_default=now(), NULL в них не ожидается.
+    """
+    query = query.order_by(sort_column.desc(), id_column.desc())
+    if after is not None:
+        query = query.filter(tuple_(sort_column, id_column) < tuple_(*after))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit).all()
+
+
+def set_next_cursor(response: Response, items: List[Any], limit: int, sort_attr: str):
+    """Полная страница - в заголовок кладется курсор после ее последней строки"""
+    if limit > 0 and len(items) >= limit:
+        last = items[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, sort_attr), last.id)
@@ -0,0 +1,136 @@
+# app/pool_metrics.py
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import settings
+
+
+def _percentiles(samples) -> Dict[str, float]:
+    if not samples:
+        return {"p50": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+    return {"p50": round(pick(0.5) * 1000, 2), "p99": round(pick(0.99) * 1000, 2), "max": round(ordered[-1] * 1000, 2)}
+
+
+class PoolMetrics:
+    """
+    Метрики пула соединений к БД: ожидание свободного соединения (checkout),
+    время, на которое соединение забирают из пула, число занятых соединений и таймауты.
+    Последние DB_POOL_METRICS_WINDOW замеров хранятся для перцентилей (в миллисекундах).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=settings.DB_POOL_METRICS_WINDOW)
+        self._holds = deque(maxlen=settings.DB_POOL_METRICS_WINDOW)
+        self.engine = None
+        self.in_use = 0
+        self.reset()
+
+    def reset(self):
+        """Обнуляет счетчики и окна замеров (занятые сейчас соединения остаются в in_use)"""
+        with self._lock:
+            self._waits.clear()
+            self._holds.clear()
+            self.checkouts = 0
+            self.timeouts = 0
+            self.max_in_use = self.in_use
+            self.wait_seconds_total = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._waits.append(seconds)
+            self.wait_seconds_total += seconds
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def on_checkout(self, connection_record):
+        connection_record.info["checked_out_at"] = time.perf_counter()
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def on_checkin(self, connection_record):
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        with self._lock:
+            if checked_out_at is not None:
+                self.in_use = max(0, self.in_use - 1)
+                self._holds.append(time.perf_counter() - checked_out_at)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            waits, holds = list(self._waits), list(self._holds)
+            statistics = {
+                "checkouts": self.checkouts,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 3),
+            }
+        pool = self.engine.pool if self.engine is not None else None
+        if pool is not None:
+            statistics["pool"] = type(pool).__name__
+        if isinstance(pool, QueuePool):
+            statistics.update({"size": pool.size(), "overflow": pool.overflow(), "checked_out": pool.checkedout()})
+        statistics["checkout_wait_ms"] = _percentiles(waits)
+        statistics["hold_ms"] = _percentiles(holds)
+        return statistics
+
+
+# Метрики по имени пула (pool_logging_name движка)
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+class _TimedPoolMixin:
+    """
+    Замеряет ожидание соединения в очереди пула (у событий пула нет события "начало checkout").
+    В режиме PgBouncer (NullPool) очереди нет - остаются только события checkout/checkin.
+    """
+
+    def _do_get(self):
+        metrics = pool_metrics.get(self._orig_logging_name)
+        started_at = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            if metrics is not None:
+                metrics.record_timeout()
+            raise
+        if metrics is not None:
+            metrics.record_wait(time.perf_counter() - started_at)
+        return record
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def instrument_engine(engine, name: str) -> PoolMetrics:
+    """
+    Подключает метрики к пулу движка. Движок создается с pool_logging_name=name
+    и пулом Timed*QueuePool; события checkout/checkin переходят и на пересозданный пул (dispose).
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    metrics = pool_metrics[name] = PoolMetrics(name)
+    metrics.engine = sync_engine
+    event.listen(sync_engine, "checkout", lambda dbapi_connection, record, proxy: metrics.on_checkout(record))
+    event.listen(sync_engine, "checkin", lambda dbapi_connection, record: metrics.on_checkin(record))
+    return metrics
+
+
+def get_pool_statistics() -> Dict[str, Any]:
+    return {name: metrics.get_statistics() for name, metrics in pool_metrics.items()}
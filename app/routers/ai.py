@@ -0,0 +1,167 @@
+# app/routers/ai.py
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Optional
+from app.crud import crud_ai_interaction
+from app.database import get_db
+from app.pagination import parse_cursor, set_next_cursor
+from app.routers.dependencies import get_current_user
+from app.schemas import AIInteraction, ExerciseRecommendationCreate, WeeklyChallengeCreate
+from app.schemas.workout_plan import WorkoutPlanCreateRequest
+from app.services.ai_service import get_ai_usage_stats, get_ai_pool_stats, get_ai_cache_stats, get_ai_single_flight_stats, get_ai_hedging_stats, get_ai_model_health, get_ai_job_stats, get_ai_prompt_stats, get_ai_admission_stats, get_ai_interaction_log_stats, get_ai_offline_stats, get_ai_semantic_cache_stats, get_ai_deadline_stats
+from app.services.offline_engine import offline_engine
+from app.services.challenge_pregeneration import challenge_pregenerator
+from app.compressed_text import text_codec
+from app.pool_metrics import get_pool_statistics
+
+router = APIRouter()
+
+
+@router.get("/usage")
+async def get_usage_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить статистику использования AI-бюджета"""
+    return await get_ai_usage_stats()
+
+
+@router.get("/http-pool")
+async def get_http_pool_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить статистику пула соединений к OpenRouter"""
+    return await get_ai_pool_stats()
+
+
+@router.get("/cache")
+async def get_cache_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить статистику кэша ответов AI (попадания, промахи, вытеснения)"""
+    return await get_ai_cache_stats()
+
+
+@router.get("/single-flight")
+async def get_single_flight_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить статистику объединения одинаковых одновременных запросов"""
+    return await get_ai_single_flight_stats()
+
+
+@router.get("/hedging")
+async def get_hedging_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить статистику хеджирования запросов между моделями"""
+    return await get_ai_hedging_stats()
+
+
+@router.get("/models")
+async def get_model_health(current_user = Depends(get_current_user)) -> List[Dict[str, Any]]:
+    """Получить состояние моделей: EWMA задержки, доля ошибок и 429, предохранители"""
+    return await get_ai_model_health()
+
+
+@router.get("/jobs")
+async def get_job_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить статистику очереди фоновых AI-задач"""
+    return await get_ai_job_stats()
+
+
+@router.get("/prompts")
+async def get_prompt_statistics(current_user = Depends(get_current_user)) -> List[Dict[str, Any]]:
+    """Получить экономию токенов по шаблонам промптов (компактирование и обрезка длинных полей)"""
+    return await get_ai_prompt_stats()
+
+
+@router.get("/admission")
+async def get_admission_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить состояние допуска запросов к AI: очередь, лимиты, гистограммы ожидания и глубины очереди"""
+    return await get_ai_admission_stats()
+
+
+@router.get("/deadline")
+async def get_deadline_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить статистику крайних сроков AI-запросов: ответы резервным режимом и пропущенные попытки"""
+    return await get_ai_deadline_stats()
+
+
+@router.get("/interaction-log")
+async def get_interaction_log_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить статистику фоновой записи журнала AI-запросов"""
+    return await get_ai_interaction_log_stats()
+
+
+@router.get("/interactions", response_model=List[AIInteraction])
+def get_ai_interactions(
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Получить журнал AI-запросов пользователя, новые первыми; следующая страница - cursor из заголовка X-Next-Cursor"""
+    interactions = crud_ai_interaction.get_by_user_id(db, current_user.id, limit=limit, after=parse_cursor(cursor))
+    set_next_cursor(response, interactions, limit, "created_at")
+    return interactions
+
+
+@router.get("/offline")
+async def get_offline_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить статистику офлайн-генератора: размер каталога, число ответов, среднее время"""
+    return await get_ai_offline_stats()
+
+
+@router.get("/semantic-cache")
+async def get_semantic_cache_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить статистику семантического кэша рекомендаций: попадания, среднее сходство, размер индекса"""
+    return await get_ai_semantic_cache_stats()
+
+
+@router.get("/pregeneration")
+async def get_pregeneration_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить состояние предгенерации недельных испытаний: окно, последний проход, созданные и пропущенные"""
+    return challenge_pregenerator.get_statistics()
+
+
+@router.get("/db-pool")
+async def get_db_pool_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить метрики пулов соединений к БД: ожидание соединения, время удержания, занятые соединения, таймауты"""
+    return get_pool_statistics()
+
+
+@router.get("/text-compression")
+async def get_text_compression_statistics(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Получить статистику сжатия AI-текстов в БД: версии словарей, степень сжатия, время записи и чтения"""
+    return text_codec.get_statistics()
+
+
+# ============== МГНОВЕННЫЙ ПРЕДПРОСМОТР (офлайн-генератор, без OpenRouter) ==============
+@router.post("/preview/workout-plan")
+async def preview_workout_plan(
+    plan_data: WorkoutPlanCreateRequest,
+    current_user = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Черновик плана тренировки из каталога упражнений (не сохраняется)"""
+    content = offline_engine.workout_plan(
+        plan_data.user_request, plan_data.plan_type, plan_data.difficulty, plan_data.duration_minutes
+    )
+    return {"engine": "offline", "content": content}
+
+
+@router.post("/preview/exercise-recommendations")
+async def preview_exercise_recommendations(
+    recommendation_data: ExerciseRecommendationCreate,
+    current_user = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Черновик рекомендаций при ограничениях (не сохраняется)"""
+    content = offline_engine.exercise_recommendations(
+        f"{recommendation_data.limitations_type} {recommendation_data.user_limitations}"
+    )
+    return {"engine": "offline", "content": content}
+
+
+@router.post("/preview/weekly-challenge")
+async def preview_weekly_challenge(
+    challenge_data: WeeklyChallengeCreate,
+    current_user = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Черновик недельного испытания (не сохраняется)"""
+    target_metrics = {
+        key: value
+        for key, value in challenge_data.model_dump(include={"target_reps", "target_sets", "target_duration"}).items()
+        if value is not None
+    }
+    content = offline_engine.weekly_challenge(challenge_data.challenge_type, target_metrics)
+    return {"engine": "offline", "content": content}
@@ -11,6 +11,9 @@ import hashlib
 import hmac
 import time
 from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -114,7 +117,7 @@ def telegram_auth(
     db: Session = Depends(get_db)
 ):
     """УНИВЕРСАЛЬНЫЙ обработчик Telegram авторизации"""
-    print(f"🔐 TELEGRAM AUTH - Тип: {auth_data.get('auth_type', 'unknown')}")
+    logger.info(f"Telegram авторизация, тип: {auth_data.get('auth_type', 'unknown')}")
     
     # Определяем тип авторизации
     auth_type = auth_data.get('auth_type', 'unknown')
@@ -131,7 +134,7 @@ def telegram_auth(
 
 def handle_mock_auth(auth_data: Dict[str, Any], db: Session):
     """Mock авторизация для разработки"""
-    print("🧪 Используем mock данные для разработки")
+    logger.debug("Используем mock данные для разработки")
     
     telegram_id = int(auth_data.get('id', 123456789))
     first_name = auth_data.get('first_name', 'Test')
@@ -149,7 +152,7 @@ def handle_mock_auth(auth_data: Dict[str, Any], db: Session):
 
 def handle_webapp_auth(auth_data: Dict[str, Any], db: Session):
     """Telegram Web App (Mini App) авторизация"""
-    print("📱 Telegram Web App авторизация")
+    logger.debug("Telegram Web App авторизация")
     
     # Проверяем подпись
     if not verify_webapp_signature(auth_data):
@@ -171,7 +174,7 @@ def handle_webapp_auth(auth_data: Dict[str, Any], db: Session):
 
 def handle_oauth_auth(auth_data: Dict[str, Any], db: Session):
     """Telegram OAuth авторизация (через сайт)"""
-    print("🌐 Telegram OAuth авторизация")
+    logger.debug("Telegram OAuth авторизация")
     
     # Проверяем временную метку (не старше 24 часов)
     auth_date = int(auth_data.get('auth_date', 0))
@@ -194,7 +197,7 @@ def handle_oauth_auth(auth_data: Dict[str, Any], db: Session):
 
 def handle_auto_auth(auth_data: Dict[str, Any], db: Session):
     """Автоматическое определение типа"""
-    print("🤖 Автоопределение типа авторизации")
+    logger.debug("Автоопределение типа авторизации")
     
     telegram_id = int(auth_data.get('id', 0))
     first_name = auth_data.get('first_name', 'User')
@@ -204,13 +207,13 @@ def handle_auto_auth(auth_data: Dict[str, Any], db: Session):
     # Если есть hash и bot_token - вероятно WebApp
     if 'hash' in auth_data and settings.TELEGRAM_BOT_TOKEN:
         if verify_webapp_signature(auth_data):
-            print("Определен как WebApp")
+            logger.debug("Определен как WebApp")
             auth_type = 'webapp'
         else:
-            print("Определен как OAuth (устаревшая подпись)")
+            logger.debug("Определен как OAuth (устаревшая подпись)")
             auth_type = 'oauth'
     else:
-        print("Определен как mock/упрощенный")
+        logger.debug("Определен как mock/упрощенный")
         auth_type = 'mock'
     
     return create_or_get_user(
@@ -230,7 +233,7 @@ def create_or_get_user(db: Session, telegram_id: int, username: str,
     user = crud_user.get_by_telegram_id(db, telegram_id)
     
     if user:
-        print(f"✅ Найден существующий пользователь: {user.username}")
+        logger.debug(f"Найден существующий пользователь: {user.id}")
         # Обновляем информацию если нужно
         if user.username != username:
             user.username = username
@@ -253,16 +256,16 @@ def create_or_get_user(db: Session, telegram_id: int, username: str,
         
         try:
             user = crud_user.create(db, user_create)
-            print(f"✅ Создан новый Telegram пользователь: {username}")
+            logger.info(f"Создан новый Telegram пользователь: {user.id}")
         except Exception as e:
-            print(f"❌ Ошибка создания пользователя: {e}")
+            logger.warning(f"Ошибка создания пользователя: {e}")
             # Если email занят, пробуем другой
             import random
             user_create.email = f"telegram_{telegram_id}_{random.randint(1000,9999)}@{auth_type}.user"
             try:
                 user = crud_user.create(db, user_create)
             except Exception as e2:
-                print(f"❌ Вторая попытка тоже не удалась: {e2}")
+                logger.error(f"Вторая попытка создания пользователя тоже не удалась: {e2}")
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Не удалось создать пользователя"
@@ -293,7 +296,7 @@ def verify_webapp_signature(data: Dict[str, Any]) -> bool:
     try:
         bot_token = settings.TELEGRAM_BOT_TOKEN
         if not bot_token:
-            print("⚠️ TELEGRAM_BOT_TOKEN не настроен")
+            logger.warning("TELEGRAM_BOT_TOKEN не настроен")
             return False
         
         received_hash = data['hash']
@@ -319,9 +322,9 @@ def verify_webapp_signature(data: Dict[str, Any]) -> bool:
         ).hexdigest()
         
         result = hmac.compare_digest(computed_hash, received_hash)
-        print(f"🔐 Проверка подписи: {'✅ Успешно' if result else '❌ Неверно'}")
+        logger.debug(f"Проверка подписи: {'успешно' if result else 'неверно'}")
         return result
         
     except Exception as e:
-        print(f"❌ Ошибка проверки подписи: {e}")
+        logger.warning(f"Ошибка проверки подписи: {e}")
         return False
\ No newline at end of file
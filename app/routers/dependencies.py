@@ -1,8 +1,7 @@
 # app/routers/dependencies.py
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
-from app.database import get_db
+from app.database import run_in_session
 from app.crud import crud_user
 from app.security import decode_access_token # <-- Импортируем функцию из security.py
 
@@ -10,11 +9,14 @@ from app.security import decode_access_token # <-- Импортируем фун
 oauth2_scheme = HTTPBearer()
 
 def get_current_user(
-    token: str = Depends(oauth2_scheme), # <-- Получаем токен через схему
-    db: Session = Depends(get_db)
+    token: str = Depends(oauth2_scheme) # <-- Получаем токен через схему
 ):
     """
     Зависимость для получения текущего пользователя из JWT токена.
+    Пользователь загружается в отдельной короткой сессии: соединение сразу
+    возвращается в пул, а не держится до конца запроса (в AI-маршрутах это
+    все время ожидания модели). Объект пользователя отсоединен от сессии,
+    загруженные поля доступны.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -29,7 +31,7 @@ def get_current_user(
         raise credentials_exception
     
     # Находим пользователя в базе по ID
-    user = crud_user.get_by_id(db, user_id)
+    user = run_in_session(crud_user.get_by_id, user_id)
     if user is None:
         raise credentials_exception
     
@@ -1,55 +1,144 @@
 # app/routers/exercise_recommendations.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app.crud import crud_exercise_recommendation
-from app.schemas import ExerciseRecommendation, ExerciseRecommendationCreate
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_db, get_async_db, run_in_session
+from app.crud import crud_exercise_recommendation, async_crud_exercise_recommendation
+from app.schemas import ExerciseRecommendation, ExerciseRecommendationCreate, AIJob
 # --- ИЗМЕНЕНО: Импорт правильной зависимости ---
 from app.routers.dependencies import get_current_user
+from app.pagination import parse_cursor, set_next_cursor
 # --- /ИЗМЕНЕНО ---
-from app.services.ai_service import generate_exercise_recommendations
+from app.routers.streaming import sse_response
+from app.routers.jobs import submit_job
+from app.services.jobs import register_job_handler
+from starlette.concurrency import run_in_threadpool
+from app.services.ai_service import generate_exercise_recommendations_result, stream_exercise_recommendations
+from app.services.semantic_cache import similarity_text
 
 router = APIRouter()
 
+def build_combined_request(recommendation_data: ExerciseRecommendationCreate) -> str:
+    """Объединяет ограничения и их тип в один запрос для ИИ"""
+    return f"Тип ограничений: {recommendation_data.limitations_type}. Описание: {recommendation_data.user_limitations}"
+
+def build_similarity_key(recommendation_data: ExerciseRecommendationCreate) -> str:
+    """Текст для семантического кэша: похожие ограничения получают уже готовые рекомендации"""
+    return similarity_text(recommendation_data.limitations_type, recommendation_data.user_limitations)
+
+def build_recommendation_record(
+    user_id: int, recommendation_data: ExerciseRecommendationCreate, ai_recommendations: str, model_used: str
+) -> dict:
+    """Формирует запись рекомендации для БД (model_used - источник ответа, по нему отбирается семантический кэш)"""
+    return {
+        "user_limitations": recommendation_data.user_limitations,
+        "limitations_type": recommendation_data.limitations_type,
+        "user_id": user_id,
+        "ai_recommended_exercises": ai_recommendations,
+        "model_used": model_used
+    }
+
+async def run_exercise_recommendation_job(payload: dict, user_id: int) -> int:
+    """Фоновая генерация рекомендаций (обработчик очереди задач)"""
+    recommendation_data = ExerciseRecommendationCreate(**payload["request"])
+    result = await generate_exercise_recommendations_result(
+        build_combined_request(recommendation_data),
+        regenerate=payload.get("regenerate", False),
+        user_id=user_id,
+        similarity_key=build_similarity_key(recommendation_data)
+    )
+    recommendation = await run_in_threadpool(
+        run_in_session,
+        crud_exercise_recommendation.create,
+        build_recommendation_record(user_id, recommendation_data, result.content, result.model_used)
+    )
+    return recommendation.id
+
+register_job_handler("exercise_recommendation", run_exercise_recommendation_job)
+
 @router.get("/", response_model=List[ExerciseRecommendation])
 def get_exercise_recommendations(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     # --- ИЗМЕНЕНО: Используем правильную зависимость ---
     current_user = Depends(get_current_user),
     # --- /ИЗМЕНЕНО ---
     db: Session = Depends(get_db)
 ):
-    """Получить все рекомендации по упражнениям"""
-    return crud_exercise_recommendation.get_by_user_id(db, current_user.id, skip, limit)
+    """Получить рекомендации по упражнениям, новые первыми; следующая страница - cursor из заголовка X-Next-Cursor"""
+    recommendations = crud_exercise_recommendation.get_by_user_id(db, current_user.id, skip, limit, after=parse_cursor(cursor))
+    set_next_cursor(response, recommendations, limit, "created_at")
+    return recommendations
 
 @router.post("/", response_model=ExerciseRecommendation)
 async def create_exercise_recommendation(
     recommendation_data: ExerciseRecommendationCreate,
+    regenerate: bool = False,
     # --- ИЗМЕНЕНО: Используем правильную зависимость ---
     current_user = Depends(get_current_user),
     # --- /ИЗМЕНЕНО ---
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Получить рекомендации по упражнениям при ограничениях"""
+    """Получить рекомендации по упражнениям при ограничениях (regenerate=true - без кэша)"""
     # --- ИЗМЕНЕНО: Объединяем ограничения и тип в один запрос для ИИ ---
     # Это позволяет ИИ учитывать тип ограничений при генерации
-    combined_request = f"Тип ограничений: {recommendation_data.limitations_type}. Описание: {recommendation_data.user_limitations}"
+    combined_request = build_combined_request(recommendation_data)
     # --- /ИЗМЕНЕНО ---
 
     # Генерируем рекомендации с помощью ИИ, передавая объединённый запрос
-    ai_recommendations = await generate_exercise_recommendations(combined_request) # <-- Передаём combined_request
+    result = await generate_exercise_recommendations_result(
+        combined_request,
+        regenerate=regenerate,
+        user_id=current_user.id,
+        similarity_key=build_similarity_key(recommendation_data)
+    ) # <-- Передаём combined_request
     
     # Создаем словарь для БД
-    recommendation_dict = {
-        "user_limitations": recommendation_data.user_limitations,
-        "limitations_type": recommendation_data.limitations_type, # <-- Сохраняем отдельно
-        "user_id": current_user.id,
-        "ai_recommended_exercises": ai_recommendations
-    }
+    recommendation_dict = build_recommendation_record(current_user.id, recommendation_data, result.content, result.model_used)
     
-    return crud_exercise_recommendation.create(db, recommendation_dict)
+    return await async_crud_exercise_recommendation.create(db, recommendation_dict)
+@router.post("/stream")
+async def create_exercise_recommendation_stream(
+    recommendation_data: ExerciseRecommendationCreate,
+    regenerate: bool = False,
+    current_user = Depends(get_current_user)
+):
+    """Получить рекомендации с потоковой отдачей текста по мере генерации (SSE)"""
+    user_id = current_user.id
+    combined_request = build_combined_request(recommendation_data)
+    # Источник ответа заполняется потоком к моменту сохранения
+    outcome = {}
+
+    def save_recommendation(db: Session, ai_recommendations: str):
+        recommendation = crud_exercise_recommendation.create(
+            db, build_recommendation_record(user_id, recommendation_data, ai_recommendations, outcome["model_used"])
+        )
+        return ExerciseRecommendation.model_validate(recommendation).model_dump(mode="json")
+
+    return sse_response(
+        stream_exercise_recommendations(
+            combined_request,
+            regenerate=regenerate,
+            user_id=user_id,
+            similarity_key=build_similarity_key(recommendation_data),
+            outcome=outcome
+        ),
+        save_recommendation
+    )
+@router.post("/jobs", response_model=AIJob, status_code=202)
+async def create_exercise_recommendation_job(
+    recommendation_data: ExerciseRecommendationCreate,
+    regenerate: bool = False,
+    current_user = Depends(get_current_user)
+):
+    """Поставить генерацию рекомендаций в очередь; статус - GET /jobs/{id}"""
+    return await submit_job("exercise_recommendation", current_user.id, {
+        "request": recommendation_data.model_dump(),
+        "regenerate": regenerate
+    })
 # --- НОВОЕ: Роут для удаления рекомендации ---
 @router.delete("/{recommendation_id}")
 def delete_exercise_recommendation(
@@ -1,162 +1,26 @@
 # app/routers/injury_predictions.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
-from app.database import get_db
-from app.crud import crud_injury_prediction, crud_workout_plan
-from app.schemas import InjuryPrediction, InjuryPredictionCreate
+from app.database import get_db, get_async_db, release_connection, run_in_session
+from app.crud import crud_injury_prediction, crud_workout_plan, async_crud_injury_prediction
+from app.schemas import InjuryPrediction, InjuryPredictionCreate, AIJob
 from app.routers.dependencies import get_current_user
-from app.services.ai_service import analyze_injury_risk
+from app.pagination import parse_cursor, set_next_cursor
+from app.routers.streaming import sse_response
+from app.routers.jobs import submit_job
+from app.services.jobs import register_job_handler
+from app.services.admission import AdmissionRejected
+from starlette.concurrency import run_in_threadpool
+from app.services.ai_service import analyze_injury_risk, stream_injury_risk
+from app.services.injury_parser import parse_injury_risk_response
 import json
-import re
-
-router = APIRouter()
+import logging
 
+logger = logging.getLogger(__name__)
 
-def extract_risk_level_from_ai_response(ai_response: str) -> str:
-    """
-    ТОЧНО извлекает уровень риска из ответа ИИ
-    Возвращает: 'high', 'medium', или 'low'
-    """
-    if not ai_response:
-        return "medium"
-    
-    # Приводим к нижнему регистру для поиска
-    text_lower = ai_response.lower()
-    
-    print("\n" + "="*80)
-    print("ИЗВЛЕЧЕНИЕ УРОВНЯ РИСКА ИЗ ОТВЕТА ИИ")
-    print("="*80)
-    print(f"Первые 500 символов ответа:\n{text_lower[:500]}")
-    
-    # Вариант 1: Ищем "1. Уровень риска: Высокий" (самый распространенный формат)
-    # Ищем различные варианты написания
-    patterns = [
-        # Формат с цифрами: 1. Уровень риска: Высокий
-        (r'1\.\s*[уу]ровень\s+[рp]иска\s*[:\-]\s*(низкий|средний|высокий)', 'цифра+уровень риска'),
-        
-        # Формат: ### 1. Уровень риска: Высокий
-        (r'#+\s*1\.\s*[уу]ровень\s+[рp]иска\s*[:\-]\s*(низкий|средний|высокий)', '###+уровень риска'),
-        
-        # Формат: Уровень риска: Высокий
-        (r'[уу]ровень\s+[рp]иска\s*[:\-]\s*(низкий|средний|высокий)', 'уровень риска:'),
-        
-        # Формат: Риск: Высокий
-        (r'[рp]иск\s*[:\-]\s*(низкий|средний|высокий)', 'риск:'),
-        
-        # Формат: **Уровень риска:** Высокий
-        (r'\*\*[уу]ровень\s+[рp]иска:\*\*\s*(низкий|средний|высокий)', '**уровень риска:**'),
-        
-        # Просто слово "Высокий" в контексте риска
-        (r'(?:риск|опасность|уровень)\s+—\s*(низкий|средний|высокий)', 'риск —'),
-        
-        # Для английского, если ИИ иногда отвечает на английском
-        (r'1\.\s*risk\s+level\s*[:\-]\s*(low|medium|high)', 'risk level'),
-        (r'risk\s+level\s*[:\-]\s*(low|medium|high)', 'risk level:'),
-    ]
-    
-    for pattern, pattern_name in patterns:
-        matches = re.finditer(pattern, text_lower, re.IGNORECASE)
-        for match in matches:
-            risk_word = match.group(1).lower()
-            print(f"✓ Найден уровень риска: '{risk_word}' (паттерн: {pattern_name})")
-            
-            # Русские варианты
-            if risk_word in ['низкий', 'low']:
-                return 'low'
-            elif risk_word in ['средний', 'medium']:
-                return 'medium'
-            elif risk_word in ['высокий', 'high']:
-                return 'high'
-    
-    # Вариант 2: Поиск ключевых слов в начале ответа
-    # Часто ИИ пишет уровень риска в начале раздела
-    lines = text_lower.split('\n')
-    
-    for i, line in enumerate(lines[:10]):  # Проверяем первые 10 строк
-        line = line.strip()
-        print(f"Строка {i}: {line[:100]}")
-        
-        # Прямой поиск в строке
-        if 'высокий' in line and any(word in line for word in ['риск', 'уровень', 'опасность']):
-            print(f"✓ Прямой поиск: найдено 'высокий' в строке {i}")
-            return 'high'
-        elif 'средний' in line and any(word in line for word in ['риск', 'уровень']):
-            print(f"✓ Прямой поиск: найдено 'средний' в строке {i}")
-            return 'medium'
-        elif 'низкий' in line and any(word in line for word in ['риск', 'уровень']):
-            print(f"✓ Прямой поиск: найдено 'низкий' в строке {i}")
-            return 'low'
-    
-    # Вариант 3: Подсчет упоминаний
-    high_count = text_lower.count('высокий') + text_lower.count('high')
-    medium_count = text_lower.count('средний') + text_lower.count('medium')
-    low_count = text_lower.count('низкий') + text_lower.count('low')
-    
-    print(f"\nПодсчет упоминаний:")
-    print(f"  Высокий/high: {high_count}")
-    print(f"  Средний/medium: {medium_count}")
-    print(f"  Низкий/low: {low_count}")
-    
-    if high_count > medium_count and high_count > low_count:
-        print("✓ По подсчету: ВЫСОКИЙ риск")
-        return 'high'
-    elif medium_count > high_count and medium_count > low_count:
-        print("✓ По подсчету: СРЕДНИЙ риск")
-        return 'medium'
-    elif low_count > high_count and low_count > medium_count:
-        print("✓ По подсчету: НИЗКИЙ риск")
-        return 'low'
-    
-    # Вариант 4: Поиск по ключевым фразам
-    if any(phrase in text_lower for phrase in [
-        'риск высокий', 'высокий риск', 'опасность высокая',
-        'high risk', 'risk is high'
-    ]):
-        print("✓ По ключевым фразам: ВЫСОКИЙ риск")
-        return 'high'
-    
-    # По умолчанию, если ничего не найдено
-    print("⚠ Уровень риска не найден точно, используем СРЕДНИЙ по умолчанию")
-    print("="*80)
-    return 'medium'
-
-
-def extract_recommendations_from_ai_response(ai_response: str) -> Optional[str]:
-    """Извлекает рекомендации из ответа ИИ"""
-    if not ai_response:
-        return None
-    
-    # Ищем разделы с рекомендациями
-    lines = ai_response.split('\n')
-    recommendations_start = -1
-    
-    # Ищем начало рекомендаций
-    keywords = ['рекомендации:', 'советы:', 'советы по снижению риска:', 
-                'рекомендации по снижению риска:', 'что делать:', 'как снизить риск:']
-    
-    for i, line in enumerate(lines):
-        line_lower = line.lower().strip()
-        if any(keyword in line_lower for keyword in keywords):
-            recommendations_start = i
-            break
-    
-    # Если нашли начало рекомендаций, извлекаем их
-    if recommendations_start != -1:
-        recommendations_lines = lines[recommendations_start:]
-        # Объединяем следующие строки (до следующего заголовка или конца)
-        result_lines = []
-        for line in recommendations_lines[1:10]:  # Берем до 10 строк после заголовка
-            line_stripped = line.strip()
-            if line_stripped and not line_stripped.startswith(('#', '**', '###', '---', '==')):
-                result_lines.append(line_stripped)
-            elif result_lines and line_stripped.startswith(('#', '**', '###')):  # Новый раздел
-                break
-        
-        if result_lines:
-            return '\n'.join(result_lines)
-    
-    return None
+router = APIRouter()
 
 
 def get_workout_plan_name(db: Session, plan_id: int) -> Optional[str]:
@@ -179,13 +43,16 @@ def get_workout_plan_name(db: Session, plan_id: int) -> Optional[str]:
 
 @router.get("/", response_model=List[InjuryPrediction])
 def get_injury_predictions(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Получить историю анализа рисков травм для текущего пользователя"""
-    predictions = crud_injury_prediction.get_by_user_id(db, current_user.id, skip, limit)
+    """Получить историю анализа рисков травм, новые первыми; следующая страница - cursor из заголовка X-Next-Cursor"""
+    predictions = crud_injury_prediction.get_by_user_id(db, current_user.id, skip, limit, after=parse_cursor(cursor))
+    set_next_cursor(response, predictions, limit, "created_at")
     
     # Добавляем информацию о плане тренировок к каждому прогнозу
     for prediction in predictions:
@@ -197,14 +64,12 @@ def get_injury_predictions(
     return predictions
 
 
-@router.post("/", response_model=InjuryPrediction)
-async def create_injury_prediction(
+def build_exercises_to_analyze(
+    db: Session,
     prediction_data: InjuryPredictionCreate,
-    current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Проанализировать риск травмы для плана тренировок или пользовательских упражнений"""
-    
+    current_user
+) -> dict:
+    """Проверяет запрос и собирает данные для анализа риска"""
     # Проверяем, что есть хотя бы один источник данных
     if not prediction_data.workout_plan_id and not prediction_data.exercises_analyzed:
         raise HTTPException(
@@ -242,55 +107,122 @@ async def create_injury_prediction(
     if prediction_data.risk_factors:
         exercises_to_analyze["user_risk_factors"] = prediction_data.risk_factors
     
+    return exercises_to_analyze
+
+
+def build_prediction_record(user_id: int, prediction_data: InjuryPredictionCreate, ai_result: str) -> dict:
+    """Формирует запись прогноза для БД из ответа ИИ"""
+    report = parse_injury_risk_response(ai_result)
+    if not report.level_found:
+        logger.debug("Уровень риска не найден явно, выбран '%s' по упоминаниям", report.level)
+    return {
+        "user_id": user_id,
+        "workout_plan_id": prediction_data.workout_plan_id,
+        "exercises_analyzed": prediction_data.exercises_analyzed or "",
+        "risk_factors": report.to_risk_factors(prediction_data.risk_factors),
+        "ai_risk_prediction": ai_result,
+        "risk_level": report.level,
+        "recommendations": report.recommendations_text(),
+    }
+
+
+async def run_injury_prediction_job(payload: dict, user_id: int) -> int:
+    """Фоновый анализ риска травмы (обработчик очереди задач)"""
+    prediction_data = InjuryPredictionCreate(**payload["request"])
+    ai_result = await analyze_injury_risk(payload["exercises"], user_id=user_id)
+    db_prediction = await run_in_threadpool(
+        run_in_session,
+        crud_injury_prediction.create,
+        build_prediction_record(user_id, prediction_data, ai_result)
+    )
+    return db_prediction.id
+
+register_job_handler("injury_prediction", run_injury_prediction_job)
+
+
+@router.post("/", response_model=InjuryPrediction)
+async def create_injury_prediction(
+    prediction_data: InjuryPredictionCreate,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Проанализировать риск травмы для плана тренировок или пользовательских упражнений"""
+    exercises_to_analyze = await db.run_sync(build_exercises_to_analyze, prediction_data, current_user)
+    # Соединение не держим, пока ждем модель (сессия живет до конца ответа)
+    await release_connection(db)
+    
     try:
         # Анализируем риск с помощью ИИ
-        print("\n" + "="*80)
-        print("ЗАПРОС К ИИ ДЛЯ АНАЛИЗА РИСКА")
-        print("="*80)
-        print(f"Данные для анализа: {exercises_to_analyze}")
-        
-        ai_result = await analyze_injury_risk(exercises_to_analyze)
+        logger.debug("Запрос к ИИ для анализа риска: %s", exercises_to_analyze)
         
-        print("\n" + "="*80)
-        print("ОТВЕТ ОТ ИИ")
-        print("="*80)
-        print(f"Ответ (первые 1000 символов): {ai_result[:1000]}...")
+        ai_result = await analyze_injury_risk(exercises_to_analyze, user_id=current_user.id)
         
-        # Извлекаем уровень риска из ответа ИИ
-        risk_level = extract_risk_level_from_ai_response(ai_result)
+        logger.debug("Ответ ИИ (первые 1000 символов): %s", ai_result[:1000])
         
-        print(f"\nИтоговый уровень риска: {risk_level}")
+        # Извлекаем уровень риска и рекомендации из ответа ИИ
+        db_data = build_prediction_record(current_user.id, prediction_data, ai_result)
         
-        # Извлекаем рекомендации из ответа ИИ
-        recommendations = extract_recommendations_from_ai_response(ai_result)
+        logger.info("Итоговый уровень риска: %s", db_data["risk_level"])
         
+    except AdmissionRejected:
+        # Перегрузка AI отдается как 503 + Retry-After общим обработчиком
+        raise
     except Exception as e:
-        print(f"Ошибка при анализе ИИ: {str(e)}")
+        logger.error("Ошибка при анализе ИИ: %s", e)
         raise HTTPException(status_code=500, detail=f"Ошибка при анализе ИИ: {str(e)}")
     
-    # Создаем запись в базе данных
-    db_data = {
-        "user_id": current_user.id,
-        "workout_plan_id": prediction_data.workout_plan_id,
-        "exercises_analyzed": prediction_data.exercises_analyzed or "",
-        "risk_factors": prediction_data.risk_factors or "",
-        "ai_risk_prediction": ai_result,
-        "risk_level": risk_level,
-        "recommendations": recommendations,
-    }
-    
     # Создаем прогноз в БД
-    db_prediction = crud_injury_prediction.create(db, db_data)
+    db_prediction = await async_crud_injury_prediction.create(db, db_data)
     
     # Добавляем вычисляемое поле workout_plan_name для ответа
     if prediction_data.workout_plan_id:
-        plan_name = get_workout_plan_name(db, prediction_data.workout_plan_id)
+        plan_name = await db.run_sync(get_workout_plan_name, prediction_data.workout_plan_id)
         if plan_name:
             db_prediction.workout_plan_name = plan_name
     
     return db_prediction
 
 
+@router.post("/stream")
+async def create_injury_prediction_stream(
+    prediction_data: InjuryPredictionCreate,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Проанализировать риск травмы с потоковой отдачей текста по мере генерации (SSE)"""
+    exercises_to_analyze = await db.run_sync(build_exercises_to_analyze, prediction_data, current_user)
+    # Соединение не держим, пока ждем модель (сессия живет до конца ответа)
+    await release_connection(db)
+    user_id = current_user.id
+
+    def save_prediction(db: Session, ai_result: str):
+        db_prediction = crud_injury_prediction.create(
+            db, build_prediction_record(user_id, prediction_data, ai_result)
+        )
+        if prediction_data.workout_plan_id:
+            db_prediction.workout_plan_name = get_workout_plan_name(db, prediction_data.workout_plan_id)
+        return InjuryPrediction.model_validate(db_prediction).model_dump(mode="json")
+
+    return sse_response(stream_injury_risk(exercises_to_analyze, user_id=user_id), save_prediction)
+
+
+@router.post("/jobs", response_model=AIJob, status_code=202)
+async def create_injury_prediction_job(
+    prediction_data: InjuryPredictionCreate,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Поставить анализ риска травмы в очередь; статус - GET /jobs/{id}"""
+    # Проверки доступа к плану выполняются сразу, до постановки в очередь
+    exercises_to_analyze = await db.run_sync(build_exercises_to_analyze, prediction_data, current_user)
+    # Соединение возвращаем в пул до постановки в очередь: submit_job берет свое, держать два незачем
+    await release_connection(db)
+    return await submit_job("injury_prediction", current_user.id, {
+        "request": prediction_data.model_dump(),
+        "exercises": exercises_to_analyze
+    })
+
+
 @router.delete("/{prediction_id}")
 def delete_injury_prediction(
     prediction_id: int,
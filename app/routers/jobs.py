@@ -0,0 +1,32 @@
+# app/routers/jobs.py
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Any, Dict
+from app.routers.dependencies import get_current_user
+from app.schemas import AIJob
+from app.services.jobs import job_manager, JobQueueFull
+
+router = APIRouter()
+
+
+async def submit_job(job_type: str, user_id: int, payload: Dict[str, Any]) -> AIJob:
+    """Ставит AI-задачу в очередь; при переполненной очереди отвечает 503"""
+    try:
+        return await job_manager.submit(job_type, user_id, payload)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=503,
+            detail="Очередь генерации переполнена, попробуйте позже",
+            headers={"Retry-After": "30"}
+        )
+
+
+@router.get("/{job_id}", response_model=AIJob)
+async def get_job(
+    job_id: str,
+    current_user = Depends(get_current_user)
+):
+    """Получить статус фоновой AI-задачи"""
+    job = await job_manager.get(job_id)
+    if not job or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return job
@@ -0,0 +1,58 @@
+# app/routers/streaming.py
+import json
+import logging
+from typing import Any, AsyncIterator, Callable, Dict
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.database import run_in_session
+from app.services.admission import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Форматирует одно событие Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(
+    chunks: AsyncIterator[str],
+    on_complete: Callable[[Session, str], Dict[str, Any]]
+) -> StreamingResponse:
+    """
+    Передает фрагменты ответа ИИ клиенту по SSE.
+    События: start - сразу после подключения, token - очередной фрагмент текста,
+    done - запись сохранена в БД (в data - сохраненный объект), error - ошибка генерации.
+    """
+    async def event_stream():
+        yield sse_event("start", {})
+        parts = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield sse_event("token", {"text": chunk})
+        except AdmissionRejected as e:
+            # Заголовок 503 уже не отправить - сообщаем клиенту через событие
+            yield sse_event("error", {"detail": str(e), "retry_after": e.retry_after})
+            return
+        except Exception as e:
+            logger.warning(f"Ошибка потоковой генерации: {e}")
+            yield sse_event("error", {"detail": "Ошибка при генерации ответа ИИ"})
+            return
+
+        try:
+            # Синхронный CRUD выполняем в пуле потоков и в отдельной сессии:
+            # сессия зависимости get_db может быть уже закрыта к концу потока
+            saved = await run_in_threadpool(run_in_session, on_complete, "".join(parts))
+        except Exception as e:
+            logger.error(f"Ошибка сохранения результата потоковой генерации: {e}")
+            yield sse_event("error", {"detail": "Не удалось сохранить результат"})
+            return
+        yield sse_event("done", saved)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
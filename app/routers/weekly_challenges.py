@@ -1,24 +1,92 @@
 # app/routers/weekly_challenges.py
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app.crud import crud_weekly_challenge
-from app.schemas import WeeklyChallenge, WeeklyChallengeCreate, WeeklyChallengeUpdate
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_db, get_async_db, release_connection, run_in_session
+from app.crud import crud_weekly_challenge, async_crud_weekly_challenge
+from app.schemas import WeeklyChallenge, WeeklyChallengeCreate, WeeklyChallengeUpdate, AIJob
 from app.routers.dependencies import get_current_user
-from app.services.ai_service import generate_weekly_challenge
+from app.pagination import parse_cursor, set_next_cursor
+from app.routers.streaming import sse_response
+from app.routers.jobs import submit_job
+from app.services.jobs import register_job_handler
+from starlette.concurrency import run_in_threadpool
+from app.services.ai_service import generate_weekly_challenge, stream_weekly_challenge
+from app.services.challenge_pregeneration import week_created_since, week_monday
+from datetime import datetime
 
 router = APIRouter()
 
+def build_target_metrics(challenge_data: WeeklyChallengeCreate) -> dict:
+    """Собирает target_metrics из отдельных полей запроса"""
+    target_metrics = {}
+    if challenge_data.target_reps is not None:
+        target_metrics['target_reps'] = challenge_data.target_reps
+    if challenge_data.target_sets is not None:
+        target_metrics['target_sets'] = challenge_data.target_sets
+    if challenge_data.target_duration is not None:
+        target_metrics['target_duration'] = challenge_data.target_duration
+    return target_metrics
+
+def build_challenge_record(user_id: int, challenge_data: WeeklyChallengeCreate, target_metrics: dict, ai_challenge: str) -> dict:
+    """Формирует запись испытания для БД"""
+    return {
+        "week_number": challenge_data.week_number,
+        "challenge_type": challenge_data.challenge_type,
+        "target_metrics": target_metrics if target_metrics else None,
+        "user_id": user_id,
+        "ai_generated_challenge": ai_challenge
+    }
+
+def get_week_challenge(db: Session, user_id: int, week_number: int):
+    """Испытание пользователя на неделю week_number текущего (ближайшего к сегодняшнему дню) года"""
+    monday = week_monday(week_number, datetime.utcnow().date())
+    return crud_weekly_challenge.get_current_week(db, user_id, week_number, week_created_since(monday))
+
+def find_prepared_challenge(db: Session, user_id: int, challenge_data: WeeklyChallengeCreate, target_metrics: dict):
+    """Испытание на эту неделю с теми же типом и целями (например, подготовленное заранее планировщиком)"""
+    challenge = get_week_challenge(db, user_id, challenge_data.week_number)
+    if challenge and challenge.challenge_type == challenge_data.challenge_type and (challenge.target_metrics or {}) == target_metrics:
+        return challenge
+    return None
+
+async def run_weekly_challenge_job(payload: dict, user_id: int) -> int:
+    """Фоновая генерация недельного испытания (обработчик очереди задач)"""
+    challenge_data = WeeklyChallengeCreate(**payload["request"])
+    target_metrics = build_target_metrics(challenge_data)
+    if not payload.get("regenerate", False):
+        prepared = await run_in_threadpool(run_in_session, find_prepared_challenge, user_id, challenge_data, target_metrics)
+        if prepared is not None:
+            return prepared.id
+    ai_challenge = await generate_weekly_challenge(
+        challenge_data.challenge_type,
+        target_metrics,
+        regenerate=payload.get("regenerate", False),
+        user_id=user_id
+    )
+    challenge = await run_in_threadpool(
+        run_in_session,
+        crud_weekly_challenge.create,
+        build_challenge_record(user_id, challenge_data, target_metrics, ai_challenge)
+    )
+    return challenge.id
+
+register_job_handler("weekly_challenge", run_weekly_challenge_job)
+
 @router.get("/", response_model=List[WeeklyChallenge])
 def get_weekly_challenges(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Получить все недельные испытания пользователя"""
-    return crud_weekly_challenge.get_by_user_id(db, current_user.id, skip, limit)
+    """Получить недельные испытания пользователя, новые первыми; следующая страница - cursor из заголовка X-Next-Cursor"""
+    challenges = crud_weekly_challenge.get_by_user_id(db, current_user.id, skip, limit, after=parse_cursor(cursor))
+    set_next_cursor(response, challenges, limit, "created_at")
+    return challenges
 
 @router.get("/current", response_model=WeeklyChallenge)
 def get_current_weekly_challenge(
@@ -27,7 +95,7 @@ def get_current_weekly_challenge(
     db: Session = Depends(get_db)
 ):
     """Получить текущее недельное испытание"""
-    challenge = crud_weekly_challenge.get_current_week(db, current_user.id, week_number)
+    challenge = get_week_challenge(db, current_user.id, week_number)
     if not challenge:
         raise HTTPException(status_code=404, detail="Испытание не найдено")
     return challenge
@@ -35,35 +103,66 @@ def get_current_weekly_challenge(
 @router.post("/", response_model=WeeklyChallenge)
 async def create_weekly_challenge(
     challenge_data: WeeklyChallengeCreate,
+    regenerate: bool = False,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Создать новое недельное испытание"""
-    # Собираем target_metrics из отдельных полей
-    target_metrics = {}
-    if challenge_data.target_reps is not None:
-        target_metrics['target_reps'] = challenge_data.target_reps
-    if challenge_data.target_sets is not None:
-        target_metrics['target_sets'] = challenge_data.target_sets
-    if challenge_data.target_duration is not None:
-        target_metrics['target_duration'] = challenge_data.target_duration
+    """Создать новое недельное испытание (regenerate=true - без кэша и без заранее подготовленного испытания)"""
+    target_metrics = build_target_metrics(challenge_data)
+
+    # Испытание уже подготовлено заранее - отдаем его без обращения к ИИ
+    if not regenerate:
+        prepared = await db.run_sync(find_prepared_challenge, current_user.id, challenge_data, target_metrics)
+        if prepared is not None:
+            return prepared
+        # Соединение не держим, пока ждем модель - итоговая запись возьмет его заново
+        await release_connection(db)
 
     # Генерируем испытание с помощью ИИ, передавая target_metrics
     ai_challenge = await generate_weekly_challenge(
         challenge_data.challenge_type, 
-        target_metrics
+        target_metrics,
+        regenerate=regenerate,
+        user_id=current_user.id
     )
 
     # Создаем словарь для БД
-    challenge_dict = {
-        "week_number": challenge_data.week_number,
-        "challenge_type": challenge_data.challenge_type,
-        "target_metrics": target_metrics if target_metrics else None,
-        "user_id": current_user.id,
-        "ai_generated_challenge": ai_challenge
-    }
+    challenge_dict = build_challenge_record(current_user.id, challenge_data, target_metrics, ai_challenge)
     
-    return crud_weekly_challenge.create(db, challenge_dict)
+    return await async_crud_weekly_challenge.create(db, challenge_dict)
+
+@router.post("/stream")
+async def create_weekly_challenge_stream(
+    challenge_data: WeeklyChallengeCreate,
+    regenerate: bool = False,
+    current_user = Depends(get_current_user)
+):
+    """Создать недельное испытание с потоковой отдачей текста по мере генерации (SSE)"""
+    user_id = current_user.id
+    target_metrics = build_target_metrics(challenge_data)
+
+    def save_challenge(db: Session, ai_challenge: str):
+        challenge = crud_weekly_challenge.create(
+            db, build_challenge_record(user_id, challenge_data, target_metrics, ai_challenge)
+        )
+        return WeeklyChallenge.model_validate(challenge).model_dump(mode="json")
+
+    return sse_response(
+        stream_weekly_challenge(challenge_data.challenge_type, target_metrics, regenerate=regenerate, user_id=user_id),
+        save_challenge
+    )
+
+@router.post("/jobs", response_model=AIJob, status_code=202)
+async def create_weekly_challenge_job(
+    challenge_data: WeeklyChallengeCreate,
+    regenerate: bool = False,
+    current_user = Depends(get_current_user)
+):
+    """Поставить генерацию испытания в очередь; статус - GET /jobs/{id}"""
+    return await submit_job("weekly_challenge", current_user.id, {
+        "request": challenge_data.model_dump(),
+        "regenerate": regenerate
+    })
 
 @router.patch("/{challenge_id}", response_model=WeeklyChallenge)
 def update_weekly_challenge(
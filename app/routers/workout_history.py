@@ -1,22 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
 from app.crud import crud_workout_history
 from app.schemas import WorkoutHistory, WorkoutHistoryCreate
 from app.routers.dependencies import get_current_user
+from app.pagination import parse_cursor, set_next_cursor
 
 router = APIRouter()
 
 @router.get("/", response_model=List[WorkoutHistory])
 def get_workout_history(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Получить историю тренировок пользователя"""
-    return crud_workout_history.get_by_user_id(db, current_user.id, skip, limit)
+    """Получить историю тренировок пользователя, последние первыми; следующая страница - cursor из заголовка X-Next-Cursor"""
+    history = crud_workout_history.get_by_user_id(db, current_user.id, skip, limit, after=parse_cursor(cursor))
+    set_next_cursor(response, history, limit, "completed_at")
+    return history
 
 @router.post("/", response_model=WorkoutHistory)
 def create_workout_history(
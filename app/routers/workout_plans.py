@@ -1,24 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
-from app.crud import crud_workout_plan, crud_workout_history
-from app.schemas import WorkoutPlan, WorkoutPlanResponse, WorkoutHistoryCreate
-from app.schemas.workout_plan import WorkoutPlanCreateRequest
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_db, get_async_db, run_in_session
+from app.crud import crud_workout_plan, crud_workout_history, async_crud_workout_plan
+from app.schemas import WorkoutPlan, WorkoutPlanResponse, WorkoutHistoryCreate, AIJob, WorkoutPlanBatchRequest, WorkoutPlanBatchResponse
+from app.schemas.workout_plan import WorkoutPlanCreateRequest, WorkoutPlanBatchError
+from app.config import settings
+from app.pagination import parse_cursor, set_next_cursor
 from app.routers.dependencies import get_current_user
-from app.services.ai_service import generate_workout_plan
+from app.routers.streaming import sse_response
+from app.routers.jobs import submit_job
+from app.services.jobs import register_job_handler
+from app.services.admission import AdmissionRejected
+from starlette.concurrency import run_in_threadpool
+from app.services.ai_service import generate_workout_plan, stream_workout_plan
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+def build_plan_record(user_id: int, plan_data: WorkoutPlanCreateRequest, ai_plan: str) -> dict:
+    """Формирует запись плана для БД"""
+    return {
+        "user_request": plan_data.user_request,
+        "plan_type": plan_data.plan_type,
+        "difficulty": plan_data.difficulty,
+        "duration_minutes": plan_data.duration_minutes,
+        "user_id": user_id,
+        "ai_generated_plan": ai_plan
+    }
+
+async def run_workout_plan_job(payload: dict, user_id: int) -> int:
+    """Фоновая генерация плана тренировок (обработчик очереди задач)"""
+    plan_data = WorkoutPlanCreateRequest(**payload["request"])
+    ai_plan = await generate_workout_plan(
+        plan_data.user_request,
+        plan_data.plan_type,
+        plan_data.difficulty,
+        plan_data.duration_minutes,
+        regenerate=payload.get("regenerate", False),
+        user_id=user_id
+    )
+    plan = await run_in_threadpool(
+        run_in_session, crud_workout_plan.create, build_plan_record(user_id, plan_data, ai_plan)
+    )
+    return plan.id
+
+register_job_handler("workout_plan", run_workout_plan_job)
+
 @router.get("/", response_model=List[WorkoutPlan])
 def get_user_workout_plans(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Получить все планы тренировок пользователя"""
-    return crud_workout_plan.get_by_user_id(db, current_user.id, skip, limit)
+    """Получить планы тренировок пользователя, новые первыми; следующая страница - cursor из заголовка X-Next-Cursor"""
+    plans = crud_workout_plan.get_by_user_id(db, current_user.id, skip, limit, after=parse_cursor(cursor))
+    set_next_cursor(response, plans, limit, "created_at")
+    return plans
 
 @router.get("/{plan_id}", response_model=WorkoutPlan)
 def get_workout_plan(
@@ -35,27 +80,109 @@ def get_workout_plan(
 @router.post("/", response_model=WorkoutPlanResponse)
 async def create_workout_plan(
     plan_data: WorkoutPlanCreateRequest,
+    regenerate: bool = False,
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Создать новый план тренировок с помощью ИИ"""
+    """Создать новый план тренировок с помощью ИИ (regenerate=true - без кэша)"""
     ai_plan = await generate_workout_plan(
         plan_data.user_request,
         plan_data.plan_type,
         plan_data.difficulty,
-        plan_data.duration_minutes
+        plan_data.duration_minutes,
+        regenerate=regenerate,
+        user_id=current_user.id
     )
     
-    plan_data_dict = {
-        "user_request": plan_data.user_request,
-        "plan_type": plan_data.plan_type,
-        "difficulty": plan_data.difficulty,
-        "duration_minutes": plan_data.duration_minutes,
-        "user_id": current_user.id,
-        "ai_generated_plan": ai_plan
-    }
+    plan_data_dict = build_plan_record(current_user.id, plan_data, ai_plan)
     
-    return crud_workout_plan.create(db, plan_data_dict)
+    return await async_crud_workout_plan.create(db, plan_data_dict)
+
+@router.post("/batch", response_model=WorkoutPlanBatchResponse)
+async def create_workout_plans_batch(
+    batch: WorkoutPlanBatchRequest,
+    regenerate: bool = False,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Создать несколько планов за один запрос (например, сплит на неделю).
+    Генерации идут одновременно (не больше AI_BATCH_CONCURRENCY), готовые планы
+    сохраняются одной пакетной вставкой; планы, которые не удалось сгенерировать,
+    возвращаются в errors, остальные сохраняются.
+    """
+    if len(batch.plans) > settings.AI_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"Не больше {settings.AI_BATCH_MAX_ITEMS} планов за запрос")
+
+    user_id = current_user.id
+    semaphore = asyncio.Semaphore(settings.AI_BATCH_CONCURRENCY)
+
+    async def generate(plan_data: WorkoutPlanCreateRequest) -> str:
+        async with semaphore:
+            return await generate_workout_plan(
+                plan_data.user_request,
+                plan_data.plan_type,
+                plan_data.difficulty,
+                plan_data.duration_minutes,
+                regenerate=regenerate,
+                user_id=user_id
+            )
+
+    results = await asyncio.gather(*(generate(plan_data) for plan_data in batch.plans), return_exceptions=True)
+
+    records = []
+    failures = []
+    for index, (plan_data, result) in enumerate(zip(batch.plans, results)):
+        if isinstance(result, BaseException):
+            logger.warning(f"Пакетная генерация: план {index} не создан: {result!r}")
+            failures.append((index, result))
+        else:
+            records.append(build_plan_record(user_id, plan_data, result))
+
+    # Ничего не сгенерировано из-за перегрузки - отвечаем 503 с Retry-After, как одиночный запрос
+    if not records and all(isinstance(error, AdmissionRejected) for _, error in failures):
+        raise failures[0][1]
+
+    plans = await async_crud_workout_plan.create_many(db, records)
+    return WorkoutPlanBatchResponse(
+        plans=[WorkoutPlanResponse.model_validate(plan) for plan in plans],
+        errors=[WorkoutPlanBatchError(index=index, detail=str(error) or type(error).__name__) for index, error in failures]
+    )
+
+@router.post("/stream")
+async def create_workout_plan_stream(
+    plan_data: WorkoutPlanCreateRequest,
+    regenerate: bool = False,
+    current_user = Depends(get_current_user)
+):
+    """Создать план тренировок с потоковой отдачей текста по мере генерации (SSE)"""
+    user_id = current_user.id
+
+    def save_plan(db: Session, ai_plan: str):
+        plan = crud_workout_plan.create(db, build_plan_record(user_id, plan_data, ai_plan))
+        return WorkoutPlanResponse.model_validate(plan).model_dump(mode="json")
+
+    chunks = stream_workout_plan(
+        plan_data.user_request,
+        plan_data.plan_type,
+        plan_data.difficulty,
+        plan_data.duration_minutes,
+        regenerate=regenerate,
+        user_id=user_id
+    )
+    return sse_response(chunks, save_plan)
+
+@router.post("/jobs", response_model=AIJob, status_code=202)
+async def create_workout_plan_job(
+    plan_data: WorkoutPlanCreateRequest,
+    regenerate: bool = False,
+    current_user = Depends(get_current_user)
+):
+    """Поставить генерацию плана в очередь; статус - GET /jobs/{id}, результат - result_id"""
+    return await submit_job("workout_plan", current_user.id, {
+        "request": plan_data.model_dump(),
+        "regenerate": regenerate
+    })
 
 @router.post("/{plan_id}/complete")
 def mark_plan_completed(
@@ -96,7 +223,7 @@ def mark_plan_completed(
     history_entry = crud_workout_history.create(db, history_data)
 
     if not history_entry:
-        print(f"Предупреждение: Не удалось создать запись в истории для плана {plan_id}")
+        logger.warning(f"Не удалось создать запись в истории для плана {plan_id}")
 
     return {
         "is_completed": updated_plan.is_completed,
@@ -20,6 +20,7 @@ class AIInteraction(AIInteractionBase):
     ai_response: str
     model_used: str
     tokens_used: Optional[int] = None
+    latency_ms: Optional[int] = None
     created_at: datetime
     
     class Config:
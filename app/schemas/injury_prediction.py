@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, Optional, Union
 from datetime import datetime
 
 class InjuryPredictionBase(BaseModel):
@@ -17,6 +17,8 @@ class InjuryPredictionResponse(InjuryPredictionBase):
     workout_plan_id: Optional[int]
     workout_plan_name: Optional[str] = None  # Вычисляемое поле, не сохраняется в БД
     ai_risk_prediction: str
+    # Разобранный ответ ИИ: {"user", "summary", "factors", "alternatives"} (старые записи - строка пользователя)
+    risk_factors: Optional[Union[Dict[str, Any], str]] = None
     created_at: datetime
     
     class Config:
@@ -1,6 +1,6 @@
 # app/schemas/workout_plan.py
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
 class WorkoutPlanBase(BaseModel):
@@ -30,4 +30,16 @@ class WorkoutPlanResponse(WorkoutPlanBase):
         from_attributes = True
 
 class WorkoutPlan(WorkoutPlanResponse):
-    pass
\ No newline at end of file
+    pass
+
+class WorkoutPlanBatchRequest(BaseModel):
+    """Несколько планов за один запрос ("сгенерировать неделю")"""
+    plans: List[WorkoutPlanCreateRequest] = Field(..., min_length=1)
+
+class WorkoutPlanBatchError(BaseModel):
+    index: int  # Позиция плана в запросе
+    detail: str
+
+class WorkoutPlanBatchResponse(BaseModel):
+    plans: List[WorkoutPlanResponse]
+    errors: List[WorkoutPlanBatchError] = []
@@ -0,0 +1,236 @@
+# app/services/admission.py
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Классы приоритета: меньше - важнее
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BACKGROUND: "background"}
+
+# Приоритет текущей задачи: HTTP-запросы - interactive, воркеры очереди задач выставляют background
+ai_priority: contextvars.ContextVar[int] = contextvars.ContextVar("ai_priority", default=PRIORITY_INTERACTIVE)
+
+# Границы корзин гистограмм (как у Prometheus: значение попадает во все корзины >= него)
+WAIT_TIME_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+QUEUE_DEPTH_BUCKETS = [0, 1, 2, 5, 10, 20, 50, 100, 200]
+
+
+class AdmissionRejected(Exception):
+    """Запрос к AI не допущен: очередь заполнена или истек срок ожидания"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Histogram:
+    """Кумулятивная гистограмма с фиксированными корзинами"""
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets = {str(bound): count for bound, count in zip(self.buckets, self.counts)}
+        buckets["+Inf"] = self.count
+        return {"buckets": buckets, "count": self.count, "sum": round(self.sum, 4)}
+
+
+class AdmissionController:
+    """
+    Допуск запросов к OpenRouter: общий лимит одновременных вызовов, лимиты на модель
+    и ограниченная очередь ожидания с приоритетами и сроком ожидания у каждого запроса.
+    При переполненной очереди запрос сразу отклоняется (503 + Retry-After),
+    а не становится частью лавины запросов, которая закончится ответами 429.
+    """
+
+    def __init__(self):
+        self._active = 0
+        self._queue: List[list] = []  # Куча [priority, seq, future]
+        self._queued = 0
+        self._seq = itertools.count()
+        self._model_active: Dict[str, int] = {}
+        self._model_waiters: List[asyncio.Future] = []
+        self._avg_hold_time = 1.0
+
+        self.admitted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+        self.preempted = 0
+        self.model_saturated = 0
+        self.peak_active = 0
+        self.peak_queued = 0
+        self.wait_time = {name: Histogram(WAIT_TIME_BUCKETS) for name in PRIORITY_NAMES.values()}
+        self.queue_depth = Histogram(QUEUE_DEPTH_BUCKETS)
+
+    def _queue_timeout(self, priority: int) -> float:
+        if priority == PRIORITY_BACKGROUND:
+            return settings.AI_ADMISSION_BACKGROUND_QUEUE_TIMEOUT_SECONDS
+        return settings.AI_ADMISSION_QUEUE_TIMEOUT_SECONDS
+
+    def _retry_after(self) -> int:
+        # Оценка времени, за которое очередь рассосется при текущей длительности вызовов
+        limit = max(1, settings.AI_ADMISSION_MAX_CONCURRENT)
+        return max(1, math.ceil((self._queued + 1) * self._avg_hold_time / limit))
+
+    async def acquire(self, priority: Optional[int] = None, timeout: Optional[float] = None) -> float:
+        """
+        Занимает общий слот. Возвращает момент допуска (для release).
+        timeout - ограничение ожидания сверх срока очереди (остаток крайнего срока запроса).
+        Бросает AdmissionRejected при переполненной очереди или истечении срока ожидания.
+        """
+        priority = ai_priority.get() if priority is None else priority
+        name = PRIORITY_NAMES.get(priority, "background")
+        started_at = time.monotonic()
+        self.queue_depth.observe(self._queued)
+
+        if self._active < settings.AI_ADMISSION_MAX_CONCURRENT and self._queued == 0:
+            return self._admit(name, started_at)
+
+        if self._queued >= settings.AI_ADMISSION_QUEUE_SIZE and not self._preempt(priority):
+            self.rejected_full += 1
+            raise AdmissionRejected("Очередь запросов к AI переполнена", self._retry_after())
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, [priority, next(self._seq), future])
+        self._queued += 1
+        self.peak_queued = max(self.peak_queued, self._queued)
+        try:
+            queue_timeout = self._queue_timeout(priority)
+            if timeout is not None:
+                queue_timeout = max(0.0, min(queue_timeout, timeout))
+            await asyncio.wait_for(future, timeout=queue_timeout)
+        except asyncio.TimeoutError:
+            self._queued -= 1
+            self.rejected_timeout += 1
+            raise AdmissionRejected("Истек срок ожидания в очереди запросов к AI", self._retry_after())
+        except AdmissionRejected:
+            # Вытеснен из очереди запросом с более высоким приоритетом (счетчик уже уменьшен)
+            raise
+        except asyncio.CancelledError:
+            if future.cancelled() or not future.done():
+                self._queued -= 1
+            elif future.exception() is None:
+                # Слот уже был передан этому запросу - возвращаем его
+                self._release_slot()
+            raise
+        # Слот передан освободившимся запросом, _active не менялся
+        return self._admit(name, started_at, handed_over=True)
+
+    def _admit(self, name: str, started_at: float, handed_over: bool = False) -> float:
+        if not handed_over:
+            self._active += 1
+        self.peak_active = max(self.peak_active, self._active)
+        self.admitted[name] += 1
+        admitted_at = time.monotonic()
+        self.wait_time[name].observe(admitted_at - started_at)
+        return admitted_at
+
+    def _preempt(self, priority: int) -> bool:
+        """Вытесняет из полной очереди самый поздний запрос с более низким приоритетом"""
+        waiting = [entry for entry in self._queue if not entry[2].done()]
+        if not waiting:
+            return False
+        victim = max(waiting, key=lambda entry: (entry[0], entry[1]))
+        if victim[0] <= priority:
+            return False
+        self._queued -= 1
+        self.preempted += 1
+        victim[2].set_exception(AdmissionRejected("Запрос вытеснен из очереди более приоритетным", self._retry_after()))
+        return True
+
+    def release(self, admitted_at: float):
+        """Освобождает общий слот и передает его следующему в очереди"""
+        alpha = 0.2
+        self._avg_hold_time = alpha * (time.monotonic() - admitted_at) + (1 - alpha) * self._avg_hold_time
+        self._release_slot()
+
+    def _release_slot(self):
+        while self._queue:
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                self._queued -= 1
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def try_acquire_model(self, model_name: str) -> bool:
+        """Занимает слот модели без ожидания. False - модель загружена до предела"""
+        limit = settings.AI_ADMISSION_MODEL_LIMITS.get(model_name, settings.AI_ADMISSION_MODEL_MAX_CONCURRENT)
+        active = self._model_active.get(model_name, 0)
+        if active >= limit:
+            self.model_saturated += 1
+            return False
+        self._model_active[model_name] = active + 1
+        return True
+
+    async def acquire_any_model(self, model_names: List[str], timeout: float) -> Optional[str]:
+        """Ждет освобождения слота любой из моделей (все модели загружены). None - не дождались"""
+        deadline = time.monotonic() + timeout
+        while True:
+            for model_name in model_names:
+                if self.try_acquire_model(model_name):
+                    return model_name
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            waiter = asyncio.get_running_loop().create_future()
+            self._model_waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, timeout=remaining)
+            except asyncio.TimeoutError:
+                return None
+            finally:
+                if waiter in self._model_waiters:
+                    self._model_waiters.remove(waiter)
+
+    def release_model(self, model_name: str):
+        self._model_active[model_name] = max(0, self._model_active.get(model_name, 0) - 1)
+        waiters, self._model_waiters = self._model_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Состояние допуска и гистограммы для планирования мощности"""
+        return {
+            "max_concurrent": settings.AI_ADMISSION_MAX_CONCURRENT,
+            "model_max_concurrent": settings.AI_ADMISSION_MODEL_MAX_CONCURRENT,
+            "queue_size": settings.AI_ADMISSION_QUEUE_SIZE,
+            "active": self._active,
+            "queued": self._queued,
+            "peak_active": self.peak_active,
+            "peak_queued": self.peak_queued,
+            "model_active": {name: count for name, count in self._model_active.items() if count},
+            "admitted": self.admitted,
+            "rejected_full": self.rejected_full,
+            "rejected_timeout": self.rejected_timeout,
+            "preempted": self.preempted,
+            "model_saturated": self.model_saturated,
+            "avg_hold_time_seconds": round(self._avg_hold_time, 3),
+            "wait_time_seconds": {name: histogram.to_dict() for name, histogram in self.wait_time.items()},
+            "queue_depth": self.queue_depth.to_dict(),
+        }
+
+
+# Общий контроллер допуска запросов к OpenRouter
+admission_controller = AdmissionController()
@@ -0,0 +1,185 @@
+# app/services/ai_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List, Set, Tuple
+
+from app.config import settings
+from app.crud import crud_ai_response_cache
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Нормализует промпт: схлопывает пробелы и переводы строк"""
+    return _WHITESPACE_RE.sub(" ", prompt).strip()
+
+
+def make_cache_key(prompt: str, models: List[str], max_tokens: int, temperature: float) -> str:
+    """Ключ кэша: sha256 от нормализованного промпта, моделей и параметров сэмплирования"""
+    payload = json.dumps(
+        {
+            "prompt": normalize_prompt(prompt),
+            "models": models,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+        },
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Двухуровневый кэш ответов AI:
+    1 уровень - ограниченный LRU в памяти процесса с TTL,
+    2 уровень - таблица ai_response_cache в Postgres, общая для всех воркеров.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, db_enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_enabled = db_enabled
+        self._entries: "OrderedDict[str, Tuple[float, str, str]]" = OrderedDict()
+        self._pending_writes: Set[asyncio.Task] = set()
+
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.writes = 0
+        self.bypasses = 0
+        self.db_errors = 0
+
+    def is_enabled_for(self, endpoint: Optional[str]) -> bool:
+        """Проверяет, включен ли кэш для эндпоинта"""
+        if not settings.AI_CACHE_ENABLED or not endpoint:
+            return False
+        enabled = {name.strip() for name in settings.AI_CACHE_ENDPOINTS.split(",") if name.strip()}
+        return endpoint in enabled
+
+    def _get_memory(self, key: str) -> Optional[Tuple[str, str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, model_used, response = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return model_used, response
+
+    def _set_memory(self, key: str, model_used: str, response: str, ttl_seconds: float):
+        self._entries[key] = (time.monotonic() + ttl_seconds, model_used, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _get_db(self, key: str) -> Optional[Tuple[str, str, datetime]]:
+        db = SessionLocal()
+        try:
+            entry = crud_ai_response_cache.get_valid(db, key)
+            if entry is None:
+                return None
+            return entry.model_used, entry.response, entry.expires_at
+        finally:
+            db.close()
+
+    def _set_db(self, key: str, endpoint: Optional[str], model_used: str, response: str):
+        db = SessionLocal()
+        try:
+            expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+            crud_ai_response_cache.upsert(db, key, endpoint, model_used, response, expires_at)
+        finally:
+            db.close()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Ищет ответ сначала в памяти, затем в Postgres"""
+        cached = self._get_memory(key)
+        if cached is not None:
+            self.memory_hits += 1
+            logger.info(f"Кэш AI: попадание в памяти (модель {cached[0]})")
+            return cached[1]
+
+        if self.db_enabled:
+            try:
+                # Синхронная сессия выполняется в пуле потоков, чтобы не блокировать event loop
+                row = await asyncio.to_thread(self._get_db, key)
+            except Exception as e:
+                self.db_errors += 1
+                logger.warning(f"Кэш AI: ошибка чтения из БД: {e}")
+                row = None
+            if row is not None:
+                model_used, response, expires_at = row
+                self.db_hits += 1
+                # Прогреваем локальный уровень на оставшееся время жизни записи
+                remaining = (expires_at - datetime.utcnow()).total_seconds()
+                if remaining > 0:
+                    self._set_memory(key, model_used, response, remaining)
+                logger.info(f"Кэш AI: попадание в БД (модель {model_used})")
+                return response
+
+        self.misses += 1
+        return None
+
+    async def _write_db(self, key: str, endpoint: Optional[str], model_used: str, response: str):
+        try:
+            await asyncio.to_thread(self._set_db, key, endpoint, model_used, response)
+        except Exception as e:
+            self.db_errors += 1
+            logger.warning(f"Кэш AI: ошибка записи в БД: {e}")
+
+    def set(self, key: str, endpoint: Optional[str], model_used: str, response: str):
+        """Сохраняет ответ в памяти; запись в Postgres идет в фоне, не задерживая ответ"""
+        self._set_memory(key, model_used, response, self.ttl_seconds)
+        self.writes += 1
+        if self.db_enabled:
+            task = asyncio.create_task(self._write_db(key, endpoint, model_used, response))
+            self._pending_writes.add(task)
+            task.add_done_callback(self._pending_writes.discard)
+
+    def clear_memory(self):
+        """Очищает локальный уровень кэша"""
+        self._entries.clear()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Возвращает счетчики кэша"""
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": settings.AI_CACHE_ENABLED,
+            "db_enabled": self.db_enabled,
+            "endpoints": settings.AI_CACHE_ENDPOINTS,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "writes": self.writes,
+            "bypasses": self.bypasses,
+            "db_errors": self.db_errors,
+        }
+
+
+# Общий экземпляр кэша
+ai_response_cache = ResponseCache(
+    max_entries=settings.AI_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.AI_CACHE_TTL_SECONDS,
+    db_enabled=settings.AI_CACHE_DB_ENABLED,
+)
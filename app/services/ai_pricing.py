@@ -0,0 +1,59 @@
+# app/services/ai_pricing.py
+from typing import Dict, Any, Optional, Tuple
+
+from app.config import settings
+from app.services.prompts import estimate_tokens
+
+# Цены OpenRouter, USD за 1M токенов (вход, выход).
+# Актуальные значения: https://openrouter.ai/models, переопределяются через AI_MODEL_PRICES
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "amazon/nova-2-lite-v1:free": (0.0, 0.0),
+    "deepseek/deepseek-chat-v3.1": (0.20, 0.80),
+    "qwen/qwen3-235b-a22b-thinking-2507": (0.11, 0.60),
+    "deepseek/deepseek-chat-v3-0324": (0.24, 0.84),
+    "nex-agi/deepseek-v3.1-nex-n1:free": (0.0, 0.0),
+}
+
+# Цена для моделей, которых нет в таблице
+DEFAULT_PRICE: Tuple[float, float] = (0.14, 0.28)
+
+
+def get_model_price(model_name: str) -> Tuple[float, float]:
+    """Цена модели (вход, выход) в USD за 1M токенов"""
+    override = settings.AI_MODEL_PRICES.get(model_name)
+    if override:
+        return float(override[0]), float(override[1])
+    if model_name in MODEL_PRICES:
+        return MODEL_PRICES[model_name]
+    if model_name.endswith(":free"):
+        return 0.0, 0.0
+    return DEFAULT_PRICE
+
+
+def calculate_cost_rub(model_name: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Стоимость запроса в рублях по числу токенов"""
+    input_price, output_price = get_model_price(model_name)
+    cost_usd = (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    return cost_usd * settings.AI_USD_RUB_RATE
+
+
+def estimate_cost_rub(model_name: str, prompt: str, max_tokens: int) -> float:
+    """
+    Верхняя оценка стоимости до запроса (для резервирования бюджета):
+    ответ считается максимальной длины max_tokens
+    """
+    return calculate_cost_rub(model_name, estimate_tokens(prompt), max_tokens)
+
+
+def usage_cost_rub(model_name: str, usage: Optional[Dict[str, Any]], prompt: str, response: str) -> float:
+    """
+    Фактическая стоимость по полю usage ответа OpenRouter.
+    Если usage не пришел, считаем по длине текста.
+    """
+    if usage and (usage.get("prompt_tokens") or usage.get("completion_tokens")):
+        return calculate_cost_rub(
+            model_name,
+            usage.get("prompt_tokens") or 0,
+            usage.get("completion_tokens") or 0
+        )
+    return calculate_cost_rub(model_name, estimate_tokens(prompt), estimate_tokens(response))
@@ -1,31 +1,53 @@
 # app/services/ai_service.py
 import os
+import asyncio
+import time
 import httpx
-from typing import Dict, Any
+from collections import deque
+from typing import AsyncIterator, Callable, Dict, Any, List, NamedTuple, Optional, Tuple
 import json
 import logging
-from datetime import datetime, date
+from datetime import datetime
 from app.config import settings
-
-# Настройка логирования
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('ai_service.log'),
-        logging.StreamHandler()
-    ]
+from app.services.http_client import ai_http_client
+from app.services.ai_cache import ai_response_cache, make_cache_key
+from app.services.singleflight import ai_single_flight
+from app.services.model_health import ModelHealthRegistry
+from app.services.budget_ledger import budget_ledger, BudgetReservation
+from app.services.ai_pricing import estimate_cost_rub, usage_cost_rub
+from app.services.admission import admission_controller, AdmissionRejected
+from app.services.interaction_log import interaction_log
+from app.services.offline_engine import offline_engine
+from app.services.semantic_cache import LOCAL_SOURCES, semantic_cache
+from app.services.deadline import ai_deadline, deadline_remaining, deadline_expired
+from app.services.prompts import (
+    WORKOUT_PLAN, EXERCISE_RECOMMENDATIONS, WEEKLY_CHALLENGE, INJURY_RISK, get_prompt_statistics
 )
 
 logger = logging.getLogger(__name__)
 
+BUDGET_EXCEEDED_MESSAGE = "Дневной лимит запросов исчерпан. Попробуйте завтра или обратитесь к администратору."
+
+
+# Локальный генератор ответа для резервного режима (офлайн-движок с данными запроса)
+OfflineFallback = Callable[[], str]
+
+# Запас ожидания общего вызова сверх крайнего срока: ведущий запрос сам отвечает резервным режимом точно в срок
+DEADLINE_GRACE_SECONDS = 0.25
+
+
+class AIResult(NamedTuple):
+    """Ответ AI и его источник: модель OpenRouter, cache, semantic_cache, offline, demo или budget"""
+    content: str
+    model_used: str
+    tokens_used: Optional[int] = None
+
+
 class AIService:
     def __init__(self):
         self.api_key = settings.OPENROUTER_API_KEY
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.daily_usage = 0.0
-        self.daily_budget_rub = 100.0  # Дневной лимит 100 рублей
-        self.last_reset_date = date.today()
+        self.base_url = settings.OPENROUTER_BASE_URL
+        self.temperature = 0.7
 
         # Список моделей для фолбэка
         self.model_list = [
@@ -36,141 +58,681 @@ class AIService:
             "nex-agi/deepseek-v3.1-nex-n1:free",
             
         ]
+
+        # Здоровье моделей: порядок перебора и предохранители
+        self.model_health = ModelHealthRegistry(self.model_list)
+
+        # Задержки успешных ответов для расчета порога хеджирования
+        self._latencies = deque(maxlen=settings.AI_HEDGE_LATENCY_WINDOW)
+        self.hedges_launched = 0
+        self.hedge_wins = 0
+        self.cancelled_attempts = 0
+
+        # Крайний срок запроса: ответы резервным режимом и пропущенные попытки
+        self.deadline_exceeded = 0
+        self.deadline_skipped_attempts = 0
         
-    def _check_and_reset_daily_usage(self):
-        """Проверяет и сбрасывает дневной счетчик если сменилась дата"""
-        today = date.today()
-        if today != self.last_reset_date:
-            logger.info(f"Сброс дневного использования. Было: {self.daily_usage} руб.")
-            self.daily_usage = 0.0
-            self.last_reset_date = today
-    
-    def _calculate_estimated_cost(self, prompt: str, response: str = "") -> float:
+    async def _make_ai_request(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        endpoint: Optional[str] = None,
+        use_cache: bool = True,
+        system_prompt: Optional[str] = None,
+        user_id: Optional[int] = None,
+        fallback: Optional[OfflineFallback] = None,
+        similarity_key: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> str:
         """
-        Расчет примерной стоимости запроса
+        Базовый метод для запросов к OpenRouter API с контролем бюджета и фолбэком.
+        endpoint - имя эндпоинта для настроек кэша, use_cache=False - принудительная
+        перегенерация (кэш не читается, но обновляется свежим ответом).
+        system_prompt - статическая часть промпта, отправляется отдельным системным сообщением.
+        user_id - пользователь, от имени которого идет запрос (для журнала ai_interactions).
+        fallback - офлайн-генерация ответа, если нет ключа, исчерпан бюджет или все модели недоступны.
+        similarity_key - текст для семантического кэша: на почти такой же запрос отдается сохраненный ответ.
+        deadline - крайний срок (time.monotonic()) на всю цепочку моделей; по умолчанию - срок текущего
+        HTTP-запроса или задачи. Каждая попытка получает только оставшееся время, после срока - резервный ответ.
         """
-        # Упрощенный расчет для демо-целей
-        input_chars = len(prompt)
-        output_chars = len(response) if response else 1000
-        
-        # Примерная оценка: 1 токен ≈ 2 символа на русском
-        input_tokens = input_chars / 2
-        output_tokens = output_chars / 2
-        
-        # Условная стоимость (для бесплатных моделей можно поставить 0.0)
-        input_cost = (input_tokens / 1_000_000) * 0.14
-        output_cost = (output_tokens / 1_000_000) * 0.28
+        result = await self._make_ai_request_result(
+            prompt, max_tokens, endpoint, use_cache, system_prompt, user_id, fallback, similarity_key, deadline
+        )
+        return result.content
+
+    async def _make_ai_request_result(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        endpoint: Optional[str] = None,
+        use_cache: bool = True,
+        system_prompt: Optional[str] = None,
+        user_id: Optional[int] = None,
+        fallback: Optional[OfflineFallback] = None,
+        similarity_key: Optional[str] = None,
+        deadline: Optional[float] = None
+    ) -> AIResult:
+        """То же, что _make_ai_request, но вместе с источником ответа (модель, cache, offline, demo, budget)"""
+        started_at = time.monotonic()
+        token = ai_deadline.set(deadline) if deadline is not None else None
+        try:
+            result = await self._generate(prompt, max_tokens, endpoint, use_cache, system_prompt, fallback, similarity_key)
+        finally:
+            if token is not None:
+                ai_deadline.reset(token)
+        # Запись в журнал только ставится в очередь - пишет фоновый писатель пачками
+        interaction_log.record(
+            user_id, endpoint, prompt, _join_prompt(system_prompt, prompt),
+            result.content, result.model_used, result.tokens_used, time.monotonic() - started_at
+        )
+        return result
+
+    async def _generate(
+        self,
+        prompt: str,
+        max_tokens: int,
+        endpoint: Optional[str],
+        use_cache: bool,
+        system_prompt: Optional[str],
+        fallback: Optional[OfflineFallback] = None,
+        similarity_key: Optional[str] = None
+    ) -> AIResult:
+        """Кэш, объединение одинаковых запросов и запрос к OpenRouter"""
+        full_prompt = _join_prompt(system_prompt, prompt)
+
+        # Если API ключ не установлен - отвечаем локально
+        if not self.api_key:
+            logger.warning("OpenRouter API ключ не установлен, используем резервный режим")
+            return self._degraded_response(full_prompt, fallback)
         
-        total_cost_usd = input_cost + output_cost
+        # Отпечаток запроса: ключ кэша и ключ объединения одинаковых запросов
+        fingerprint = make_cache_key(full_prompt, self.model_list, max_tokens, self.temperature)
         
-        # Конвертация в рубли
-        exchange_rate = 90.0
-        total_cost_rub = total_cost_usd * exchange_rate
+        # Кэш ответов: одинаковые запросы не тратят бюджет и время на OpenRouter
+        cache_key = None
+        if ai_response_cache.is_enabled_for(endpoint):
+            cache_key = fingerprint
+            if use_cache:
+                cached_response = await ai_response_cache.get(cache_key)
+                if cached_response is not None:
+                    return AIResult(cached_response, "cache")
+            else:
+                ai_response_cache.bypasses += 1
+
+        # Семантический кэш: на почти такой же запрос уже отвечала модель
+        use_semantic_cache = bool(similarity_key) and settings.AI_SEMANTIC_CACHE_ENABLED
+        if use_semantic_cache and use_cache:
+            similar_response = semantic_cache.lookup(endpoint, similarity_key)
+            if similar_response is not None:
+                return AIResult(similar_response, "semantic_cache")
         
-        return total_cost_rub
+        if deadline_expired():
+            return self._deadline_response(full_prompt, fallback)
+
+        # Одновременные одинаковые запросы ждут один общий вызов OpenRouter
+        # (общий вызов живет по сроку первого запроса, остальные ждут не дольше своего срока)
+        call = ai_single_flight.do(
+            fingerprint,
+            lambda: self._request_with_fallback(prompt, max_tokens, endpoint, cache_key, system_prompt, fallback)
+        )
+        remaining = deadline_remaining()
+        try:
+            result = await (call if remaining is None else asyncio.wait_for(call, remaining + DEADLINE_GRACE_SECONDS))
+        except asyncio.TimeoutError:
+            return self._deadline_response(full_prompt, fallback)
+        if use_semantic_cache and result.model_used not in LOCAL_SOURCES:
+            semantic_cache.add(endpoint, similarity_key, result.content)
+        return result
     
-    async def _make_ai_request(self, prompt: str, max_tokens: int = 4000) -> str:
-        """
-        Базовый метод для запросов к OpenRouter API с контролем бюджета и фолбэком
-        """
-        # Проверяем и сбрасываем дневной счетчик если нужно
-        self._check_and_reset_daily_usage()
-        
-        # Если API ключ не установлен - возвращаем демо-данные
-        if not self.api_key:
-            logger.warning("OpenRouter API ключ не установлен, используем демо-режим")
-            return self._get_demo_response(prompt)
-        
-        # Проверяем дневной лимит
-        estimated_cost = self._calculate_estimated_cost(prompt)
-        if self.daily_usage + estimated_cost > self.daily_budget_rub:
-            logger.warning(f"Дневной лимит превышен. Использовано: {self.daily_usage:.4f} руб., Лимит: {self.daily_budget_rub} руб.")
-            return "Дневной лимит запросов исчерпан. Попробуйте завтра или обратитесь к администратору."
-
-        # Цикл по списку моделей
-        for model_name in self.model_list:
-            try:
-                logger.info(f"Попытка запроса к модели: {model_name}")
-                response_content = await self._make_single_request(prompt, max_tokens, model_name)
-                
-                # Если запрос удался, возвращаем результат
-                actual_cost = self._calculate_estimated_cost(prompt, response_content)
-                self.daily_usage += actual_cost
-                logger.info(
-                    f"Успешный ответ от модели {model_name}. "
-                    f"Условная стоимость: {actual_cost:.4f} руб., "
-                    f"дневной итог: {self.daily_usage:.4f} руб."
+    async def _request_with_fallback(
+        self,
+        prompt: str,
+        max_tokens: int,
+        endpoint: Optional[str],
+        cache_key: Optional[str],
+        system_prompt: Optional[str] = None,
+        fallback: Optional[OfflineFallback] = None
+    ) -> AIResult:
+        """Запрос к OpenRouter через контроль допуска (общий слот на все попытки запроса)"""
+        # AdmissionRejected (очередь переполнена) пробрасывается наружу и превращается в 503,
+        # но если в очереди истек крайний срок запроса - отвечаем резервным режимом
+        try:
+            admitted_at = await admission_controller.acquire(timeout=deadline_remaining())
+        except AdmissionRejected:
+            if deadline_expired():
+                return self._deadline_response(_join_prompt(system_prompt, prompt), fallback)
+            raise
+        try:
+            return await self._run_attempts(prompt, max_tokens, endpoint, cache_key, system_prompt, fallback)
+        finally:
+            admission_controller.release(admitted_at)
+
+    async def _run_attempts(
+        self,
+        prompt: str,
+        max_tokens: int,
+        endpoint: Optional[str],
+        cache_key: Optional[str],
+        system_prompt: Optional[str],
+        fallback: Optional[OfflineFallback] = None
+    ) -> AIResult:
+        """Перебор моделей с резервированием бюджета и хеджированием"""
+        full_prompt = _join_prompt(system_prompt, prompt)
+
+        # Перебор моделей с хеджированием: если текущая модель не ответила за
+        # перцентиль задержки, параллельно запускаем следующую и берем первый ответ
+        max_concurrent = max(1, settings.AI_HEDGE_MAX_CONCURRENT) if settings.AI_HEDGING_ENABLED else 1
+        # Быстрые здоровые модели первыми, модели с открытым предохранителем пропускаются
+        models = deque(self.model_health.get_ordered_models())
+        # Модели, упершиеся в свой лимит одновременных вызовов - пробуем их последними
+        saturated: List[str] = []
+        attempts: Dict[asyncio.Task, tuple] = {}
+        budget_exceeded = False
+        deadline_reached = False
+
+        async def launch_next() -> bool:
+            nonlocal budget_exceeded, deadline_reached
+            # Не запускаем модель, которой не хватит оставшегося до крайнего срока времени
+            if deadline_expired(settings.AI_DEADLINE_MIN_ATTEMPT_SECONDS):
+                if models or saturated:
+                    self.deadline_skipped_attempts += 1
+                    deadline_reached = True
+                return False
+            model_name = self._take_admitted_model(models, saturated)
+            if model_name is None and saturated and not any(not task.done() for task in attempts):
+                # Все оставшиеся модели загружены, а ждать больше нечего - ждем слот любой из них
+                model_name = await admission_controller.acquire_any_model(
+                    saturated, _wait_timeout(settings.AI_ADMISSION_QUEUE_TIMEOUT_SECONDS)
                 )
-                return response_content
-
-            except httpx.TimeoutException:
-                logger.warning(f"Таймаут запроса к модели {model_name}")
-                continue
-            except httpx.HTTPStatusError as e:
-                status_code = e.response.status_code
-                if status_code == 429 or 500 <= status_code < 600:
-                    logger.warning(f"HTTP ошибка от модели {model_name}: {status_code}")
+                if model_name is not None:
+                    saturated.remove(model_name)
+            if model_name is None:
+                return False
+            # Каждая попытка (включая хедж) резервирует верхнюю оценку своей стоимости
+            reservation = await self._reserve_budget(model_name, full_prompt, max_tokens)
+            if reservation is None:
+                admission_controller.release_model(model_name)
+                budget_exceeded = True
+                models.clear()
+                saturated.clear()
+                return False
+            if attempts:
+                self.hedges_launched += 1
+                logger.info(f"Хеджирование: параллельный запрос к модели {model_name}")
+            else:
+                logger.info(f"Попытка запроса к модели: {model_name}")
+            self.model_health.on_attempt(model_name)
+            task = asyncio.create_task(self._admitted_request(prompt, max_tokens, model_name, system_prompt))
+            attempts[task] = (model_name, time.monotonic(), len(attempts) > 0, reservation)
+            return True
+
+        await launch_next()
+        try:
+            while attempts:
+                pending = [task for task in attempts if not task.done()]
+                can_hedge = bool(models or saturated) and len(pending) < max_concurrent
+                # Попытки получают только оставшееся до крайнего срока время
+                remaining = deadline_remaining()
+                timeout = self._get_hedge_delay() if can_hedge else None
+                if remaining is not None:
+                    timeout = max(0.0, remaining if timeout is None else min(timeout, remaining))
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    if deadline_expired():
+                        # Срок истек - незавершенные попытки отменяются в finally
+                        deadline_reached = True
+                        break
+                    # Порог задержки истек - запускаем хедж
+                    await launch_next()
                     continue
+
+                for task in done:
+                    model_name, started_at, is_hedge, reservation = attempts.pop(task)
+                    try:
+                        response_content, usage = task.result()
+                    except Exception as e:
+                        budget_ledger.release(reservation)
+                        self._record_failure(model_name, e)
+                        continue
+
+                    if is_hedge:
+                        self.hedge_wins += 1
+
+                    # Бюджет списывается по фактическим токенам завершенного запроса
+                    self._record_success(
+                        model_name, full_prompt, response_content, usage, reservation,
+                        time.monotonic() - started_at, endpoint, cache_key
+                    )
+                    return AIResult(response_content, model_name, usage.get("total_tokens"))
+
+                # Неудачная попытка сразу заменяется следующей моделью
+                if len([t for t in attempts if not t.done()]) < max_concurrent:
+                    await launch_next()
+        finally:
+            # Отменяем проигравшие запросы и возвращаем их резерв
+            for task, (model_name, _, _, reservation) in attempts.items():
+                if not task.done():
+                    task.cancel()
+                    self.cancelled_attempts += 1
+                    self.model_health.on_cancel(model_name)
+                    budget_ledger.release(reservation)
+                elif not task.cancelled() and task.exception() is None:
+                    # Проигравший хедж успел ответить - его токены тоже оплачены
+                    loser_content, loser_usage = task.result()
+                    budget_ledger.commit(reservation, usage_cost_rub(model_name, loser_usage, full_prompt, loser_content))
                 else:
-                    logger.warning(f"HTTP ошибка от модели {model_name}: {status_code}")
-                    continue
-            except Exception as e:
-                logger.warning(f"Ошибка при запросе к модели {model_name}: {e}")
-                continue
+                    budget_ledger.release(reservation)
+
+        if budget_exceeded:
+            if self._offline_available(fallback):
+                logger.warning("Дневной AI-бюджет исчерпан, отвечаем офлайн-генератором")
+                return self._degraded_response(full_prompt, fallback)
+            return AIResult(BUDGET_EXCEEDED_MESSAGE, "budget")
+
+        if deadline_reached:
+            return self._deadline_response(full_prompt, fallback)
 
         # Если все модели не сработали
-        logger.error("Все попытки запросов к моделям OpenRouter не увенчались успехом. Используем демо-режим.")
-        return self._get_demo_response(prompt)
+        logger.error("Все попытки запросов к моделям OpenRouter не увенчались успехом. Используем резервный режим.")
+        return self._degraded_response(full_prompt, fallback)
+
+    def _deadline_response(self, full_prompt: str, fallback: Optional[OfflineFallback]) -> AIResult:
+        """Крайний срок запроса истек - отвечаем сразу, не запуская новых моделей"""
+        self.deadline_exceeded += 1
+        logger.warning("Крайний срок AI-запроса истек, используем резервный режим")
+        return self._degraded_response(full_prompt, fallback)
+
+    def _offline_available(self, fallback: Optional[OfflineFallback]) -> bool:
+        return fallback is not None and settings.AI_OFFLINE_FALLBACK_ENABLED
+
+    def _degraded_response(self, full_prompt: str, fallback: Optional[OfflineFallback]) -> AIResult:
+        """Ответ без OpenRouter: офлайн-генератор по данным запроса, иначе демо-заглушка"""
+        if self._offline_available(fallback):
+            return AIResult(fallback(), "offline")
+        return AIResult(self._get_demo_response(full_prompt), "demo")
     
-    async def _make_single_request(self, prompt: str, max_tokens: int, model_name: str) -> str:
-        """Выполняет один запрос к указанной модели."""
-        headers = {
+    def _take_admitted_model(self, models: deque, saturated: List[str]) -> Optional[str]:
+        """Следующая модель по рангу, у которой есть свободный слот; загруженные откладываются"""
+        while models:
+            model_name = models.popleft()
+            if admission_controller.try_acquire_model(model_name):
+                return model_name
+            saturated.append(model_name)
+        return None
+
+    async def _admitted_request(
+        self,
+        prompt: str,
+        max_tokens: int,
+        model_name: str,
+        system_prompt: Optional[str]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Запрос к модели, занявшей слот; слот освобождается при любом исходе"""
+        try:
+            return await self._make_single_request(prompt, max_tokens, model_name, system_prompt)
+        finally:
+            admission_controller.release_model(model_name)
+
+    async def _reserve_budget(self, model_name: str, prompt: str, max_tokens: int) -> Optional[BudgetReservation]:
+        """Резервирует бюджет под попытку запроса к модели. None - дневной лимит исчерпан"""
+        return await budget_ledger.reserve(estimate_cost_rub(model_name, prompt, max_tokens))
+
+    def _record_success(
+        self,
+        model_name: str,
+        prompt: str,
+        response_content: str,
+        usage: Optional[Dict[str, Any]],
+        reservation: BudgetReservation,
+        latency: float,
+        endpoint: Optional[str],
+        cache_key: Optional[str]
+    ):
+        """Учет успешного ответа: задержка, здоровье модели, бюджет и кэш"""
+        self._latencies.append(latency)
+        self.model_health.on_success(model_name, latency)
+
+        actual_cost = usage_cost_rub(model_name, usage, prompt, response_content)
+        budget_ledger.commit(reservation, actual_cost)
+        logger.info(
+            f"Успешный ответ от модели {model_name}. "
+            f"Стоимость: {actual_cost:.4f} руб. (резерв: {reservation.amount:.4f} руб.)"
+        )
+        if cache_key is not None:
+            ai_response_cache.set(cache_key, endpoint, model_name, response_content)
+
+    def _record_failure(self, model_name: str, error: Exception):
+        """Учет неудачной попытки: лог и здоровье модели"""
+        self._log_model_failure(model_name, error)
+        status_code = error.response.status_code if isinstance(error, httpx.HTTPStatusError) else None
+        self.model_health.on_failure(model_name, status_code)
+
+    def _log_model_failure(self, model_name: str, error: Exception):
+        """Логирует неудачную попытку запроса к модели"""
+        if isinstance(error, httpx.TimeoutException):
+            logger.warning(f"Таймаут запроса к модели {model_name}")
+        elif isinstance(error, httpx.HTTPStatusError):
+            logger.warning(f"HTTP ошибка от модели {model_name}: {error.response.status_code}")
+        else:
+            logger.warning(f"Ошибка при запросе к модели {model_name}: {error}")
+
+    def _get_hedge_delay(self) -> float:
+        """Порог хеджирования: перцентиль задержки последних успешных ответов"""
+        if len(self._latencies) < 10:
+            return settings.AI_HEDGE_DEFAULT_DELAY_SECONDS
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * settings.AI_HEDGE_LATENCY_PERCENTILE))
+        return max(settings.AI_HEDGE_MIN_DELAY_SECONDS, ordered[index])
+
+    def get_deadline_statistics(self) -> Dict[str, Any]:
+        """Статистика крайних сроков запросов"""
+        return {
+            "header": settings.AI_DEADLINE_HEADER,
+            "default_seconds": settings.AI_DEADLINE_SECONDS,
+            "routes": settings.AI_DEADLINE_ROUTES,
+            "min_attempt_seconds": settings.AI_DEADLINE_MIN_ATTEMPT_SECONDS,
+            "deadline_exceeded": self.deadline_exceeded,
+            "skipped_attempts": self.deadline_skipped_attempts,
+        }
+
+    def get_hedging_statistics(self) -> Dict[str, Any]:
+        """Возвращает статистику хеджирования запросов"""
+        return {
+            "enabled": settings.AI_HEDGING_ENABLED,
+            "max_concurrent": settings.AI_HEDGE_MAX_CONCURRENT,
+            "latency_percentile": settings.AI_HEDGE_LATENCY_PERCENTILE,
+            "current_delay_seconds": round(self._get_hedge_delay(), 3),
+            "latency_samples": len(self._latencies),
+            "hedges_launched": self.hedges_launched,
+            "hedge_wins": self.hedge_wins,
+            "cancelled_attempts": self.cancelled_attempts
+        }
+
+    def _build_headers(self) -> Dict[str, str]:
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "HTTP-Referer": "http://localhost:8000",
             "X-Title": "FitAI App"
         }
 
-        data = {
+    def _build_payload(
+        self,
+        prompt: str,
+        max_tokens: int,
+        model_name: str,
+        system_prompt: Optional[str] = None
+    ) -> Dict[str, Any]:
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            # Системное сообщение одинаково для всех запросов шаблона - общий префикс для кэша провайдера
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        return {
             "model": model_name,
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": messages,
             "max_tokens": max_tokens,
-            "temperature": 0.7
+            "temperature": self.temperature
         }
 
-        async with httpx.AsyncClient() as client:
-            logger.info(f"Отправка запроса к OpenRouter API. Модель: {model_name}. Длина промпта: {len(prompt)} символов")
-            response = await client.post(self.base_url, headers=headers, json=data, timeout=30.0)
-            response.raise_for_status()
-            result = response.json()
+    async def _make_single_request(
+        self,
+        prompt: str,
+        max_tokens: int,
+        model_name: str,
+        system_prompt: Optional[str] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Выполняет один запрос к указанной модели. Возвращает текст ответа и usage (токены)"""
+        headers = self._build_headers()
+        data = self._build_payload(prompt, max_tokens, model_name, system_prompt)
+
+        # Используем общий пул соединений (keep-alive, HTTP/2) вместо нового клиента на каждый запрос
+        logger.info(f"Отправка запроса к OpenRouter API. Модель: {model_name}. Длина промпта: {len(prompt)} символов")
+        response = await ai_http_client.post(self.base_url, headers=headers, json=data)
+        response.raise_for_status()
+        result = response.json()
+
+        usage = result.get('usage', {})
+        prompt_tokens = usage.get('prompt_tokens', 0)
+        completion_tokens = usage.get('completion_tokens', 0)
+        total_tokens = usage.get('total_tokens', 0)
 
-            usage = result.get('usage', {})
-            prompt_tokens = usage.get('prompt_tokens', 0)
-            completion_tokens = usage.get('completion_tokens', 0)
-            total_tokens = usage.get('total_tokens', 0)
+        logger.info(
+            f"OpenRouter API (модель {model_name}): использовано токенов - {total_tokens} "
+            f"(вход: {prompt_tokens}, выход: {completion_tokens})"
+        )
+
+        return result["choices"][0]["message"]["content"], usage
+
+    async def _stream_single_request(
+        self,
+        prompt: str,
+        max_tokens: int,
+        model_name: str,
+        usage_out: Optional[Dict[str, Any]] = None,
+        system_prompt: Optional[str] = None,
+        time_limit: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Потоковый запрос к модели (stream=true): отдает фрагменты текста по мере генерации.
+        usage из последнего события потока записывается в usage_out.
+        time_limit - остаток крайнего срока: ограничивает ожидание соединения и каждого чтения.
+        """
+        headers = self._build_headers()
+        data = self._build_payload(prompt, max_tokens, model_name, system_prompt)
+        data["stream"] = True
+        data["stream_options"] = {"include_usage": True}
 
-            logger.info(
-                f"OpenRouter API (модель {model_name}): использовано токенов - {total_tokens} "
-                f"(вход: {prompt_tokens}, выход: {completion_tokens})"
+        logger.info(f"Потоковый запрос к OpenRouter API. Модель: {model_name}. Длина промпта: {len(prompt)} символов")
+        request_kwargs: Dict[str, Any] = {}
+        if time_limit is not None:
+            request_kwargs["timeout"] = httpx.Timeout(
+                connect=min(settings.AI_HTTP_CONNECT_TIMEOUT, time_limit),
+                read=min(settings.AI_HTTP_READ_TIMEOUT, time_limit),
+                write=settings.AI_HTTP_WRITE_TIMEOUT,
+                pool=min(settings.AI_HTTP_POOL_TIMEOUT, time_limit)
             )
+        async with ai_http_client.stream("POST", self.base_url, headers=headers, json=data, **request_kwargs) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                # Формат SSE: "data: {...}", служебные строки-комментарии начинаются с ":"
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                chunk = json.loads(payload)
+                if chunk.get("error"):
+                    raise RuntimeError(f"Ошибка в потоке: {chunk['error']}")
+                usage = chunk.get("usage")
+                if usage:
+                    if usage_out is not None:
+                        usage_out.update(usage)
+                    logger.info(
+                        f"OpenRouter API (модель {model_name}, поток): использовано токенов - "
+                        f"{usage.get('total_tokens', 0)}"
+                    )
+                for choice in chunk.get("choices", []):
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield content
 
-            return result["choices"][0]["message"]["content"]
+    async def stream_ai_request(
+        self,
+        prompt: str,
+        max_tokens: int = 4000,
+        endpoint: Optional[str] = None,
+        use_cache: bool = True,
+        system_prompt: Optional[str] = None,
+        user_id: Optional[int] = None,
+        fallback: Optional[OfflineFallback] = None,
+        similarity_key: Optional[str] = None,
+        outcome: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Потоковый вариант _make_ai_request: отдает текст фрагментами.
+        Кэш, бюджет и здоровье моделей учитываются так же; переключение на следующую
+        модель возможно только до первого фрагмента. Демо-ответ и ответ из кэша
+        отдаются через тот же поток. Завершенный поток записывается в журнал ai_interactions.
+        В outcome (если передан) после потока - источник ответа model_used и tokens_used.
+        """
+        started_at = time.monotonic()
+        if outcome is None:
+            outcome = {}
+        outcome.update({"model_used": "demo", "tokens_used": None})
+        parts: List[str] = []
+        async for chunk in self._stream_generate(
+            prompt, max_tokens, endpoint, use_cache, system_prompt, outcome, fallback, similarity_key
+        ):
+            parts.append(chunk)
+            yield chunk
+        if similarity_key and settings.AI_SEMANTIC_CACHE_ENABLED and outcome["model_used"] not in LOCAL_SOURCES:
+            semantic_cache.add(endpoint, similarity_key, "".join(parts))
+        interaction_log.record(
+            user_id, endpoint, prompt, _join_prompt(system_prompt, prompt), "".join(parts),
+            outcome["model_used"], outcome["tokens_used"], time.monotonic() - started_at
+        )
+
+    async def _stream_generate(
+        self,
+        prompt: str,
+        max_tokens: int,
+        endpoint: Optional[str],
+        use_cache: bool,
+        system_prompt: Optional[str],
+        outcome: Dict[str, Any],
+        fallback: Optional[OfflineFallback] = None,
+        similarity_key: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Поток ответа: кэш, допуск, перебор моделей. Источник ответа записывается в outcome"""
+        full_prompt = _join_prompt(system_prompt, prompt)
+
+        if not self.api_key:
+            logger.warning("OpenRouter API ключ не установлен, используем резервный режим")
+            for chunk in self._stream_degraded(full_prompt, fallback, outcome):
+                yield chunk
+            return
+
+        cache_key = None
+        if ai_response_cache.is_enabled_for(endpoint):
+            cache_key = make_cache_key(full_prompt, self.model_list, max_tokens, self.temperature)
+            if use_cache:
+                cached_response = await ai_response_cache.get(cache_key)
+                if cached_response is not None:
+                    outcome["model_used"] = "cache"
+                    for chunk in _split_for_stream(cached_response):
+                        yield chunk
+                    return
+            else:
+                ai_response_cache.bypasses += 1
+
+        if similarity_key and settings.AI_SEMANTIC_CACHE_ENABLED and use_cache:
+            similar_response = semantic_cache.lookup(endpoint, similarity_key)
+            if similar_response is not None:
+                outcome["model_used"] = "semantic_cache"
+                for chunk in _split_for_stream(similar_response):
+                    yield chunk
+                return
+
+        # Поток занимает общий слот допуска на все время генерации
+        try:
+            admitted_at = await admission_controller.acquire(timeout=deadline_remaining())
+        except AdmissionRejected:
+            if not deadline_expired():
+                raise
+            self.deadline_exceeded += 1
+            for chunk in self._stream_degraded(full_prompt, fallback, outcome):
+                yield chunk
+            return
+        try:
+            models = deque(self.model_health.get_ordered_models())
+            saturated: List[str] = []
+            while models or saturated:
+                # Начатый поток не прерывается, но новую модель после крайнего срока не запускаем
+                if deadline_expired(settings.AI_DEADLINE_MIN_ATTEMPT_SECONDS):
+                    self.deadline_skipped_attempts += 1
+                    self.deadline_exceeded += 1
+                    logger.warning("Крайний срок потокового AI-запроса истек, используем резервный режим")
+                    for chunk in self._stream_degraded(full_prompt, fallback, outcome):
+                        yield chunk
+                    return
+                model_name = self._take_admitted_model(models, saturated)
+                if model_name is None:
+                    model_name = await admission_controller.acquire_any_model(
+                        saturated, _wait_timeout(settings.AI_ADMISSION_QUEUE_TIMEOUT_SECONDS)
+                    )
+                    if model_name is None:
+                        break
+                    saturated.remove(model_name)
+                try:
+                    reservation = await self._reserve_budget(model_name, full_prompt, max_tokens)
+                    if reservation is None:
+                        if self._offline_available(fallback):
+                            logger.warning("Дневной AI-бюджет исчерпан, отвечаем офлайн-генератором")
+                            for chunk in self._stream_degraded(full_prompt, fallback, outcome):
+                                yield chunk
+                            return
+                        outcome["model_used"] = "budget"
+                        yield BUDGET_EXCEEDED_MESSAGE
+                        return
+                    self.model_health.on_attempt(model_name)
+                    started_at = time.monotonic()
+                    parts: List[str] = []
+                    usage: Dict[str, Any] = {}
+                    try:
+                        async for chunk in self._stream_single_request(
+                            prompt, max_tokens, model_name, usage, system_prompt=system_prompt,
+                            time_limit=deadline_remaining()
+                        ):
+                            parts.append(chunk)
+                            yield chunk
+                    except (asyncio.CancelledError, GeneratorExit):
+                        # Клиент отключился - попытка не считается ошибкой модели,
+                        # но уже сгенерированная часть ответа оплачивается
+                        self.model_health.on_cancel(model_name)
+                        budget_ledger.commit(reservation, usage_cost_rub(model_name, usage, full_prompt, "".join(parts)))
+                        raise
+                    except Exception as e:
+                        if not parts and deadline_expired():
+                            # Модель не успела до крайнего срока - это не ошибка модели,
+                            # следующая итерация ответит резервным режимом
+                            self.model_health.on_cancel(model_name)
+                            budget_ledger.release(reservation)
+                            continue
+                        self._record_failure(model_name, e)
+                        if parts:
+                            budget_ledger.commit(reservation, usage_cost_rub(model_name, usage, full_prompt, "".join(parts)))
+                            # Часть текста уже отправлена клиенту, сменить модель нельзя
+                            raise
+                        budget_ledger.release(reservation)
+                        continue
+
+                    if not parts:
+                        budget_ledger.release(reservation)
+                        self._record_failure(model_name, RuntimeError("пустой ответ"))
+                        continue
+
+                    self._record_success(
+                        model_name, full_prompt, "".join(parts), usage, reservation,
+                        time.monotonic() - started_at, endpoint, cache_key
+                    )
+                    outcome.update(model_used=model_name, tokens_used=usage.get("total_tokens"))
+                    return
+                finally:
+                    admission_controller.release_model(model_name)
+        finally:
+            admission_controller.release(admitted_at)
+
+        logger.error("Все попытки потоковых запросов к моделям OpenRouter не увенчались успехом. Используем резервный режим.")
+        for chunk in self._stream_degraded(full_prompt, fallback, outcome):
+            yield chunk
+
+    def _stream_degraded(self, full_prompt: str, fallback: Optional[OfflineFallback], outcome: Dict[str, Any]) -> List[str]:
+        """Резервный ответ, разбитый на фрагменты потока"""
+        result = self._degraded_response(full_prompt, fallback)
+        outcome["model_used"] = result.model_used
+        return _split_for_stream(result.content)
 
-    def get_usage_statistics(self) -> Dict[str, Any]:
-        """Возвращает статистику использования"""
-        return {
-            "daily_usage_rub": round(self.daily_usage, 4),
-            "daily_budget_rub": self.daily_budget_rub,
-            "remaining_budget_rub": round(self.daily_budget_rub - self.daily_usage, 4),
-            "last_reset_date": self.last_reset_date.isoformat(),
-            "percentage_used": round((self.daily_usage / self.daily_budget_rub) * 100, 2)
-        }
-    
-    def set_daily_budget(self, budget_rub: float):
-        """Установка дневного бюджета"""
-        self.daily_budget_rub = budget_rub
-        logger.info(f"Установлен дневной бюджет: {budget_rub} руб.")
-    
     def _get_demo_response(self, prompt: str) -> str:
         """
         Демо-ответы когда нет API ключа или при ошибках
@@ -268,56 +830,119 @@ class AIService:
         """Демо-прогноз травм"""
         return """АНАЛИЗ РИСКА ТРАВМ..."""
 
+def _join_prompt(system_prompt: Optional[str], prompt: str) -> str:
+    """Полный текст промпта (системная + пользовательская часть) для кэша, бюджета и демо-режима"""
+    return f"{system_prompt}\n{prompt}" if system_prompt else prompt
+
+def _wait_timeout(timeout: float) -> float:
+    """Срок ожидания, ограниченный остатком крайнего срока запроса"""
+    remaining = deadline_remaining()
+    return timeout if remaining is None else max(0.0, min(timeout, remaining))
+
+def _split_for_stream(text: str) -> List[str]:
+    """Делит готовый текст (демо, кэш) на строки для отдачи через поток"""
+    return text.splitlines(keepends=True) or [text]
+
 # Создаем экземпляр сервиса
 ai_service = AIService()
 
-async def generate_workout_plan(
+def build_workout_plan_prompt(
     user_request: str,
     plan_type: str,
     difficulty: str,
     duration_minutes: int
+) -> Tuple[str, str]:
+    """Промпт для генерации плана тренировок: (системная часть, данные пользователя)"""
+    return WORKOUT_PLAN.render(
+        user_request=user_request,
+        plan_type=plan_type,
+        difficulty=difficulty,
+        duration_minutes=duration_minutes
+    )
+
+async def generate_workout_plan(
+    user_request: str,
+    plan_type: str,
+    difficulty: str,
+    duration_minutes: int,
+    regenerate: bool = False,
+    user_id: Optional[int] = None
 ) -> str:
     """Генерация плана тренировок"""
-    prompt = f"""
-    Ты - профессиональный фитнес-тренер. Создай подробный план тренировки.
+    system_prompt, prompt = build_workout_plan_prompt(user_request, plan_type, difficulty, duration_minutes)
+    return await ai_service._make_ai_request(
+        prompt,
+        endpoint="workout_plan",
+        use_cache=not regenerate,
+        system_prompt=system_prompt,
+        user_id=user_id,
+        fallback=lambda: offline_engine.workout_plan(user_request, plan_type, difficulty, duration_minutes)
+    )
 
-    ЗАПРОС ПОЛЬЗОВАТЕЛЯ: {user_request}
+def stream_workout_plan(
+    user_request: str,
+    plan_type: str,
+    difficulty: str,
+    duration_minutes: int,
+    regenerate: bool = False,
+    user_id: Optional[int] = None
+) -> AsyncIterator[str]:
+    """Потоковая генерация плана тренировок"""
+    system_prompt, prompt = build_workout_plan_prompt(user_request, plan_type, difficulty, duration_minutes)
+    return ai_service.stream_ai_request(
+        prompt,
+        endpoint="workout_plan",
+        use_cache=not regenerate,
+        system_prompt=system_prompt,
+        user_id=user_id,
+        fallback=lambda: offline_engine.workout_plan(user_request, plan_type, difficulty, duration_minutes)
+    )
 
-    ТИП ТРЕНИРОВКИ: {plan_type}
-    СЛОЖНОСТЬ: {difficulty}
-    ДЛИТЕЛЬНОСТЬ: {duration_minutes} минут
+def build_exercise_recommendations_prompt(combined_request: str) -> Tuple[str, str]:
+    """Промпт для рекомендаций при ограничениях: (системная часть, данные пользователя)"""
+    return EXERCISE_RECOMMENDATIONS.render(combined_request=combined_request)
 
-    Структура плана:
-    1. Разминка (упражнения и время)
-    2. Основная часть (упражнения, подходы, повторения, техника)
-    3. Заминка (растяжка)
-    4. Рекомендации (частота, питание, восстановление)
+async def generate_exercise_recommendations(
+    combined_request: str, regenerate: bool = False, user_id: Optional[int] = None, similarity_key: Optional[str] = None
+) -> str:
+    """Генерация рекомендаций при ограничениях (similarity_key - текст для семантического кэша)"""
+    result = await generate_exercise_recommendations_result(combined_request, regenerate, user_id, similarity_key)
+    return result.content
 
-    Учитывай тип тренировки, сложность и длительность при составлении плана.
-    Будь конкретен и мотивирующ.
-    
-    ВАЖНОЕ ОГРАНИЧЕНИЕ: НЕ используй таблицы, символы звездочек (*), маркдаун или другие форматирования. 
-    Используй только обычный текст с нумерованными и буквенными списками.
-    """
-    return await ai_service._make_ai_request(prompt)
-
-async def generate_exercise_recommendations(combined_request: str) -> str:
-    """Генерация рекомендаций при ограничениях"""
-    prompt = f"""
-    Ты - спортивный врач. Пользователь сообщает о следующих ограничениях: {combined_request}
-    
-    Предоставь:
-    1. Безопасные упражнения (с объяснением почему они безопасны)
-    2. Упражнения которых следует избегать (и почему)
-    3. Общие рекомендации по тренировкам
-    4. Советы по восстановлению и профилактике
-    
-    Будь профессиональным и заботливым.
-    
-    ВАЖНОЕ ОГРАНИЧЕНИЕ: НЕ используй таблицы, символы звездочек (*), маркдаун или другие форматирования. 
-    Используй только обычный текст с нумерованными и буквенными списками.
-    """
-    return await ai_service._make_ai_request(prompt)
+async def generate_exercise_recommendations_result(
+    combined_request: str, regenerate: bool = False, user_id: Optional[int] = None, similarity_key: Optional[str] = None
+) -> AIResult:
+    """То же, что generate_exercise_recommendations, вместе с источником ответа (сохраняется в записи)"""
+    system_prompt, prompt = build_exercise_recommendations_prompt(combined_request)
+    return await ai_service._make_ai_request_result(
+        prompt,
+        endpoint="exercise_recommendations",
+        use_cache=not regenerate,
+        system_prompt=system_prompt,
+        user_id=user_id,
+        fallback=lambda: offline_engine.exercise_recommendations(combined_request),
+        similarity_key=similarity_key
+    )
+
+def stream_exercise_recommendations(
+    combined_request: str,
+    regenerate: bool = False,
+    user_id: Optional[int] = None,
+    similarity_key: Optional[str] = None,
+    outcome: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[str]:
+    """Потоковая генерация рекомендаций при ограничениях (источник ответа - в outcome после потока)"""
+    system_prompt, prompt = build_exercise_recommendations_prompt(combined_request)
+    return ai_service.stream_ai_request(
+        prompt,
+        endpoint="exercise_recommendations",
+        use_cache=not regenerate,
+        system_prompt=system_prompt,
+        user_id=user_id,
+        fallback=lambda: offline_engine.exercise_recommendations(combined_request),
+        similarity_key=similarity_key,
+        outcome=outcome
+    )
 
 # async def generate_weekly_challenge(challenge_type: str, target_metrics: dict = None) -> str:
 #     """Генерация недельного испытания"""
@@ -355,8 +980,8 @@ async def generate_exercise_recommendations(combined_request: str) -> str:
 #     Используй только обычный текст с нумерованными и буквенными списками для структуры.
 #     """
 #     return await ai_service._make_ai_request(prompt)
-async def generate_weekly_challenge(challenge_type: str, target_metrics: dict = None) -> str:
-    """Генерация недельного испытания"""
+def build_weekly_challenge_prompt(challenge_type: str, target_metrics: dict = None) -> Tuple[str, str]:
+    """Промпт для генерации недельного испытания: (системная часть, данные пользователя)"""
     # Формируем строку с целями для промпта
     metrics_str = ""
     if target_metrics:
@@ -368,30 +993,48 @@ async def generate_weekly_challenge(challenge_type: str, target_metrics: dict =
         if target_metrics.get('target_duration'):
             parts.append(f"Цель по длительности (мин): {target_metrics['target_duration']}")
         if parts:
-            metrics_str = " " + ", ".join(parts) + "."
+            metrics_str = ", ".join(parts) + "."
 
-    prompt = f"""
-    Ты - мотивационный фитнес-коуч. Создай увлекательное недельное испытание.
+    return WEEKLY_CHALLENGE.render(challenge_type=challenge_type, metrics=metrics_str)
 
-    ТИП ИСПЫТАНИЯ: {challenge_type}
-    {metrics_str}
-
-    ВАЖНО: Ты ОБЯЗАН использовать эти цели в своем ответе. Не игнорируй их!
-    Включи в свой план конкретные цифры: количество повторений, подходов и минут тренировки, соответствующие целям пользователя.
+async def generate_weekly_challenge(challenge_type: str, target_metrics: dict = None, regenerate: bool = False, user_id: Optional[int] = None) -> str:
+    """Генерация недельного испытания"""
+    system_prompt, prompt = build_weekly_challenge_prompt(challenge_type, target_metrics)
+    return await ai_service._make_ai_request(
+        prompt,
+        endpoint="weekly_challenge",
+        use_cache=not regenerate,
+        system_prompt=system_prompt,
+        user_id=user_id,
+        fallback=lambda: offline_engine.weekly_challenge(challenge_type, target_metrics)
+    )
 
-    Структура испытания:
-    1. Название и цель
-    2. План на каждый день недели (с указанием количества повторений, подходов и времени)
-    3. Советы по выполнению
-    4. Ожидаемые результаты
+async def pregenerate_weekly_challenge(challenge_type: str, target_metrics: dict = None, user_id: Optional[int] = None) -> AIResult:
+    """Генерация недельного испытания заранее (планировщик): вместе с источником, чтобы не сохранять резервные ответы"""
+    system_prompt, prompt = build_weekly_challenge_prompt(challenge_type, target_metrics)
+    return await ai_service._make_ai_request_result(
+        prompt,
+        endpoint="weekly_challenge",
+        system_prompt=system_prompt,
+        user_id=user_id,
+        fallback=lambda: offline_engine.weekly_challenge(challenge_type, target_metrics)
+    )
 
-    Сделай испытание достижимым но challenging.
-    """
-    return await ai_service._make_ai_request(prompt)
+def stream_weekly_challenge(challenge_type: str, target_metrics: dict = None, regenerate: bool = False, user_id: Optional[int] = None) -> AsyncIterator[str]:
+    """Потоковая генерация недельного испытания"""
+    system_prompt, prompt = build_weekly_challenge_prompt(challenge_type, target_metrics)
+    return ai_service.stream_ai_request(
+        prompt,
+        endpoint="weekly_challenge",
+        use_cache=not regenerate,
+        system_prompt=system_prompt,
+        user_id=user_id,
+        fallback=lambda: offline_engine.weekly_challenge(challenge_type, target_metrics)
+    )
 
 
-async def analyze_injury_risk(exercises_data: Dict[str, Any]) -> str:
-    """Анализ риска травмы"""
+def build_injury_risk_prompt(exercises_data: Dict[str, Any]) -> Tuple[str, str]:
+    """Промпт для анализа риска травмы: (системная часть, данные для анализа)"""
     description_parts = []
     if "plan_exercises" in exercises_data:
         description_parts.append(f"План тренировок: {exercises_data['plan_exercises']}")
@@ -402,44 +1045,94 @@ async def analyze_injury_risk(exercises_data: Dict[str, Any]) -> str:
 
     full_description = "\n".join(description_parts)
 
-    prompt = f"""
-    Ты - спортивный врач и специалист по фитнесу. Проанализируй риск травмы на основе предоставленных данных.
+    return INJURY_RISK.render(description=full_description)
+
+async def analyze_injury_risk(exercises_data: Dict[str, Any], user_id: Optional[int] = None) -> str:
+    """Анализ риска травмы"""
+    system_prompt, prompt = build_injury_risk_prompt(exercises_data)
+    return await ai_service._make_ai_request(
+        prompt,
+        endpoint="injury_prediction",
+        system_prompt=system_prompt,
+        user_id=user_id,
+        fallback=lambda: offline_engine.injury_risk(exercises_data)
+    )
+
+def stream_injury_risk(exercises_data: Dict[str, Any], user_id: Optional[int] = None) -> AsyncIterator[str]:
+    """Потоковый анализ риска травмы"""
+    system_prompt, prompt = build_injury_risk_prompt(exercises_data)
+    return ai_service.stream_ai_request(
+        prompt,
+        endpoint="injury_prediction",
+        system_prompt=system_prompt,
+        user_id=user_id,
+        fallback=lambda: offline_engine.injury_risk(exercises_data)
+    )
 
-    ДАННЫЕ ДЛЯ АНАЛИЗА:
-    {full_description}
+async def get_ai_usage_stats() -> Dict[str, Any]:
+    """Получение статистики использования AI (общий дневной бюджет)"""
+    return await budget_ledger.get_statistics()
 
-    СТРОГО ВОЗВРАЩАЙ ОТВЕТ В СЛЕДУЮЩЕМ ФОРМАТЕ:
+async def set_ai_budget(budget_rub: float):
+    """Установка дневного бюджета для AI"""
+    await budget_ledger.set_budget(budget_rub)
 
-    1. Уровень риска: [ВСТАВЬТЕ ЗДЕСЬ: Низкий/Средний/Высокий]
-    Объяснение уровня риска в 1-2 предложениях.
+async def get_ai_pool_stats() -> Dict[str, Any]:
+    """Получение статистики пула HTTP-соединений к OpenRouter"""
+    return ai_http_client.get_pool_stats()
 
-    2. Основные факторы риска
-    - Фактор 1
-    - Фактор 2
-    - Фактор 3
 
-    3. Рекомендации по снижению риска
-    - Рекомендация 1
-    - Рекомендация 2
-    - Рекомендация 3
+async def get_ai_cache_stats() -> Dict[str, Any]:
+    """Получение статистики кэша ответов AI"""
+    return ai_response_cache.get_statistics()
 
-    4. Альтернативные безопасные упражнения
-    - Упражнение 1 и почему оно безопаснее
-    - Упражнение 2 и почему оно безопаснее
 
-    ВАЖНО: 
-    1. Первой строкой после заголовка "1. Уровень риска:" ДОЛЖНО БЫТЬ только одно слово: "Низкий", "Средний" или "Высокий"
-    2. НЕ используй символы решетки (#), звездочки (*), таблицы или маркдаун-форматирование
-    3. Используй только обычные цифры с точками для нумерации и дефисы для списков
-    4. Будь конкретным и профессиональным
-    5. Учитывай факторы риска пользователя
-    """
-    return await ai_service._make_ai_request(prompt)
+async def get_ai_single_flight_stats() -> Dict[str, Any]:
+    """Получение статистики объединения одинаковых запросов к AI"""
+    return ai_single_flight.get_statistics()
 
-async def get_ai_usage_stats() -> Dict[str, Any]:
-    """Получение статистики использования AI"""
-    return ai_service.get_usage_statistics()
 
-async def set_ai_budget(budget_rub: float):
-    """Установка дневного бюджета для AI"""
-    ai_service.set_daily_budget(budget_rub)
\ No newline at end of file
+async def get_ai_hedging_stats() -> Dict[str, Any]:
+    """Получение статистики хеджирования запросов к AI"""
+    return ai_service.get_hedging_statistics()
+
+
+async def get_ai_model_health() -> List[Dict[str, Any]]:
+    """Получение состояния моделей (задержка, ошибки, предохранители) в порядке перебора"""
+    return ai_service.model_health.get_statistics()
+
+
+async def get_ai_job_stats() -> Dict[str, Any]:
+    """Получение статистики очереди фоновых AI-задач"""
+    from app.services.jobs import job_manager
+    return job_manager.get_statistics()
+
+
+async def get_ai_prompt_stats() -> List[Dict[str, Any]]:
+    """Получение экономии токенов по шаблонам промптов"""
+    return get_prompt_statistics()
+
+
+async def get_ai_admission_stats() -> Dict[str, Any]:
+    """Получение статистики допуска запросов к AI (очередь, лимиты, гистограммы ожидания)"""
+    return admission_controller.get_statistics()
+
+
+async def get_ai_offline_stats() -> Dict[str, Any]:
+    """Получение статистики офлайн-генератора (резервный режим и предпросмотр)"""
+    return offline_engine.get_statistics()
+
+
+async def get_ai_interaction_log_stats() -> Dict[str, Any]:
+    """Получение статистики журнала AI-запросов (очередь, пачки, отброшенные записи)"""
+    return interaction_log.get_statistics()
+
+
+async def get_ai_semantic_cache_stats() -> Dict[str, Any]:
+    """Получение статистики семантического кэша (попадания, сходство, размер индекса)"""
+    return semantic_cache.get_statistics()
+
+
+async def get_ai_deadline_stats() -> Dict[str, Any]:
+    """Получение статистики крайних сроков AI-запросов (ответы резервным режимом, пропущенные попытки)"""
+    return ai_service.get_deadline_statistics()
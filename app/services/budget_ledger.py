@@ -0,0 +1,315 @@
+# app/services/budget_ledger.py
+import asyncio
+import logging
+import os
+import socket
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+from app.crud import crud_ai_budget
+from app.database import run_in_session
+
+logger = logging.getLogger(__name__)
+
+
+class BudgetReservation:
+    """Резерв бюджета под одну попытку запроса к модели"""
+
+    __slots__ = ("amount", "day")
+
+    def __init__(self, amount: float, day: date):
+        self.amount = amount
+        self.day = day
+
+
+class InMemoryBudgetStore:
+    """Учет бюджета в памяти процесса (один экземпляр приложения, сбрасывается при рестарте)"""
+
+    def __init__(self):
+        self._days: Dict[date, Dict[str, float]] = {}
+        self._leases: Dict[Tuple[date, str], float] = {}
+
+    def _day(self, day: date) -> Dict[str, float]:
+        if day not in self._days:
+            self._days = {day: {"budget_rub": settings.AI_DAILY_BUDGET_RUB, "spent_rub": 0.0}}
+            self._leases = {key: value for key, value in self._leases.items() if key[0] == day}
+        return self._days[day]
+
+    async def acquire(self, day: date, holder: str, amount: float) -> float:
+        budget_day = self._day(day)
+        reserved = sum(value for key, value in self._leases.items() if key[0] == day)
+        granted = max(0.0, min(amount, budget_day["budget_rub"] - budget_day["spent_rub"] - reserved))
+        self._leases[(day, holder)] = self._leases.get((day, holder), 0.0) + granted
+        return granted
+
+    async def settle(self, day: date, holder: str, spent: float, release: bool = False) -> Dict[str, float]:
+        budget_day = self._day(day)
+        budget_day["spent_rub"] += spent
+        if release:
+            self._leases.pop((day, holder), None)
+        elif (day, holder) in self._leases:
+            self._leases[(day, holder)] = max(0.0, self._leases[(day, holder)] - spent)
+        return dict(budget_day)
+
+    async def set_budget(self, day: date, budget_rub: float) -> Dict[str, float]:
+        budget_day = self._day(day)
+        budget_day["budget_rub"] = budget_rub
+        return dict(budget_day)
+
+    async def get_day(self, day: date) -> Dict[str, float]:
+        budget_day = self._day(day)
+        reserved = sum(value for key, value in self._leases.items() if key[0] == day)
+        return {**budget_day, "reserved_rub": reserved}
+
+
+class PostgresBudgetStore:
+    """
+    Общий для всех воркеров учет в таблицах ai_budget_days / ai_budget_leases.
+    Каждый метод - одна короткая транзакция в пуле потоков.
+    """
+
+    async def acquire(self, day: date, holder: str, amount: float) -> float:
+        return await asyncio.to_thread(
+            run_in_session, crud_ai_budget.acquire_lease, day, holder, amount,
+            settings.AI_DAILY_BUDGET_RUB, settings.AI_BUDGET_LEASE_TTL_SECONDS
+        )
+
+    async def settle(self, day: date, holder: str, spent: float, release: bool = False) -> Dict[str, float]:
+        return await asyncio.to_thread(run_in_session, self._settle, day, holder, spent, release)
+
+    def _settle(self, db, day: date, holder: str, spent: float, release: bool) -> Dict[str, float]:
+        budget_day = crud_ai_budget.settle(db, day, holder, spent, settings.AI_DAILY_BUDGET_RUB, release)
+        return {"budget_rub": budget_day.budget_rub, "spent_rub": budget_day.spent_rub}
+
+    async def set_budget(self, day: date, budget_rub: float) -> Dict[str, float]:
+        return await asyncio.to_thread(run_in_session, self._set_budget, day, budget_rub)
+
+    def _set_budget(self, db, day: date, budget_rub: float) -> Dict[str, float]:
+        budget_day = crud_ai_budget.set_budget(db, day, budget_rub)
+        return {"budget_rub": budget_day.budget_rub, "spent_rub": budget_day.spent_rub}
+
+    async def get_day(self, day: date) -> Dict[str, float]:
+        return await asyncio.to_thread(run_in_session, self._get_day, day)
+
+    def _get_day(self, db, day: date) -> Dict[str, float]:
+        budget_day = crud_ai_budget.get_day(db, day)
+        return {
+            "budget_rub": budget_day.budget_rub if budget_day else settings.AI_DAILY_BUDGET_RUB,
+            "spent_rub": budget_day.spent_rub if budget_day else 0.0,
+            "reserved_rub": crud_ai_budget.get_reserved(db, day, settings.AI_BUDGET_LEASE_TTL_SECONDS),
+        }
+
+
+class BudgetLedger:
+    """
+    Дневной AI-бюджет, общий для всех воркеров.
+    Воркер арендует у общего учета часть бюджета (AI_BUDGET_LEASE_RUB) одной транзакцией
+    и дальше резервирует запросы из нее в памяти - без обращения к БД на каждый запрос.
+    Фактическая стоимость (по токенам из ответа) копится локально и списывается
+    в общий итог фоновой задачей раз в AI_BUDGET_SETTLE_INTERVAL_SECONDS.
+    Аренда упавшего воркера перестает учитываться через AI_BUDGET_LEASE_TTL_SECONDS.
+    """
+
+    def __init__(self):
+        self.store = None
+        self.holder = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._day: Optional[date] = None
+        self._available = 0.0  # Остаток аренды, доступный без обращения к БД
+        self._in_flight = 0.0  # Зарезервировано под выполняющиеся запросы
+        self._pending = 0.0    # Фактические расходы, еще не списанные в общий итог
+        self._snapshot: Dict[str, float] = {}
+
+        self._refill_lock: Optional[asyncio.Lock] = None
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self._settle_task: Optional[asyncio.Task] = None
+
+        self.reservations = 0
+        self.denied = 0
+        self.lease_requests = 0
+        self.leased_rub = 0.0
+        self.settlements = 0
+        self.store_errors = 0
+        self.estimated_rub = 0.0
+        self.actual_rub = 0.0
+
+    def _create_store(self):
+        if settings.AI_BUDGET_BACKEND == "memory":
+            return InMemoryBudgetStore()
+        return PostgresBudgetStore()
+
+    def _ensure_started(self):
+        if self.store is None:
+            self.store = self._create_store()
+        if self._refill_lock is None:
+            self._refill_lock = asyncio.Lock()
+        if self._settle_task is None or self._settle_task.done():
+            self._settle_task = asyncio.create_task(self._settle_loop())
+
+    def _roll_day(self):
+        """При смене даты списывает остаток расходов за прошлый день и сдает аренду"""
+        today = date.today()
+        if self._day == today:
+            return
+        if self._day is not None:
+            logger.info(f"Смена дня AI-бюджета. Расходы воркера за {self._day} списываются, аренда сдается")
+            asyncio.create_task(self._settle(self._day, self._pending, release=True))
+        self._day = today
+        self._available = 0.0
+        self._in_flight = 0.0
+        self._pending = 0.0
+
+    def _take(self, amount: float) -> Optional[BudgetReservation]:
+        if self._available < amount:
+            return None
+        self._available -= amount
+        self._in_flight += amount
+        self.reservations += 1
+        self.estimated_rub += amount
+        # Заранее продлеваем аренду, чтобы запросы не ждали БД
+        if self._available < settings.AI_BUDGET_LEASE_RUB / 4 and (
+            self._prefetch_task is None or self._prefetch_task.done()
+        ):
+            self._prefetch_task = asyncio.create_task(self._prefetch())
+        return BudgetReservation(amount, self._day)
+
+    async def reserve(self, amount: float) -> Optional[BudgetReservation]:
+        """
+        Резервирует amount руб. под попытку запроса. None - дневной лимит исчерпан.
+        Обращается к БД, только когда локальной аренды не хватает.
+        """
+        self._ensure_started()
+        self._roll_day()
+        if amount <= 0:
+            # Бесплатные модели не расходуют бюджет
+            return BudgetReservation(0.0, self._day)
+
+        reservation = self._take(amount)
+        if reservation is not None:
+            return reservation
+
+        async with self._refill_lock:
+            reservation = self._take(amount)
+            if reservation is None:
+                await self._refill(amount)
+                reservation = self._take(amount)
+        if reservation is None:
+            self.denied += 1
+            logger.warning(
+                f"Дневной лимит превышен. Использовано: {self._snapshot.get('spent_rub', 0.0):.4f} руб., "
+                f"Лимит: {self._snapshot.get('budget_rub', settings.AI_DAILY_BUDGET_RUB)} руб."
+            )
+        return reservation
+
+    async def _prefetch(self):
+        async with self._refill_lock:
+            if self._available < settings.AI_BUDGET_LEASE_RUB / 4:
+                await self._refill(0.0)
+
+    async def _refill(self, amount: float):
+        """Арендует у общего учета очередную часть бюджета"""
+        day = self._day
+        try:
+            granted = await self.store.acquire(day, self.holder, max(settings.AI_BUDGET_LEASE_RUB, amount))
+        except Exception as e:
+            # Без общего учета бюджет не выдаем: перерасход хуже отказа
+            self.store_errors += 1
+            logger.error(f"Не удалось арендовать AI-бюджет: {e}")
+            return
+        self.lease_requests += 1
+        if day == self._day:
+            self._available += granted
+            self.leased_rub += granted
+
+    def commit(self, reservation: BudgetReservation, actual_cost: float):
+        """Фиксирует фактическую стоимость запроса; разница с резервом возвращается в аренду"""
+        self.actual_rub += actual_cost
+        self._pending += actual_cost
+        if reservation.day == self._day:
+            self._in_flight -= reservation.amount
+            self._available += reservation.amount - actual_cost
+
+    def release(self, reservation: BudgetReservation):
+        """Возвращает резерв неудачной или отмененной попытки"""
+        if reservation.day == self._day:
+            self._in_flight -= reservation.amount
+            self._available += reservation.amount
+
+    async def _settle_loop(self):
+        while True:
+            await asyncio.sleep(settings.AI_BUDGET_SETTLE_INTERVAL_SECONDS)
+            if self._day is not None and (self._pending > 0 or self._available > 0 or self._in_flight > 0):
+                # Списание заодно продлевает аренду
+                pending, self._pending = self._pending, 0.0
+                if not await self._settle(self._day, pending):
+                    self._pending += pending
+
+    async def _settle(self, day: date, spent: float, release: bool = False) -> bool:
+        try:
+            self._snapshot = await self.store.settle(day, self.holder, spent, release)
+        except Exception as e:
+            self.store_errors += 1
+            logger.error(f"Не удалось списать расходы AI-бюджета ({spent:.4f} руб.): {e}")
+            return False
+        self.settlements += 1
+        return True
+
+    async def close(self):
+        """Списывает накопленные расходы и сдает аренду (вызывается при остановке приложения)"""
+        if self._settle_task is not None:
+            self._settle_task.cancel()
+            await asyncio.gather(self._settle_task, return_exceptions=True)
+            self._settle_task = None
+        if self._day is not None and self.store is not None:
+            pending, self._pending = self._pending, 0.0
+            await self._settle(self._day, pending, release=True)
+            self._available = 0.0
+
+    async def set_budget(self, budget_rub: float):
+        """Устанавливает дневной бюджет (общий для всех воркеров)"""
+        self._ensure_started()
+        self._roll_day()
+        self._snapshot = await self.store.set_budget(self._day, budget_rub)
+        logger.info(f"Установлен дневной бюджет: {budget_rub} руб.")
+
+    async def get_statistics(self) -> Dict[str, Any]:
+        """Возвращает состояние дневного бюджета (общий итог + локальная аренда воркера)"""
+        self._ensure_started()
+        self._roll_day()
+        try:
+            day_state = await self.store.get_day(self._day)
+        except Exception as e:
+            self.store_errors += 1
+            logger.error(f"Не удалось прочитать AI-бюджет: {e}")
+            day_state = dict(self._snapshot)
+
+        budget = day_state.get("budget_rub", settings.AI_DAILY_BUDGET_RUB)
+        spent = day_state.get("spent_rub", 0.0) + self._pending
+        return {
+            "backend": settings.AI_BUDGET_BACKEND,
+            "daily_usage_rub": round(spent, 4),
+            "daily_budget_rub": budget,
+            "remaining_budget_rub": round(budget - spent, 4),
+            "reserved_rub": round(day_state.get("reserved_rub", 0.0), 4),
+            "last_reset_date": self._day.isoformat(),
+            "percentage_used": round(spent / budget * 100, 2) if budget else 100.0,
+            "worker": {
+                "holder": self.holder,
+                "lease_available_rub": round(self._available, 4),
+                "in_flight_rub": round(self._in_flight, 4),
+                "pending_settlement_rub": round(self._pending, 4),
+                "reservations": self.reservations,
+                "denied": self.denied,
+                "lease_requests": self.lease_requests,
+                "leased_rub": round(self.leased_rub, 4),
+                "settlements": self.settlements,
+                "store_errors": self.store_errors,
+                "estimated_rub": round(self.estimated_rub, 4),
+                "actual_rub": round(self.actual_rub, 4),
+            },
+        }
+
+
+# Общий учет AI-бюджета
+budget_ledger = BudgetLedger()
@@ -0,0 +1,252 @@
+# app/services/challenge_pregeneration.py
+import asyncio
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.pool import NullPool
+
+from app.config import settings
+from app.crud import crud_weekly_challenge
+from app.database import run_in_session, sync_connect_args
+from app.logging_config import request_id_var
+from app.services.admission import ai_priority, PRIORITY_BACKGROUND, AdmissionRejected
+from app.services.ai_service import pregenerate_weekly_challenge
+
+logger = logging.getLogger(__name__)
+
+# Ключ advisory-блокировки лидера предгенерации (один проход на весь кластер)
+PREGEN_LOCK_NAME = "challenge_pregeneration"
+
+# Соединение лидера держится весь проход - отдельно от пула приложения, чтобы не занимать его слот
+_lock_engine = create_engine(
+    settings.DATABASE_URL,
+    connect_args=sync_connect_args(settings.DATABASE_URL),
+    poolclass=NullPool,
+)
+
+
+def upcoming_week(now: datetime) -> Tuple[date, int]:
+    """Ближайший понедельник и номер его недели (ISO) - неделя, на которую готовятся испытания"""
+    monday = (now + timedelta(days=7 - now.weekday())).date()
+    return monday, monday.isocalendar()[1]
+
+
+def week_monday(week_number: int, today: date) -> date:
+    """Понедельник недели ISO week_number, ближайшей к today (номер недели приходит без года)"""
+    mondays = []
+    for year in (today.year - 1, today.year, today.year + 1):
+        try:
+            mondays.append(date.fromisocalendar(year, week_number, 1))
+        except ValueError:
+            # 53-й недели в этом году нет (или номер вне 1..53)
+            pass
+    if not mondays:
+        return today - timedelta(days=today.weekday())
+    return min(mondays, key=lambda monday: abs((monday - today).days))
+
+
+def week_created_since(monday: date) -> datetime:
+    """
+    Раньше этого момента испытание на неделю с понедельником monday создано быть не могло:
+    предгенерация начинается за AI_PREGEN_DAYS_AHEAD дней до понедельника (+1 день -
+    запас на часовой пояс created_at, который ставит БД). Отсекает ту же неделю прошлых лет.
+    """
+    return datetime.combine(monday - timedelta(days=settings.AI_PREGEN_DAYS_AHEAD + 1), datetime.min.time())
+
+
+def try_leader_lock() -> Optional[Connection]:
+    """
+    Блокировка лидера: pg_try_advisory_xact_lock на отдельном соединении, транзакция остается
+    открытой до конца прохода (закрытие соединения снимает блокировку, в том числе при падении
+    процесса). Транзакционная блокировка работает и за PgBouncer в режиме transaction.
+    None - проход уже выполняет другой процесс.
+    """
+    connection = _lock_engine.connect()
+    try:
+        acquired = connection.execute(select(func.pg_try_advisory_xact_lock(func.hashtext(PREGEN_LOCK_NAME)))).scalar()
+    except Exception:
+        connection.close()
+        raise
+    if not acquired:
+        connection.close()
+        return None
+    return connection
+
+
+class ChallengePregenerator:
+    """
+    Заранее генерирует недельные испытания активным пользователям в непиковые часы
+    перед началом недели, чтобы в понедельник испытание уже лежало в БД.
+    Для каждого пользователя берется тип и цели его последнего испытания.
+    Работа идемпотентна по (user_id, week_number, не раньше week_created_since): список кандидатов каждый раз
+    строится заново из БД, поэтому прерванный проход просто продолжается в следующий раз.
+    Планировщик запущен в каждом воркере и экземпляре, но проход выполняет только держатель
+    блокировки лидера (try_leader_lock): модель не вызывается повторно для одного пользователя,
+    а AI_PREGEN_REQUESTS_PER_MINUTE - общий лимит кластера.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._last_request_at = 0.0
+
+        self.runs = 0
+        self.created = 0
+        self.skipped_existing = 0
+        self.skipped_degraded = 0
+        self.skipped_not_leader = 0
+        self.failed = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_run_week: Optional[int] = None
+        self.last_run_finished = False
+
+    async def start(self):
+        """Запускает планировщик (вызывается при старте приложения)"""
+        if settings.AI_PREGEN_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+            logger.info(
+                f"Предгенерация испытаний: окно {settings.AI_PREGEN_WINDOW_START_HOUR}-{settings.AI_PREGEN_WINDOW_END_HOUR} UTC, "
+                f"{settings.AI_PREGEN_REQUESTS_PER_MINUTE} запросов/мин"
+            )
+
+    async def stop(self):
+        """Останавливает планировщик (вызывается при остановке приложения)"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def in_window(self, now: datetime) -> bool:
+        """Непиковые часы в последние AI_PREGEN_DAYS_AHEAD дней перед началом недели"""
+        monday, _ = upcoming_week(now)
+        if (monday - now.date()).days > settings.AI_PREGEN_DAYS_AHEAD:
+            return False
+        start, end = settings.AI_PREGEN_WINDOW_START_HOUR, settings.AI_PREGEN_WINDOW_END_HOUR
+        if start <= end:
+            return start <= now.hour < end
+        return now.hour >= start or now.hour < end
+
+    async def _loop(self):
+        # Генерация уступает интерактивным запросам в очереди допуска к AI
+        ai_priority.set(PRIORITY_BACKGROUND)
+        while True:
+            try:
+                if self.in_window(datetime.utcnow()):
+                    await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Предгенерация испытаний: ошибка прохода: {e}")
+            await asyncio.sleep(settings.AI_PREGEN_CHECK_INTERVAL_SECONDS)
+
+    async def run_once(self, now: Optional[datetime] = None):
+        """Один проход по кандидатам на ближайшую неделю, если его не выполняет другой процесс"""
+        lock = await asyncio.to_thread(try_leader_lock)
+        if lock is None:
+            self.skipped_not_leader += 1
+            logger.debug("Предгенерация испытаний: проход выполняет другой процесс")
+            return
+        try:
+            await self._run_pass(now or datetime.utcnow())
+        finally:
+            await asyncio.to_thread(lock.close)
+
+    async def _run_pass(self, now: datetime):
+        """Проход по кандидатам; останавливается при выходе из окна или исчерпании бюджета"""
+        monday, week_number = upcoming_week(now)
+        created_since = week_created_since(monday)
+        active_since = now - timedelta(days=settings.AI_PREGEN_ACTIVE_DAYS)
+        request_id_var.set(f"pregen:{week_number}")
+        self.runs += 1
+        self.last_run_at, self.last_run_week, self.last_run_finished = now, week_number, False
+
+        after_user_id = 0
+        while True:
+            candidates = await asyncio.to_thread(
+                run_in_session,
+                crud_weekly_challenge.get_pregeneration_candidates,
+                week_number,
+                created_since,
+                active_since,
+                after_user_id,
+                settings.AI_PREGEN_BATCH_SIZE
+            )
+            if not candidates:
+                break
+            for candidate in candidates:
+                after_user_id = candidate["user_id"]
+                if not self.in_window(datetime.utcnow()):
+                    logger.info(f"Предгенерация испытаний: окно закрылось, продолжим позже (неделя {week_number})")
+                    return
+                if not await self._pregenerate(candidate, week_number, created_since):
+                    return
+
+        self.last_run_finished = True
+        logger.info(f"Предгенерация испытаний на неделю {week_number} завершена, создано всего: {self.created}")
+
+    async def _pregenerate(self, candidate: Dict[str, Any], week_number: int, created_since: datetime) -> bool:
+        """Генерирует и сохраняет испытание одного пользователя. False - проход нужно прекратить"""
+        await self._throttle()
+        target_metrics = candidate["target_metrics"] or {}
+        try:
+            result = await pregenerate_weekly_challenge(candidate["challenge_type"], target_metrics, user_id=candidate["user_id"])
+        except AdmissionRejected as e:
+            # Очередь к AI занята интерактивными запросами - пользователь останется кандидатом до следующего прохода
+            self.failed += 1
+            logger.warning(f"Предгенерация испытаний: пользователь {candidate['user_id']} отложен: {e}")
+            return True
+
+        if result.model_used == "budget":
+            logger.warning("Предгенерация испытаний остановлена: дневной AI-бюджет исчерпан")
+            return False
+        if result.model_used in ("offline", "demo"):
+            # Резервный ответ не сохраняем - в понедельник пользователь получит ответ модели
+            self.skipped_degraded += 1
+            return True
+
+        challenge = await asyncio.to_thread(run_in_session, crud_weekly_challenge.create_if_absent, {
+            "week_number": week_number,
+            "challenge_type": candidate["challenge_type"],
+            "target_metrics": candidate["target_metrics"],
+            "user_id": candidate["user_id"],
+            "ai_generated_challenge": result.content,
+        }, created_since)
+        if challenge is None:
+            self.skipped_existing += 1
+        else:
+            self.created += 1
+        return True
+
+    async def _throttle(self):
+        """Не чаще AI_PREGEN_REQUESTS_PER_MINUTE генераций в минуту"""
+        interval = 60.0 / max(settings.AI_PREGEN_REQUESTS_PER_MINUTE, 1e-6)
+        delay = self._last_request_at + interval - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._last_request_at = time.monotonic()
+
+    def get_statistics(self) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        return {
+            "enabled": settings.AI_PREGEN_ENABLED,
+            "running": self._task is not None,
+            "in_window": self.in_window(now),
+            "upcoming_week": upcoming_week(now)[1],
+            "requests_per_minute": settings.AI_PREGEN_REQUESTS_PER_MINUTE,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_run_week": self.last_run_week,
+            "last_run_finished": self.last_run_finished,
+            "created": self.created,
+            "skipped_existing": self.skipped_existing,
+            "skipped_degraded": self.skipped_degraded,
+            "skipped_not_leader": self.skipped_not_leader,
+            "failed": self.failed,
+        }
+
+
+# Общий планировщик предгенерации
+challenge_pregenerator = ChallengePregenerator()
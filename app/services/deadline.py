@@ -0,0 +1,49 @@
+# app/services/deadline.py
+import contextvars
+import math
+import time
+from typing import Optional
+
+from app.config import settings
+
+# Крайний срок ответа на текущий запрос (time.monotonic()); None - без ограничения.
+# Выставляется middleware в main.py (заголовок или значение по умолчанию для маршрута)
+# и воркерами задач; попытки запросов к моделям получают только оставшееся время.
+ai_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("ai_deadline", default=None)
+
+
+def deadline_seconds_for(path: str, header_value: Optional[str]) -> float:
+    """Бюджет времени запроса: из заголовка клиента, иначе по самому длинному подходящему префиксу маршрута"""
+    seconds = None
+    if header_value:
+        try:
+            seconds = float(header_value)
+        except ValueError:
+            seconds = None
+    # float() принимает "nan" и "inf": с NaN wait_for завершается сразу, а сравнения со сроком всегда ложны
+    if seconds is None or not math.isfinite(seconds) or seconds <= 0:
+        seconds = settings.AI_DEADLINE_SECONDS
+        matched = ""
+        for prefix, route_seconds in settings.AI_DEADLINE_ROUTES.items():
+            if path.startswith(prefix) and len(prefix) > len(matched):
+                matched, seconds = prefix, route_seconds
+    return min(seconds, settings.AI_DEADLINE_MAX_SECONDS)
+
+
+def set_deadline(seconds: float) -> contextvars.Token:
+    """Устанавливает крайний срок через seconds секунд от текущего момента"""
+    return ai_deadline.set(time.monotonic() + seconds)
+
+
+def deadline_remaining() -> Optional[float]:
+    """Сколько секунд осталось до крайнего срока (может быть отрицательным); None - срока нет"""
+    deadline = ai_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def deadline_expired(min_seconds: float = 0.0) -> bool:
+    """Срок истек или осталось меньше min_seconds"""
+    remaining = deadline_remaining()
+    return remaining is not None and remaining <= min_seconds
@@ -0,0 +1,166 @@
+# app/services/http_client.py
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Any, Optional
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AIHttpClient:
+    """
+    Долгоживущий httpx.AsyncClient с пулом соединений для запросов к OpenRouter.
+    Создается в lifespan приложения и закрывается при остановке.
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.http2_enabled = False
+
+        # Счетчики для наблюдения за насыщением пула
+        self.requests_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.pool_timeouts = 0
+        self.connect_timeouts = 0
+        self.read_timeouts = 0
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.AI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.AI_HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            connect=settings.AI_HTTP_CONNECT_TIMEOUT,
+            read=settings.AI_HTTP_READ_TIMEOUT,
+            write=settings.AI_HTTP_WRITE_TIMEOUT,
+            pool=settings.AI_HTTP_POOL_TIMEOUT,
+        )
+
+        http2 = settings.AI_HTTP2_ENABLED
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("Пакет h2 не установлен, HTTP/2 отключен (установите httpx[http2])")
+                http2 = False
+
+        self.http2_enabled = http2
+        return httpx.AsyncClient(http2=http2, limits=limits, timeout=timeout)
+
+    async def start(self):
+        """Создает клиент (вызывается при старте приложения)"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+            logger.info(
+                f"HTTP-клиент AI запущен. HTTP/2: {self.http2_enabled}, "
+                f"max_connections: {settings.AI_HTTP_MAX_CONNECTIONS}, "
+                f"keepalive: {settings.AI_HTTP_MAX_KEEPALIVE_CONNECTIONS}"
+            )
+
+    async def close(self):
+        """Закрывает клиент и все соединения пула (вызывается при остановке)"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("HTTP-клиент AI закрыт")
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Ленивое создание для запуска вне FastAPI (скрипты, тесты)
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        """POST-запрос через общий пул с учетом статистики"""
+        client = self.client
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return await client.post(url, **kwargs)
+        except httpx.PoolTimeout:
+            self.pool_timeouts += 1
+            raise
+        except httpx.ConnectTimeout:
+            self.connect_timeouts += 1
+            raise
+        except httpx.ReadTimeout:
+            self.read_timeouts += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """Потоковый запрос через общий пул (соединение занято до конца чтения ответа)"""
+        client = self.client
+        self.requests_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            async with client.stream(method, url, **kwargs) as response:
+                yield response
+        except httpx.PoolTimeout:
+            self.pool_timeouts += 1
+            raise
+        except httpx.ConnectTimeout:
+            self.connect_timeouts += 1
+            raise
+        except httpx.ReadTimeout:
+            self.read_timeouts += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Возвращает статистику пула соединений"""
+        stats = {
+            "started": self._client is not None and not self._client.is_closed,
+            "http2_enabled": self.http2_enabled,
+            "max_connections": settings.AI_HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.AI_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            "requests_total": self.requests_total,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "pool_timeouts": self.pool_timeouts,
+            "connect_timeouts": self.connect_timeouts,
+            "read_timeouts": self.read_timeouts,
+            "connections": 0,
+            "active_connections": 0,
+            "idle_connections": 0,
+            "http2_connections": 0,
+            "waiting_requests": 0,
+        }
+        if not stats["started"]:
+            return stats
+
+        # httpx не отдает состояние пула публично, читаем его из httpcore
+        pool = getattr(self._client._transport, "_pool", None)
+        if pool is None:
+            return stats
+
+        connections = list(getattr(pool, "connections", []))
+        stats["connections"] = len(connections)
+        for connection in connections:
+            if connection.is_idle():
+                stats["idle_connections"] += 1
+            else:
+                stats["active_connections"] += 1
+            if "HTTP/2" in connection.info():
+                stats["http2_connections"] += 1
+        stats["waiting_requests"] = sum(
+            1 for request in getattr(pool, "_requests", [])
+            if getattr(request, "is_queued", lambda: False)()
+        )
+        stats["saturation"] = round(stats["active_connections"] / settings.AI_HTTP_MAX_CONNECTIONS, 3)
+        return stats
+
+
+# Общий экземпляр клиента
+ai_http_client = AIHttpClient()
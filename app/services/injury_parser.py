@@ -0,0 +1,112 @@
+# app/services/injury_parser.py
+import re
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Заголовки разделов формата, который запрашивает промпт INJURY_RISK.
+# Нумерация, решетки и звездочки допускаются - модели не всегда соблюдают запрет на маркдаун.
+_HEADER_RE = re.compile(
+    r"^(?:#{1,6}\s*)?(?:\d{1,2}[.)]\s*)?(?:"
+    r"(?P<level>уровень\s+риска|risk\s+level)"
+    r"|(?P<factors>(?:основные\s+)?факторы\s+риска|(?:main\s+)?risk\s+factors)"
+    r"|(?P<recommendations>рекомендации|советы|как\s+снизить\s+риск|что\s+делать|recommendations)"
+    r"|(?P<alternatives>альтернатив\w*|безопасные\s+альтернатив\w*|safe\s+alternatives|alternatives?)"
+    r")\b",
+    re.IGNORECASE
+)
+_BULLET_RE = re.compile(r"^(?:[-•–—]|\d{1,2}[.)]|[a-zа-я][.)])\s+", re.IGNORECASE)
+_LEVEL_RE = re.compile(r"\b(низкий|средний|высокий|low|medium|high)\b", re.IGNORECASE)
+
+_LEVELS = {
+    "низкий": "low", "low": "low",
+    "средний": "medium", "medium": "medium",
+    "высокий": "high", "high": "high",
+}
+DEFAULT_LEVEL = "medium"
+MAX_HEADER_LENGTH = 80
+
+
+class InjuryRiskReport(NamedTuple):
+    """Разобранный ответ анализа риска травмы"""
+    level: str
+    level_found: bool  # False - уровень выбран по числу упоминаний или по умолчанию
+    summary: str
+    factors: List[str]
+    recommendations: List[str]
+    alternatives: List[str]
+
+    def recommendations_text(self) -> Optional[str]:
+        """Рекомендации для колонки recommendations"""
+        if not self.recommendations:
+            return None
+        return "\n".join(f"- {item}" for item in self.recommendations)
+
+    def to_risk_factors(self, user_factors: Optional[str]) -> Dict[str, Any]:
+        """Содержимое JSONB-колонки risk_factors: факторы пользователя и разобранные разделы ответа"""
+        return {
+            "user": user_factors or "",
+            "summary": self.summary,
+            "factors": self.factors,
+            "alternatives": self.alternatives,
+        }
+
+
+def parse_injury_risk_response(text: Optional[str]) -> InjuryRiskReport:
+    """
+    Разбирает ответ ИИ за один проход по строкам: уровень риска, факторы,
+    рекомендации и безопасные альтернативы. Если явного "Уровень риска:" нет,
+    уровень выбирается по числу упоминаний, собранных в том же проходе.
+    """
+    sections: Dict[str, List[str]] = {"level": [], "factors": [], "recommendations": [], "alternatives": []}
+    level: Optional[str] = None
+    mentions = {"low": 0, "medium": 0, "high": 0}
+    current: Optional[str] = None
+
+    for raw_line in (text or "").splitlines():
+        line = raw_line.replace("*", "").strip()
+        if not line:
+            continue
+
+        level_match = _LEVEL_RE.search(line)
+        if level_match:
+            mentions[_LEVELS[level_match.group(1).lower()]] += 1
+
+        header = _HEADER_RE.match(line) if len(line) <= MAX_HEADER_LENGTH else None
+        if header:
+            current = header.lastgroup
+            if current == "level" and level is None:
+                # Уровень часто стоит в той же строке: "1. Уровень риска: Высокий"
+                inline = _LEVEL_RE.search(line, header.end())
+                if inline:
+                    level = _LEVELS[inline.group(1).lower()]
+            elif ":" in line:
+                # "Советы: пейте воду" - содержимое в строке заголовка
+                inline_text = line.split(":", 1)[1].strip()
+                if inline_text:
+                    sections[current].append(inline_text)
+            continue
+
+        if current is None:
+            continue
+        if current == "level" and level is None and level_match and level_match.start() == 0:
+            # Уровень первой строкой раздела, за ним может идти объяснение
+            level = _LEVELS[level_match.group(1).lower()]
+            line = line[level_match.end():].lstrip(" .,:;-–—")
+            if line:
+                sections["level"].append(line)
+            continue
+        sections[current].append(_BULLET_RE.sub("", line, count=1))
+
+    level_found = level is not None
+    if not level_found:
+        top = max(mentions, key=mentions.get)
+        ties = sum(1 for count in mentions.values() if count == mentions[top])
+        level = top if mentions[top] and ties == 1 else DEFAULT_LEVEL
+
+    return InjuryRiskReport(
+        level=level,
+        level_found=level_found,
+        summary=" ".join(sections["level"]),
+        factors=sections["factors"],
+        recommendations=sections["recommendations"],
+        alternatives=sections["alternatives"],
+    )
@@ -0,0 +1,172 @@
+# app/services/interaction_log.py
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.crud import crud_ai_interaction
+from app.database import run_in_session
+
+logger = logging.getLogger(__name__)
+
+TRUNCATED_MARKER = "\n…[обрезано]"
+
+# Метка остановки в очереди: писатель дописывает собранную пачку и завершается
+_STOP = object()
+
+
+def _cap(text: Optional[str], limit: int) -> str:
+    """Ограничивает размер сохраняемого текста"""
+    text = text or ""
+    if len(text) <= limit:
+        return text
+    return text[:limit] + TRUNCATED_MARKER
+
+
+class InteractionLogWriter:
+    """
+    Буферизованная запись журнала ai_interactions вне пути запроса.
+    record() только кладет строку в ограниченную очередь; фоновая задача
+    пишет пачками (одним INSERT на пачку) по достижении размера или по таймеру.
+    Если запись не успевает и очередь заполнена, новые строки отбрасываются
+    (счетчик dropped): журнал не должен замедлять генерацию.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_flush_seconds = 0.0
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=settings.AI_LOG_QUEUE_SIZE)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def record(
+        self,
+        user_id: Optional[int],
+        interaction_type: Optional[str],
+        user_input: str,
+        ai_prompt: str,
+        ai_response: str,
+        model_used: str,
+        tokens_used: Optional[int],
+        latency_seconds: float
+    ):
+        """Ставит запись в очередь (без ожидания и ввода-вывода)"""
+        if not settings.AI_LOG_ENABLED:
+            return
+        if user_id is None:
+            # Запросы вне контекста пользователя (скрипты) не журналируются: user_id обязателен
+            self.skipped += 1
+            return
+        self._ensure_started()
+        limit = settings.AI_LOG_MAX_TEXT_CHARS
+        row = {
+            "user_id": user_id,
+            "interaction_type": interaction_type or "generic",
+            "user_input": _cap(user_input, limit),
+            "ai_prompt": _cap(ai_prompt, limit),
+            "ai_response": _cap(ai_response, limit),
+            "model_used": model_used,
+            "tokens_used": tokens_used,
+            "latency_ms": int(latency_seconds * 1000),
+            "created_at": datetime.utcnow(),
+        }
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return
+        self.recorded += 1
+
+    async def _run(self):
+        while True:
+            row = await self._queue.get()
+            if row is _STOP:
+                return
+            batch = [row]
+            stopping = False
+            deadline = time.monotonic() + settings.AI_LOG_FLUSH_INTERVAL_SECONDS
+            # Добираем пачку до размера или до истечения интервала
+            while len(batch) < settings.AI_LOG_BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if row is _STOP:
+                    stopping = True
+                    break
+                batch.append(row)
+            await self._write(batch)
+            if stopping:
+                return
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        started_at = time.monotonic()
+        try:
+            await asyncio.to_thread(run_in_session, crud_ai_interaction.create_many, batch)
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Не удалось записать журнал AI-запросов ({len(batch)} записей): {e}")
+            return
+        self.written += len(batch)
+        self.batches += 1
+        self.last_batch_size = len(batch)
+        self.last_flush_seconds = time.monotonic() - started_at
+
+    async def close(self):
+        """
+        Останавливает фоновую задачу (при остановке приложения): писатель дописывает
+        уже собранную пачку и очередь до метки остановки, затем здесь дописываются записи,
+        поставленные после метки.
+        """
+        if self._task is not None:
+            if not self._task.done():
+                await self._queue.put(_STOP)
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._queue is None:
+            return
+        batch = []
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+            if len(batch) >= settings.AI_LOG_BATCH_SIZE:
+                await self._write(batch)
+                batch = []
+        if batch:
+            await self._write(batch)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Возвращает статистику журнала AI-запросов"""
+        return {
+            "enabled": settings.AI_LOG_ENABLED,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "queue_size": settings.AI_LOG_QUEUE_SIZE,
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+        }
+
+
+# Общий писатель журнала AI-запросов
+interaction_log = InteractionLogWriter()
@@ -0,0 +1,306 @@
+# app/services/jobs.py
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.config import settings
+from app.services.admission import ai_priority, PRIORITY_BACKGROUND
+from app.logging_config import request_id_var
+from app.services.deadline import set_deadline
+from app.crud import crud_ai_job
+from app.database import SessionLocal
+from app.schemas.ai_job import AIJob as AIJobSchema
+
+logger = logging.getLogger(__name__)
+
+# Обработчик задачи: принимает (payload, user_id), выполняет генерацию,
+# сохраняет результат в свою таблицу и возвращает id созданной записи
+JobHandler = Callable[[Dict[str, Any], int], Awaitable[Optional[int]]]
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def register_job_handler(job_type: str, handler: JobHandler):
+    """Регистрирует обработчик для типа задачи (вызывается роутерами при импорте)"""
+    _handlers[job_type] = handler
+
+
+class JobQueueFull(Exception):
+    """Очередь задач заполнена"""
+
+
+class InProcessJobBackend:
+    """Очередь задач в памяти процесса (одна копия приложения)"""
+
+    def __init__(self, queue_size: int, max_finished: int = 1000):
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._max_finished = max_finished
+
+    async def submit(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            self._queue.put_nowait(job["id"])
+        except asyncio.QueueFull:
+            raise JobQueueFull()
+        self._jobs[job["id"]] = job
+        self._trim()
+        return job
+
+    def _trim(self):
+        # Храним ограниченное число завершенных задач
+        finished = [job_id for job_id, job in self._jobs.items() if job["finished_at"] is not None]
+        for job_id in finished[:max(0, len(finished) - self._max_finished)]:
+            del self._jobs[job_id]
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._jobs.get(job_id)
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        job_id = await self._queue.get()
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job["status"] = "running"
+        job["attempts"] += 1
+        return job
+
+    async def complete(self, job: Dict[str, Any], result_id: Optional[int]):
+        job.update(status="succeeded", result_id=result_id, error=None, finished_at=datetime.utcnow())
+
+    async def fail(self, job: Dict[str, Any], error: str):
+        job["error"] = error
+        if job["attempts"] >= job["max_attempts"]:
+            job.update(status="dead", finished_at=datetime.utcnow())
+            return
+        job["status"] = "queued"
+        asyncio.get_running_loop().call_later(settings.AI_JOB_RETRY_DELAY_SECONDS, self._requeue, job["id"])
+
+    def _requeue(self, job_id: str):
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(status="dead", error="Очередь задач переполнена", finished_at=datetime.utcnow())
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+
+class PostgresJobBackend:
+    """
+    Очередь задач в таблице ai_jobs: несколько экземпляров приложения
+    разбирают задачи через SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+
+    async def submit(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        db_job = await asyncio.to_thread(self._create, job)
+        return db_job
+
+    def _create(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            db_job = crud_ai_job.create(db, {
+                "id": job["id"],
+                "user_id": job["user_id"],
+                "job_type": job["job_type"],
+                "payload": job["payload"],
+                "status": "queued",
+                "attempts": 0,
+                "max_attempts": job["max_attempts"],
+            })
+            return _job_to_dict(db_job)
+        finally:
+            db.close()
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    def _get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            db_job = crud_ai_job.get_by_id(db, job_id)
+            return _job_to_dict(db_job) if db_job else None
+        finally:
+            db.close()
+
+    async def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        job = await asyncio.to_thread(self._claim, worker_id)
+        if job is None:
+            await asyncio.sleep(settings.AI_JOB_POLL_INTERVAL_SECONDS)
+        return job
+
+    def _claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            db_job = crud_ai_job.claim_next(db, worker_id, stale_after_seconds=settings.AI_JOB_TIMEOUT_SECONDS * 2)
+            return _job_to_dict(db_job) if db_job else None
+        finally:
+            db.close()
+
+    async def complete(self, job: Dict[str, Any], result_id: Optional[int]):
+        await asyncio.to_thread(self._run, crud_ai_job.mark_succeeded, job["id"], result_id)
+
+    async def fail(self, job: Dict[str, Any], error: str):
+        await asyncio.to_thread(self._run, crud_ai_job.mark_failed, job["id"], error, settings.AI_JOB_RETRY_DELAY_SECONDS)
+
+    def _run(self, method, *args):
+        db = SessionLocal()
+        try:
+            method(db, *args)
+        finally:
+            db.close()
+
+    def queue_depth(self) -> Optional[int]:
+        return None
+
+
+def _job_to_dict(db_job) -> Dict[str, Any]:
+    return {
+        "id": db_job.id,
+        "user_id": db_job.user_id,
+        "job_type": db_job.job_type,
+        "payload": db_job.payload,
+        "status": db_job.status,
+        "attempts": db_job.attempts,
+        "max_attempts": db_job.max_attempts,
+        "result_id": db_job.result_id,
+        "error": db_job.error,
+        "created_at": db_job.created_at,
+        "finished_at": db_job.finished_at,
+    }
+
+
+class JobManager:
+    """Ограниченный пул воркеров, выполняющих AI-задачи из очереди"""
+
+    def __init__(self):
+        self.backend = None
+        self._workers: List[asyncio.Task] = []
+        self.worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.submitted = 0
+        self.succeeded = 0
+        self.retried = 0
+        self.dead = 0
+        self.rejected = 0
+
+    def _create_backend(self):
+        if settings.AI_JOB_BACKEND == "postgres":
+            return PostgresJobBackend()
+        return InProcessJobBackend(settings.AI_JOB_QUEUE_SIZE)
+
+    async def start(self):
+        """Запускает воркеров (вызывается при старте приложения)"""
+        if self.backend is None:
+            self.backend = self._create_backend()
+        for number in range(settings.AI_JOB_WORKERS):
+            worker_id = f"{self.worker_prefix}:{number}"
+            self._workers.append(asyncio.create_task(self._worker(worker_id)))
+        logger.info(f"Запущено AI-воркеров: {settings.AI_JOB_WORKERS}, бэкенд очереди: {settings.AI_JOB_BACKEND}")
+
+    async def stop(self):
+        """Останавливает воркеров (вызывается при остановке приложения)"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, job_type: str, user_id: int, payload: Dict[str, Any]) -> AIJobSchema:
+        """Ставит задачу в очередь. Бросает JobQueueFull, если очередь заполнена"""
+        if job_type not in _handlers:
+            raise ValueError(f"Неизвестный тип задачи: {job_type}")
+        if self.backend is None:
+            self.backend = self._create_backend()
+        job = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "job_type": job_type,
+            "payload": payload,
+            "status": "queued",
+            "attempts": 0,
+            "max_attempts": settings.AI_JOB_MAX_ATTEMPTS,
+            "result_id": None,
+            "error": None,
+            "created_at": datetime.utcnow(),
+            "finished_at": None,
+        }
+        try:
+            job = await self.backend.submit(job)
+        except JobQueueFull:
+            self.rejected += 1
+            raise
+        self.submitted += 1
+        return AIJobSchema.model_validate(job)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if self.backend is None:
+            return None
+        return await self.backend.get(job_id)
+
+    async def _worker(self, worker_id: str):
+        # Фоновые задачи уступают интерактивным запросам в очереди допуска к AI
+        ai_priority.set(PRIORITY_BACKGROUND)
+        while True:
+            try:
+                job = await self.backend.claim(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Воркер {worker_id}: ошибка получения задачи: {e}")
+                await asyncio.sleep(settings.AI_JOB_POLL_INTERVAL_SECONDS)
+                continue
+            if job is None:
+                continue
+            await self._execute(job)
+
+    async def _execute(self, job: Dict[str, Any]):
+        # Записи лога задачи помечаются ее id
+        request_id_var.set(f"job:{job['id']}")
+        # Крайний срок AI-запросов задачи - до ее таймаута, чтобы успеть ответить резервным режимом
+        set_deadline(settings.AI_JOB_TIMEOUT_SECONDS - settings.AI_DEADLINE_MIN_ATTEMPT_SECONDS)
+        handler = _handlers.get(job["job_type"])
+        try:
+            if handler is None:
+                raise ValueError(f"Нет обработчика для задачи типа {job['job_type']}")
+            result_id = await asyncio.wait_for(
+                handler(job["payload"], job["user_id"]),
+                timeout=settings.AI_JOB_TIMEOUT_SECONDS
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            logger.warning(f"Задача {job['id']} ({job['job_type']}) завершилась ошибкой, попытка {job['attempts']}: {error}")
+            await self.backend.fail(job, error)
+            if job["attempts"] >= job["max_attempts"]:
+                self.dead += 1
+            else:
+                self.retried += 1
+            return
+
+        await self.backend.complete(job, result_id)
+        self.succeeded += 1
+        logger.info(f"Задача {job['id']} ({job['job_type']}) выполнена, запись {result_id}")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Возвращает статистику очереди задач"""
+        return {
+            "backend": settings.AI_JOB_BACKEND,
+            "workers": len(self._workers),
+            "queue_depth": self.backend.queue_depth() if self.backend else 0,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "retried": self.retried,
+            "dead": self.dead,
+            "rejected": self.rejected,
+        }
+
+
+# Общий менеджер задач
+job_manager = JobManager()
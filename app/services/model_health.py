@@ -0,0 +1,178 @@
+# app/services/model_health.py
+import logging
+import time
+from typing import Dict, Any, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ModelHealth:
+    """Состояние одной модели: EWMA задержки, доли ошибок и 429, автомат предохранителя"""
+
+    def __init__(self, model_name: str, position: int):
+        self.model_name = model_name
+        self.position = position  # Порядок в исходном model_list (для равных по здоровью)
+
+        self.state = CLOSED
+        self.ewma_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.rate_limit_rate = 0.0
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.updated_at = time.monotonic()
+
+        self.successes = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.times_opened = 0
+
+    def score(self, now: Optional[float] = None) -> float:
+        """Оценка для ранжирования: ожидаемая задержка со штрафом за ошибки (меньше - лучше)"""
+        now = time.monotonic() if now is None else now
+        latency = self.ewma_latency if self.ewma_latency is not None else settings.AI_HEDGE_DEFAULT_DELAY_SECONDS
+        # Штраф за ошибки затухает со временем, чтобы модель после сбоя снова получила шанс
+        decay = 0.5 ** ((now - self.updated_at) / settings.AI_HEALTH_DECAY_SECONDS)
+        penalty = 1.0 + 4.0 * (self.error_rate + self.rate_limit_rate) * decay
+        return latency * penalty
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "state": self.state,
+            "ewma_latency_seconds": round(self.ewma_latency, 3) if self.ewma_latency is not None else None,
+            "error_rate": round(self.error_rate, 4),
+            "rate_limit_rate": round(self.rate_limit_rate, 4),
+            "consecutive_failures": self.consecutive_failures,
+            "score": round(self.score(), 3),
+            "successes": self.successes,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "times_opened": self.times_opened,
+        }
+
+
+class ModelHealthRegistry:
+    """
+    Отслеживает здоровье моделей и выдает порядок их перебора:
+    быстрые здоровые модели первыми, модели с открытым предохранителем пропускаются
+    до истечения паузы, после чего пропускается одна пробная попытка (half-open).
+    Все операции - O(число моделей) без ввода-вывода, их можно вызывать на горячем пути.
+    """
+
+    def __init__(self, model_list: List[str]):
+        self._models: Dict[str, ModelHealth] = {}
+        self._ranked: List[str] = []
+        self.set_models(model_list)
+
+    def set_models(self, model_list: List[str]):
+        self._models = {
+            name: self._models.get(name) or ModelHealth(name, position)
+            for position, name in enumerate(model_list)
+        }
+        for position, name in enumerate(model_list):
+            self._models[name].position = position
+        self._rerank()
+
+    def _rerank(self):
+        # Сортировка нескольких моделей в памяти - дешевле любого сетевого вызова
+        now = time.monotonic()
+        self._ranked = [
+            health.model_name for health in sorted(
+                self._models.values(),
+                key=lambda health: (health.score(now), health.position)
+            )
+        ]
+
+    def _get(self, model_name: str) -> ModelHealth:
+        health = self._models.get(model_name)
+        if health is None:
+            health = ModelHealth(model_name, len(self._models))
+            self._models[model_name] = health
+        return health
+
+    def get_ordered_models(self) -> List[str]:
+        """Возвращает модели для перебора: сначала доступные по рангу, затем пробные"""
+        self._rerank()
+        now = time.monotonic()
+        available = []
+        for model_name in self._ranked:
+            health = self._models[model_name]
+            if health.state == OPEN and now - health.opened_at >= settings.AI_CIRCUIT_OPEN_SECONDS:
+                health.state = HALF_OPEN
+                logger.info(f"Предохранитель модели {model_name}: half-open, разрешена пробная попытка")
+            if health.state == CLOSED:
+                available.append(model_name)
+            elif health.state == HALF_OPEN and not health.probe_in_flight:
+                available.append(model_name)
+
+        if not available:
+            # Все модели недоступны - пробуем ту, у которой пауза истекает раньше всех
+            fallback = min(self._models.values(), key=lambda health: health.opened_at)
+            available.append(fallback.model_name)
+        return available
+
+    def on_attempt(self, model_name: str):
+        """Отмечает начало попытки (для half-open - занимает единственный пробный слот)"""
+        health = self._get(model_name)
+        if health.state == HALF_OPEN:
+            health.probe_in_flight = True
+
+    def on_cancel(self, model_name: str):
+        """Попытка отменена (проиграла хеджирование) - статистику не меняем"""
+        self._get(model_name).probe_in_flight = False
+
+    def on_success(self, model_name: str, latency: float):
+        health = self._get(model_name)
+        alpha = settings.AI_HEALTH_EWMA_ALPHA
+        health.ewma_latency = latency if health.ewma_latency is None else (
+            alpha * latency + (1 - alpha) * health.ewma_latency
+        )
+        health.error_rate = (1 - alpha) * health.error_rate
+        health.rate_limit_rate = (1 - alpha) * health.rate_limit_rate
+        health.consecutive_failures = 0
+        health.updated_at = time.monotonic()
+        health.successes += 1
+        health.probe_in_flight = False
+        if health.state != CLOSED:
+            logger.info(f"Предохранитель модели {model_name}: закрыт после успешной попытки")
+            health.state = CLOSED
+        self._rerank()
+
+    def on_failure(self, model_name: str, status_code: Optional[int] = None):
+        health = self._get(model_name)
+        alpha = settings.AI_HEALTH_EWMA_ALPHA
+        is_rate_limited = status_code == 429
+        health.error_rate = alpha + (1 - alpha) * health.error_rate
+        health.rate_limit_rate = (alpha if is_rate_limited else 0.0) + (1 - alpha) * health.rate_limit_rate
+        health.consecutive_failures += 1
+        health.updated_at = time.monotonic()
+        health.failures += 1
+        if is_rate_limited:
+            health.rate_limited += 1
+        health.probe_in_flight = False
+
+        if health.state == HALF_OPEN or (
+            health.state == CLOSED and (
+                health.consecutive_failures >= settings.AI_CIRCUIT_FAILURE_THRESHOLD
+                or health.error_rate >= settings.AI_CIRCUIT_ERROR_RATE_THRESHOLD
+            )
+        ):
+            health.state = OPEN
+            health.opened_at = time.monotonic()
+            health.times_opened += 1
+            logger.warning(
+                f"Предохранитель модели {model_name}: открыт на {settings.AI_CIRCUIT_OPEN_SECONDS} сек. "
+                f"(ошибок подряд: {health.consecutive_failures}, доля ошибок: {health.error_rate:.2f})"
+            )
+        self._rerank()
+
+    def get_statistics(self) -> List[Dict[str, Any]]:
+        """Возвращает состояние моделей в порядке текущего ранжирования"""
+        return [self._models[model_name].to_dict() for model_name in self._ranked]
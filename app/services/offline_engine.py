@@ -0,0 +1,459 @@
+# app/services/offline_engine.py
+import logging
+import re
+import time
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Зоны нагрузки: упражнение нагружает зоны, ограничение пользователя их исключает
+AREAS = ("knee", "back", "shoulder", "wrist", "ankle", "neck", "heart")
+_AREA_BITS = {area: 1 << index for index, area in enumerate(AREAS)}
+
+AREA_NAMES = {
+    "knee": "колени",
+    "back": "спина и поясница",
+    "shoulder": "плечевые суставы",
+    "wrist": "запястья",
+    "ankle": "голеностоп",
+    "neck": "шея",
+    "heart": "сердечно-сосудистая система",
+}
+
+# Ключевые слова ограничений в тексте запроса или limitations_type
+_LIMITATION_RE = {
+    "knee": re.compile(r"колен|мениск|связк\w* колен|knee", re.IGNORECASE),
+    "back": re.compile(r"спин|поясниц|позвоноч|грыж|протруз|сколиоз|back", re.IGNORECASE),
+    "shoulder": re.compile(r"плеч|ротатор|shoulder", re.IGNORECASE),
+    "wrist": re.compile(r"запяст|кист[ьи]|wrist", re.IGNORECASE),
+    "ankle": re.compile(r"голеност|лодыж|ахилл|ankle", re.IGNORECASE),
+    "neck": re.compile(r"\bше[яиюей]\b|шейн|neck", re.IGNORECASE),
+    "heart": re.compile(r"сердц|давлен|гипертон|аритм|heart|cardiac", re.IGNORECASE),
+}
+
+PLAN_TYPES = ("strength", "cardio", "flexibility", "hiit", "recovery")
+PLAN_TYPE_NAMES = {
+    "strength": "силовая",
+    "cardio": "кардио",
+    "flexibility": "гибкость",
+    "hiit": "ВИИТ",
+    "recovery": "восстановление",
+}
+
+# Уровни сложности: 1 - начальный, 2 - средний, 3 - продвинутый
+_DIFFICULTY_LEVELS = {
+    "beginner": 1, "easy": 1, "low": 1, "легкий": 1, "лёгкий": 1, "начальный": 1, "новичок": 1,
+    "intermediate": 2, "medium": 2, "moderate": 2, "средний": 2, "средняя": 2,
+    "advanced": 3, "hard": 3, "high": 3, "expert": 3, "сложный": 3, "продвинутый": 3, "высокий": 3,
+}
+LEVEL_NAMES = {1: "начальный", 2: "средний", 3: "продвинутый"}
+
+# Тип испытания -> типы тренировок, из которых берутся упражнения
+_CHALLENGE_KINDS = {
+    "strength": ("strength",),
+    "сила": ("strength",),
+    "endurance": ("cardio", "hiit"),
+    "выносливость": ("cardio", "hiit"),
+    "cardio": ("cardio",),
+    "кардио": ("cardio",),
+    "flexibility": ("flexibility",),
+    "гибкость": ("flexibility",),
+    "technique": ("strength", "flexibility"),
+    "техника": ("strength", "flexibility"),
+    "consistency": ("strength", "cardio", "flexibility"),
+    "регулярность": ("strength", "cardio", "flexibility"),
+}
+
+
+class Exercise(NamedTuple):
+    name: str
+    group: str
+    kinds: FrozenSet[str]
+    level: int  # Минимальный уровень сложности
+    areas: FrozenSet[str]  # Нагружаемые зоны
+    unit: str  # reps - повторения, sec - секунды работы
+    base: int  # Объем подхода на среднем уровне
+    cue: str
+    keywords: Tuple[str, ...]  # Основы слов для поиска упражнения в тексте плана
+    mask: int  # Битовая маска areas для быстрой фильтрации
+
+
+def _area_mask(areas) -> int:
+    mask = 0
+    for area in areas:
+        mask |= _AREA_BITS.get(area, 0)
+    return mask
+
+
+def _ex(name, group, kinds, level, areas, unit, base, cue, *keywords) -> Exercise:
+    areas = frozenset(areas.split())
+    return Exercise(name, group, frozenset(kinds.split()), level, areas, unit, base, cue, keywords, _area_mask(areas))
+
+
+# Каталог упражнений. Порядок важен только для детерминированного выбора.
+CATALOG: Tuple[Exercise, ...] = (
+    # Силовые
+    _ex("Приседания с собственным весом", "ноги", "strength hiit", 1, "knee", "reps", 15, "колени по направлению носков, спина прямая", "присед"),
+    _ex("Приседания со штангой", "ноги", "strength", 3, "knee back", "reps", 8, "нейтральная спина, глубина до параллели", "приседания со штангой", "присед со штангой"),
+    _ex("Выпады назад", "ноги", "strength", 2, "knee", "reps", 10, "шаг назад, колено не выходит за носок", "выпад"),
+    _ex("Ягодичный мост", "ноги", "strength recovery", 1, "", "reps", 15, "пауза 1 секунда в верхней точке", "ягодичный мост", "мостик"),
+    _ex("Румынская тяга с гантелями", "спина", "strength", 2, "back", "reps", 10, "таз назад, гантели вдоль бедер", "румынск"),
+    _ex("Становая тяга", "спина", "strength", 3, "back knee", "reps", 6, "штанга у голеней, спина нейтральная", "станов"),
+    _ex("Тяга резиновой ленты к поясу", "спина", "strength recovery", 1, "", "reps", 15, "лопатки сводить в конце движения", "тяга ленты", "тяга резин"),
+    _ex("Тяга гантели в наклоне с опорой", "спина", "strength", 2, "", "reps", 12, "опора рукой о скамью, локоть вдоль корпуса", "тяга гантели"),
+    _ex("Подтягивания", "спина", "strength", 3, "shoulder", "reps", 6, "полная амплитуда без рывков", "подтяг"),
+    _ex("Отжимания от опоры", "грудь", "strength", 1, "wrist", "reps", 12, "корпус прямой, опора на уровне пояса", "отжимания от опоры", "отжимания от стен"),
+    _ex("Отжимания от пола", "грудь", "strength hiit", 2, "wrist shoulder", "reps", 12, "локти под углом 45 градусов", "отжим"),
+    _ex("Жим гантелей лежа", "грудь", "strength", 2, "shoulder", "reps", 10, "лопатки сведены, контроль опускания", "жим гантелей лежа", "жим лежа"),
+    _ex("Жим гантелей стоя", "плечи", "strength", 2, "shoulder back", "reps", 10, "пресс напряжен, без прогиба в пояснице", "жим стоя", "жим над головой", "армейский жим"),
+    _ex("Разведения с лентой", "плечи", "strength recovery", 1, "", "reps", 15, "прямые руки, движение за счет лопаток", "разведения"),
+    _ex("Сгибания рук с гантелями", "руки", "strength", 1, "", "reps", 12, "локти прижаты к корпусу", "сгибания рук", "бицепс"),
+    _ex("Обратные отжимания от скамьи", "руки", "strength", 2, "shoulder wrist", "reps", 12, "плечи опущены, локти назад", "обратные отжимания", "трицепс"),
+    _ex("Планка на предплечьях", "кор", "strength hiit", 1, "", "sec", 40, "прямая линия от головы до пяток", "планк"),
+    _ex("Боковая планка", "кор", "strength", 2, "shoulder", "sec", 30, "таз не провисает", "боковая планка"),
+    _ex("Мертвый жук", "кор", "strength recovery", 1, "", "reps", 12, "поясница прижата к полу", "мертвый жук"),
+    _ex("Подъемы на носки", "ноги", "strength", 1, "ankle", "reps", 20, "медленное опускание", "подъемы на носки", "икр"),
+    # Кардио
+    _ex("Быстрая ходьба", "кардио", "cardio recovery", 1, "", "sec", 300, "ровный темп, дыхание через нос", "ходьб"),
+    _ex("Велотренажер", "кардио", "cardio recovery", 1, "", "sec", 300, "каденс 80-90 оборотов в минуту", "велотренажер", "велосипед"),
+    _ex("Эллиптический тренажер", "кардио", "cardio", 1, "", "sec", 300, "без опоры на поручни", "эллипс"),
+    _ex("Гребной тренажер", "кардио", "cardio hiit", 2, "back", "sec", 240, "толчок ногами, затем тяга руками", "гребн"),
+    _ex("Бег трусцой", "кардио", "cardio", 2, "knee ankle", "sec", 300, "короткий шаг, приземление под центр тяжести", "бег"),
+    _ex("Шаги на платформу", "кардио", "cardio", 1, "knee", "sec", 120, "вся стопа на платформе", "шаги на платформу", "степ"),
+    _ex("Прыжки на скакалке", "кардио", "cardio hiit", 2, "ankle knee heart", "sec", 60, "мягкие приземления на носки", "скакалк"),
+    # ВИИТ
+    _ex("Джампинг джек", "кардио", "hiit", 1, "ankle heart", "sec", 30, "мягкие приземления", "джампинг", "jumping"),
+    _ex("Скалолаз", "кор", "hiit", 2, "wrist shoulder heart", "sec", 30, "таз на уровне плеч", "скалолаз", "альпинист"),
+    _ex("Бёрпи", "всё тело", "hiit", 3, "knee wrist shoulder heart", "sec", 30, "прыжок вверх с полным выпрямлением", "берпи", "бёрпи", "burpee"),
+    _ex("Прыжки в приседе", "ноги", "hiit", 3, "knee ankle heart", "sec", 30, "приземление в присед без щелчка в коленях", "прыжки в присед", "выпрыгивания"),
+    _ex("Бой с тенью", "кардио", "hiit cardio", 1, "heart", "sec", 45, "удары с разворотом корпуса", "бой с тенью"),
+    _ex("Махи гирей", "всё тело", "hiit strength", 3, "back heart", "sec", 30, "движение от таза, не от рук", "мах гир", "махи гир", "swing"),
+    # Гибкость и восстановление
+    _ex("Кошка-корова", "мобильность", "flexibility recovery", 1, "", "reps", 10, "движение на вдохе и выдохе", "кошка"),
+    _ex("Поза ребенка", "мобильность", "flexibility recovery", 1, "", "sec", 45, "расслабить поясницу", "поза ребенка"),
+    _ex("Растяжка задней поверхности бедра лежа с лентой", "мобильность", "flexibility recovery", 1, "", "sec", 40, "колено прямое, без рывков", "растяжка задней", "бицепс бедра"),
+    _ex("Растяжка сгибателей бедра в выпаде", "мобильность", "flexibility", 1, "knee", "sec", 40, "таз подкручен, спина прямая", "сгибател"),
+    _ex("Растяжка грудных мышц у стены", "мобильность", "flexibility recovery", 1, "shoulder", "sec", 30, "рука под 90 градусов", "грудных"),
+    _ex("Скручивание лежа", "мобильность", "flexibility recovery", 1, "", "sec", 40, "плечи прижаты к полу", "скручивание лежа"),
+    _ex("Наклоны головы", "мобильность", "flexibility recovery", 1, "neck", "reps", 8, "медленно, без вращений", "наклоны головы"),
+    _ex("Раскатка мышц роликом", "мобильность", "recovery flexibility", 1, "", "sec", 60, "медленно, задержка на болезненных точках", "ролик", "мфр"),
+    _ex("Голубь (растяжка ягодиц)", "мобильность", "flexibility", 2, "knee", "sec", 45, "таз ровно, дыхание спокойное", "голубь"),
+    _ex("Мост из положения лежа", "мобильность", "flexibility", 3, "back wrist shoulder neck", "sec", 20, "только после разминки", "мост из положения"),
+    _ex("Диафрагмальное дыхание", "мобильность", "recovery", 1, "", "sec", 120, "вдох животом на 4 счета, выдох на 6", "дыхани"),
+)
+
+WARMUP = (
+    _ex("Суставная гимнастика", "разминка", "", 1, "", "sec", 120, "круговые движения от шеи до голеностопа", "суставн"),
+    _ex("Ходьба на месте с высоким подниманием колен", "разминка", "", 1, "", "sec", 90, "руки работают в такт", "ходьба на месте"),
+    _ex("Махи руками и ногами", "разминка", "", 1, "", "sec", 60, "амплитуда растет постепенно", "махи"),
+)
+
+# Объем и отдых по уровню: (подходы, множитель объема, отдых между подходами, с)
+_LEVEL_PRESCRIPTION = {1: (2, 0.7, 90), 2: (3, 1.0, 75), 3: (4, 1.25, 60)}
+_SECONDS_PER_REP = 3
+
+
+# Индекс каталога: (тип тренировки, уровень) -> упражнения, доступные на этом уровне
+_INDEX: Dict[Tuple[str, int], Tuple[Exercise, ...]] = {
+    (kind, level): tuple(exercise for exercise in CATALOG if kind in exercise.kinds and exercise.level <= level)
+    for kind in PLAN_TYPES
+    for level in (1, 2, 3)
+}
+
+
+@lru_cache(maxsize=512)
+def _candidates(kinds: Tuple[str, ...], level: int, excluded_mask: int) -> Tuple[Exercise, ...]:
+    """Упражнения для типов тренировок и уровня без нагрузки на исключенные зоны (с группировкой по мышцам)"""
+    seen = set()
+    result = []
+    for kind in kinds:
+        for exercise in _INDEX.get((kind, level), ()):
+            if exercise.name not in seen and not exercise.mask & excluded_mask:
+                seen.add(exercise.name)
+                result.append(exercise)
+    # Чередуем группы мышц, чтобы подряд не шли упражнения на одно и то же
+    by_group: Dict[str, List[Exercise]] = {}
+    for exercise in result:
+        by_group.setdefault(exercise.group, []).append(exercise)
+    interleaved = []
+    while any(by_group.values()):
+        for group in list(by_group):
+            if by_group[group]:
+                interleaved.append(by_group[group].pop(0))
+    return tuple(interleaved)
+
+
+def detect_limitations(*texts: Optional[str]) -> FrozenSet[str]:
+    """Зоны, на которые пользователь жалуется, по ключевым словам в тексте"""
+    text = " ".join(t for t in texts if t)
+    return frozenset(area for area, pattern in _LIMITATION_RE.items() if pattern.search(text))
+
+
+def normalize_level(difficulty: Optional[str]) -> int:
+    return _DIFFICULTY_LEVELS.get((difficulty or "").strip().lower(), 2)
+
+
+def normalize_plan_type(plan_type: Optional[str]) -> Tuple[str, ...]:
+    plan_type = (plan_type or "").strip().lower()
+    if plan_type in PLAN_TYPES:
+        return (plan_type,)
+    return ("strength", "cardio")
+
+
+def _seed(*parts: Any) -> int:
+    """Стабильное зерно выбора: одинаковые входные данные - одинаковый ответ"""
+    return zlib.crc32("|".join(str(part) for part in parts).encode())
+
+
+def _pick(candidates: Tuple[Exercise, ...], count: int, seed: int) -> List[Exercise]:
+    if not candidates:
+        return []
+    count = min(count, len(candidates))
+    start = seed % len(candidates)
+    return [candidates[(start + offset) % len(candidates)] for offset in range(count)]
+
+
+def _dose(exercise: Exercise, level: int) -> Tuple[int, int, int, float]:
+    """Подходы, объем подхода, отдых (с) и время на упражнение (мин)"""
+    sets, factor, rest = _LEVEL_PRESCRIPTION[level]
+    if "recovery" in exercise.kinds and exercise.unit == "sec" and exercise.base >= 120:
+        sets = 1
+    volume = max(1, round(exercise.base * factor))
+    work_seconds = volume * _SECONDS_PER_REP if exercise.unit == "reps" else volume
+    minutes = sets * (work_seconds + rest) / 60
+    return sets, volume, rest, minutes
+
+
+def _format_dose(exercise: Exercise, sets: int, volume: int) -> str:
+    if exercise.unit == "reps":
+        return f"{sets} x {volume} повторений"
+    if volume >= 120:
+        return f"{sets} x {volume // 60} мин" if sets > 1 else f"{volume // 60} мин"
+    return f"{sets} x {volume} сек"
+
+
+class OfflineEngine:
+    """
+    Локальный генератор ответов без обращения к OpenRouter: планы, рекомендации,
+    испытания и анализ риска собираются из проиндексированного каталога упражнений
+    за миллисекунды. Используется как резервный уровень (нет ключа, исчерпан бюджет,
+    все модели недоступны) и для мгновенного предпросмотра.
+    """
+
+    def __init__(self):
+        self.generated: Dict[str, int] = {}
+        self.total_ms = 0.0
+
+    def _track(self, kind: str, started_at: float):
+        self.generated[kind] = self.generated.get(kind, 0) + 1
+        self.total_ms += (time.perf_counter() - started_at) * 1000
+
+    def workout_plan(
+        self,
+        user_request: str,
+        plan_type: str,
+        difficulty: Optional[str],
+        duration_minutes: Optional[int]
+    ) -> str:
+        started_at = time.perf_counter()
+        level = normalize_level(difficulty)
+        kinds = normalize_plan_type(plan_type)
+        duration = max(15, min(180, duration_minutes or 45))
+        limitations = detect_limitations(user_request)
+        candidates = _candidates(kinds, level, _area_mask(limitations))
+
+        warmup_minutes = max(5, round(duration * 0.15))
+        cooldown_minutes = max(5, round(duration * 0.1))
+        main_minutes = duration - warmup_minutes - cooldown_minutes
+
+        seed = _seed(user_request, plan_type, level, duration)
+        main: List[Tuple[Exercise, int, int, int]] = []
+        used_minutes = 0.0
+        for exercise in _pick(candidates, len(candidates), seed):
+            sets, volume, rest, minutes = _dose(exercise, level)
+            if main and used_minutes + minutes > main_minutes:
+                continue
+            main.append((exercise, sets, volume, rest))
+            used_minutes += minutes
+        stretches = _pick(_candidates(("flexibility",), 1, _area_mask(limitations)), 3, seed)
+
+        lines = [
+            f"ПЛАН ТРЕНИРОВКИ: {PLAN_TYPE_NAMES.get(kinds[0], 'общая')} тренировка, "
+            f"уровень {LEVEL_NAMES[level]}, {duration} минут",
+        ]
+        if limitations:
+            lines.append("Учтены ограничения: " + ", ".join(AREA_NAMES[area] for area in sorted(limitations)) + " - упражнения с нагрузкой на эти зоны исключены.")
+        lines += ["", f"1. Разминка ({warmup_minutes} мин)"]
+        lines += [f"   {chr(ord('а') + i)}) {exercise.name} - {exercise.base // 60 or 1} мин: {exercise.cue}" for i, exercise in enumerate(WARMUP)]
+        lines += ["", f"2. Основная часть ({main_minutes} мин)"]
+        for number, (exercise, sets, volume, rest) in enumerate(main, 1):
+            lines.append(f"   {number}) {exercise.name} - {_format_dose(exercise, sets, volume)}, отдых {rest} сек. Техника: {exercise.cue}")
+        lines += ["", f"3. Заминка ({cooldown_minutes} мин)"]
+        lines += [f"   {chr(ord('а') + i)}) {exercise.name} - {_format_dose(exercise, 1, exercise.base)}" for i, exercise in enumerate(stretches)]
+        lines += [
+            "",
+            "4. Рекомендации",
+            f"   а) Частота: {2 + level} тренировки в неделю с днем отдыха между одинаковыми нагрузками",
+            "   б) Питание: белок в каждом приеме пищи, 1.5-2 литра воды в день",
+            "   в) Восстановление: сон 7-9 часов, легкая активность в дни отдыха",
+            "   г) Прогрессия: добавляйте 1-2 повторения или 5-10% нагрузки, когда все подходы даются легко",
+        ]
+        self._track("workout_plan", started_at)
+        return "\n".join(lines)
+
+    def exercise_recommendations(self, request_text: str) -> str:
+        started_at = time.perf_counter()
+        limitations = detect_limitations(request_text)
+        mask = _area_mask(limitations)
+        safe = _pick(_candidates(("recovery", "flexibility", "strength"), 1, mask), 6, _seed(request_text))
+        risky = [exercise for exercise in CATALOG if exercise.mask & mask][:6]
+
+        lines = ["РЕКОМЕНДАЦИИ ПРИ ОГРАНИЧЕНИЯХ"]
+        if limitations:
+            lines.append("Зоны, требующие бережной нагрузки: " + ", ".join(AREA_NAMES[area] for area in sorted(limitations)) + ".")
+        lines += ["", "1. Безопасные упражнения"]
+        lines += [
+            f"   {number}) {exercise.name} - {_format_dose(exercise, 2, exercise.base)}: не нагружает проблемные зоны, {exercise.cue}"
+            for number, exercise in enumerate(safe, 1)
+        ]
+        lines += ["", "2. Упражнения, которых следует избегать"]
+        if risky:
+            lines += [
+                f"   {number}) {exercise.name} - нагрузка на {', '.join(AREA_NAMES[a] for a in sorted(exercise.areas & limitations))}"
+                for number, exercise in enumerate(risky, 1)
+            ]
+        else:
+            lines.append("   Явных противопоказаний не найдено, избегайте движений, вызывающих боль")
+        lines += [
+            "",
+            "3. Общие рекомендации",
+            "   а) Работайте в безболевой амплитуде, боль выше 3 из 10 - сигнал остановиться",
+            "   б) Увеличивайте нагрузку не более чем на 10% в неделю",
+            "   в) Начинайте каждую тренировку с 5-10 минут разминки",
+            "",
+            "4. Восстановление и профилактика",
+            "   а) Сон 7-9 часов и равномерное распределение нагрузки по неделе",
+            "   б) Легкая мобилизация и растяжка в дни отдыха",
+            "   в) При сохраняющейся боли обратитесь к врачу или физиотерапевту",
+        ]
+        self._track("exercise_recommendations", started_at)
+        return "\n".join(lines)
+
+    def weekly_challenge(self, challenge_type: str, target_metrics: Optional[Dict[str, Any]] = None) -> str:
+        started_at = time.perf_counter()
+        target_metrics = target_metrics or {}
+        kinds = _CHALLENGE_KINDS.get((challenge_type or "").strip().lower(), ("strength", "cardio"))
+        candidates = _candidates(kinds, 2, 0)
+        # Цель задана в повторениях - берем упражнения на повторения, если они есть среди подходящих
+        counted = tuple(exercise for exercise in candidates if exercise.unit == "reps") or candidates
+        exercises = _pick(counted, 3, _seed(challenge_type, sorted(target_metrics.items())))
+        total_reps = int(target_metrics.get("target_reps") or 140)
+        sets = max(1, int(target_metrics.get("target_sets") or 3))
+        total_minutes = int(target_metrics.get("target_duration") or 140)
+
+        # Нагрузка растет к концу недели, четверг - облегченный день
+        weights = (0.11, 0.13, 0.15, 0.09, 0.16, 0.18, 0.18)
+        reps_by_day = _split_total(total_reps, weights)
+        minutes_by_day = _split_total(total_minutes, weights)
+        days = ("Понедельник", "Вторник", "Среда", "Четверг", "Пятница", "Суббота", "Воскресенье")
+
+        lines = [
+            f"НЕДЕЛЬНОЕ ИСПЫТАНИЕ: {challenge_type}",
+            "",
+            "1. Название и цель",
+            f"   Неделя прогресса: {total_reps} повторений за неделю в {sets} подходах ежедневно, суммарно {total_minutes} минут тренировок",
+            "",
+            "2. План на каждый день недели",
+        ]
+        for index, day in enumerate(days):
+            exercise = exercises[index % len(exercises)] if exercises else None
+            name = exercise.name if exercise else "Упражнение на выбор"
+            if exercise is not None and exercise.unit == "sec":
+                lines.append(f"   {day}: {name} - {sets} подходов, {minutes_by_day[index]} минут")
+                continue
+            per_set = max(1, reps_by_day[index] // sets)
+            lines.append(f"   {day}: {name} - {reps_by_day[index]} повторений ({sets} x {per_set}), {minutes_by_day[index]} минут")
+        lines += [
+            "",
+            "3. Советы по выполнению",
+            "   а) Отдыхайте 60-90 секунд между подходами",
+            "   б) Качество техники важнее количества: " + (exercises[0].cue if exercises else "следите за дыханием"),
+            "   в) Пропущенный день распределите на два следующих, не удваивайте нагрузку за раз",
+            "",
+            "4. Ожидаемые результаты",
+            "   Рост выносливости в выбранном движении, устойчивая привычка ежедневных тренировок и готовность к следующему уровню",
+        ]
+        self._track("weekly_challenge", started_at)
+        return "\n".join(lines)
+
+    def injury_risk(self, exercises_data: Dict[str, Any]) -> str:
+        """Анализ риска в формате промпта INJURY_RISK (разбирается parse_injury_risk_response)"""
+        started_at = time.perf_counter()
+        plan_text = f"{exercises_data.get('plan_exercises', '')} {exercises_data.get('user_exercises', '')}".lower()
+        limitations = detect_limitations(
+            str(exercises_data.get("user_risk_factors", "")), str(exercises_data.get("user_exercises", ""))
+        )
+        found = [exercise for exercise in CATALOG if any(keyword in plan_text for keyword in exercise.keywords)]
+        conflicts = [exercise for exercise in found if exercise.areas & limitations]
+        heavy = [exercise for exercise in found if exercise.level == 3]
+
+        if len(conflicts) >= 2 or (conflicts and heavy):
+            level = "Высокий"
+        elif conflicts or len(heavy) >= 2:
+            level = "Средний"
+        else:
+            level = "Низкий"
+
+        factors = [
+            f"{exercise.name}: нагрузка на {', '.join(AREA_NAMES[a] for a in sorted(exercise.areas & limitations))}"
+            for exercise in conflicts
+        ]
+        factors += [f"{exercise.name}: упражнение продвинутого уровня с высокой нагрузкой" for exercise in heavy if exercise not in conflicts]
+        if not factors:
+            factors = ["Явных конфликтов между упражнениями и ограничениями не найдено"]
+        alternatives = _pick(_candidates(("strength", "recovery"), 2, _area_mask(limitations)), 2, _seed(plan_text))
+
+        lines = [
+            f"1. Уровень риска: {level}",
+            f"Оценка по совпадению упражнений плана с ограничениями ({len(conflicts)}) и числу тяжелых упражнений ({len(heavy)}).",
+            "",
+            "2. Основные факторы риска",
+        ]
+        lines += [f"- {factor}" for factor in factors[:5]]
+        lines += [
+            "",
+            "3. Рекомендации по снижению риска",
+            "- Разминка 10 минут перед основной частью",
+            "- Снизить рабочий вес на 20-30% в упражнениях из списка факторов риска",
+            "- Останавливать подход при боли или потере техники",
+            "",
+            "4. Альтернативные безопасные упражнения",
+        ]
+        lines += [f"- {exercise.name} - не нагружает проблемные зоны, {exercise.cue}" for exercise in alternatives]
+        self._track("injury_risk", started_at)
+        return "\n".join(lines)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        total = sum(self.generated.values())
+        return {
+            "catalog_size": len(CATALOG),
+            "index_keys": len(_INDEX),
+            "cached_selections": _candidates.cache_info().currsize,
+            "generated": dict(self.generated),
+            "avg_ms": round(self.total_ms / total, 3) if total else 0.0,
+        }
+
+
+def _split_total(total: int, weights: Tuple[float, ...]) -> List[int]:
+    """Делит total по весам целыми числами так, чтобы сумма совпала (метод наибольших остатков)"""
+    raw = [total * weight / sum(weights) for weight in weights]
+    parts = [int(value) for value in raw]
+    for index in sorted(range(len(raw)), key=lambda i: raw[i] - parts[i], reverse=True)[:total - sum(parts)]:
+        parts[index] += 1
+    return parts
+
+
+# Общий офлайн-генератор
+offline_engine = OfflineEngine()
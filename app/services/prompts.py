@@ -0,0 +1,235 @@
+# app/services/prompts.py
+import re
+import textwrap
+from typing import Any, Dict, List, Tuple
+
+from app.config import settings
+
+# Слова, числа, серии пробелов и отдельные знаки - единицы оценки токенов
+_TOKEN_RE = re.compile(r"[^\W\d_]+|\d+|\s+|[^\w\s]|_")
+_TRAILING_SPACES_RE = re.compile(r"[ \t]+$", re.MULTILINE)
+_BLANK_LINES_RE = re.compile(r"\n{2,}")
+
+TRIM_MARKER = " …"
+
+
+def _token_cost(piece: str) -> int:
+    if piece.isspace():
+        # Одиночный пробел склеивается со следующим словом; каждый перенос строки
+        # и отступ из нескольких пробелов - отдельные токены
+        newlines = piece.count("\n")
+        indent = len(piece.rsplit("\n", 1)[-1])
+        return newlines + (1 if indent > 1 else 0)
+    if piece[0].isdigit():
+        return (len(piece) + 2) // 3
+    if "а" <= piece[0].lower() <= "я" or piece[0] in "ёЁ":
+        # Кириллица в BPE-словарях дробится мельче латиницы
+        return (len(piece) + 2) // 3
+    if piece[0].isalpha():
+        return (len(piece) + 3) // 4
+    return 1
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Локальная оценка числа токенов без токенизатора модели: слова, числа,
+    знаки препинания и серии пробелов оцениваются по отдельности
+    """
+    return sum(_token_cost(piece) for piece in _TOKEN_RE.findall(text))
+
+
+def compact_prompt(text: str) -> str:
+    """Убирает отступы, хвостовые пробелы и пустые строки - модели они не нужны, а токены стоят"""
+    text = textwrap.dedent(text)
+    text = _TRAILING_SPACES_RE.sub("", text)
+    return _BLANK_LINES_RE.sub("\n", text).strip()
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> Tuple[str, int]:
+    """
+    Обрезает текст до max_tokens по оценке estimate_tokens.
+    Возвращает обрезанный текст и число отброшенных токенов.
+    """
+    total = estimate_tokens(text)
+    if total <= max_tokens:
+        return text, 0
+    used = 0
+    cut = 0
+    for match in _TOKEN_RE.finditer(text):
+        cost = _token_cost(match.group())
+        if used + cost > max_tokens:
+            break
+        used += cost
+        cut = match.end()
+    return text[:cut].rstrip() + TRIM_MARKER, total - used
+
+
+class PromptTemplate:
+    """
+    Шаблон промпта из двух сообщений: статическая системная часть (инструкции,
+    одинаковая для всех запросов - провайдер может кэшировать этот префикс)
+    и короткая пользовательская часть с данными запроса.
+    Оба текста компактируются один раз при импорте модуля.
+    """
+
+    def __init__(self, name: str, system: str, user: str):
+        self.name = name
+        # Сколько стоил тот же шаблон, отправленный одним сообщением с отступами
+        self.raw_tokens = estimate_tokens(system) + estimate_tokens(user)
+        self.system = compact_prompt(system)
+        self.user = compact_prompt(user)
+        self.system_tokens = estimate_tokens(self.system)
+        self.compact_tokens = self.system_tokens + estimate_tokens(self.user)
+
+        self.renders = 0
+        self.user_tokens_sent = 0
+        self.trimmed_fields = 0
+        self.trimmed_tokens = 0
+
+    def render(self, **fields: Any) -> Tuple[str, str]:
+        """
+        Подставляет данные в пользовательскую часть.
+        Текстовые поля длиннее AI_PROMPT_MAX_INPUT_TOKENS обрезаются.
+        Возвращает (system, user).
+        """
+        values = {}
+        for key, value in fields.items():
+            if isinstance(value, str):
+                value, dropped = trim_to_tokens(value, settings.AI_PROMPT_MAX_INPUT_TOKENS)
+                if dropped:
+                    self.trimmed_fields += 1
+                    self.trimmed_tokens += dropped
+            values[key] = value
+        user = compact_prompt(self.user.format(**values))
+        self.renders += 1
+        self.user_tokens_sent += estimate_tokens(user)
+        return self.system, user
+
+    def get_statistics(self) -> Dict[str, Any]:
+        saved_per_request = self.raw_tokens - self.compact_tokens
+        return {
+            "template": self.name,
+            "raw_template_tokens": self.raw_tokens,
+            "compact_template_tokens": self.compact_tokens,
+            "saved_tokens_per_request": saved_per_request,
+            "saved_percent": round(saved_per_request / self.raw_tokens * 100, 1) if self.raw_tokens else 0.0,
+            "static_system_tokens": self.system_tokens,
+            "renders": self.renders,
+            "avg_user_tokens": round(self.user_tokens_sent / self.renders, 1) if self.renders else 0.0,
+            "trimmed_fields": self.trimmed_fields,
+            "trimmed_tokens": self.trimmed_tokens,
+            "total_saved_tokens": saved_per_request * self.renders + self.trimmed_tokens,
+        }
+
+
+WORKOUT_PLAN = PromptTemplate(
+    "workout_plan",
+    system="""
+    Ты - профессиональный фитнес-тренер. Создай подробный план тренировки по данным пользователя.
+
+    Структура плана:
+    1. Разминка (упражнения и время)
+    2. Основная часть (упражнения, подходы, повторения, техника)
+    3. Заминка (растяжка)
+    4. Рекомендации (частота, питание, восстановление)
+
+    Учитывай тип тренировки, сложность и длительность при составлении плана.
+    Будь конкретен и мотивирующ.
+
+    ВАЖНОЕ ОГРАНИЧЕНИЕ: НЕ используй таблицы, символы звездочек (*), маркдаун или другие форматирования.
+    Используй только обычный текст с нумерованными и буквенными списками.
+    """,
+    user="""
+    ЗАПРОС ПОЛЬЗОВАТЕЛЯ: {user_request}
+    ТИП ТРЕНИРОВКИ: {plan_type}
+    СЛОЖНОСТЬ: {difficulty}
+    ДЛИТЕЛЬНОСТЬ: {duration_minutes} минут
+    """,
+)
+
+EXERCISE_RECOMMENDATIONS = PromptTemplate(
+    "exercise_recommendations",
+    system="""
+    Ты - спортивный врач. Пользователь сообщает о своих ограничениях (травмы, боли, состояние здоровья).
+
+    Предоставь:
+    1. Безопасные упражнения (с объяснением почему они безопасны)
+    2. Упражнения которых следует избегать (и почему)
+    3. Общие рекомендации по тренировкам
+    4. Советы по восстановлению и профилактике
+
+    Будь профессиональным и заботливым.
+
+    ВАЖНОЕ ОГРАНИЧЕНИЕ: НЕ используй таблицы, символы звездочек (*), маркдаун или другие форматирования.
+    Используй только обычный текст с нумерованными и буквенными списками.
+    """,
+    user="""
+    ОГРАНИЧЕНИЯ ПОЛЬЗОВАТЕЛЯ: {combined_request}
+    """,
+)
+
+WEEKLY_CHALLENGE = PromptTemplate(
+    "weekly_challenge",
+    system="""
+    Ты - мотивационный фитнес-коуч. Создай увлекательное недельное испытание.
+
+    ВАЖНО: Если пользователь указал цели, ты ОБЯЗАН использовать их в своем ответе. Не игнорируй их!
+    Включи в свой план конкретные цифры: количество повторений, подходов и минут тренировки, соответствующие целям пользователя.
+
+    Структура испытания:
+    1. Название и цель
+    2. План на каждый день недели (с указанием количества повторений, подходов и времени)
+    3. Советы по выполнению
+    4. Ожидаемые результаты
+
+    Сделай испытание достижимым но challenging.
+    """,
+    user="""
+    ТИП ИСПЫТАНИЯ: {challenge_type}
+    {metrics}
+    """,
+)
+
+INJURY_RISK = PromptTemplate(
+    "injury_risk",
+    system="""
+    Ты - спортивный врач и специалист по фитнесу. Проанализируй риск травмы на основе предоставленных данных.
+
+    СТРОГО ВОЗВРАЩАЙ ОТВЕТ В СЛЕДУЮЩЕМ ФОРМАТЕ:
+
+    1. Уровень риска: [ВСТАВЬТЕ ЗДЕСЬ: Низкий/Средний/Высокий]
+    Объяснение уровня риска в 1-2 предложениях.
+
+    2. Основные факторы риска
+    - Фактор 1
+    - Фактор 2
+    - Фактор 3
+
+    3. Рекомендации по снижению риска
+    - Рекомендация 1
+    - Рекомендация 2
+    - Рекомендация 3
+
+    4. Альтернативные безопасные упражнения
+    - Упражнение 1 и почему оно безопаснее
+    - Упражнение 2 и почему оно безопаснее
+
+    ВАЖНО:
+    1. Первой строкой после заголовка "1. Уровень риска:" ДОЛЖНО БЫТЬ только одно слово: "Низкий", "Средний" или "Высокий"
+    2. НЕ используй символы решетки (#), звездочки (*), таблицы или маркдаун-форматирование
+    3. Используй только обычные цифры с точками для нумерации и дефисы для списков
+    4. Будь конкретным и профессиональным
+    5. Учитывай факторы риска пользователя
+    """,
+    user="""
+    ДАННЫЕ ДЛЯ АНАЛИЗА:
+    {description}
+    """,
+)
+
+TEMPLATES: List[PromptTemplate] = [WORKOUT_PLAN, EXERCISE_RECOMMENDATIONS, WEEKLY_CHALLENGE, INJURY_RISK]
+
+
+def get_prompt_statistics() -> List[Dict[str, Any]]:
+    """Экономия токенов по шаблонам"""
+    return [template.get_statistics() for template in TEMPLATES]
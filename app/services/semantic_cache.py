@@ -0,0 +1,198 @@
+# app/services/semantic_cache.py
+import asyncio
+import logging
+import random
+import re
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Set, Tuple
+
+from app.config import settings
+from app.crud import crud_exercise_recommendation
+from app.database import run_in_session
+
+logger = logging.getLogger(__name__)
+
+# Источники ответа без обращения к модели - такие ответы не пополняют семантический кэш
+LOCAL_SOURCES = frozenset({"cache", "semantic_cache", "offline", "demo", "budget"})
+
+_WORD_RE = re.compile(r"[a-zа-я0-9_]+")
+# Окончания для грубого стемминга: "колено", "колене", "коленях" -> "колен"
+_ENDING_RE = re.compile(
+    r"(иями|ями|ами|ого|его|ому|ему|ыми|ими|иях|ях|ах|ов|ев|ей|ий|ый|ой|ая|яя|ое|ее|ую|юю|ом|ем|ам|ям|ит|ет|ют|ут|ат|ят|ть|а|я|о|е|ы|и|у|ю|ь|й)$"
+)
+_STOP_WORDS = frozenset(
+    "в во на при и или у меня мне с со по для от до за из к ко не но а что как это же бы очень "
+    "немного сильно иногда часто после время когда есть был была".split()
+)
+_STEM_LENGTH = 6
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def shingles(text: str) -> FrozenSet[str]:
+    """Нормализует текст (регистр, ё, пунктуация, стоп-слова, окончания) и возвращает множество основ слов"""
+    result = set()
+    for word in _WORD_RE.findall(text.lower().replace("ё", "е")):
+        if word in _STOP_WORDS:
+            continue
+        if len(word) > 3:
+            word = _ENDING_RE.sub("", word) or word
+        result.add(word[:_STEM_LENGTH])
+    return frozenset(result)
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """MinHash-подпись множества: num_perm универсальных хеш-функций (a*x + b) mod p"""
+
+    def __init__(self, num_perm: int, seed: int = 1):
+        rng = random.Random(seed)
+        self.params = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME)) for _ in range(num_perm)]
+
+    def signature(self, tokens: FrozenSet[str]) -> Tuple[int, ...]:
+        hashes = [zlib.crc32(token.encode()) for token in tokens]
+        return tuple(min((a * value + b) % _MERSENNE_PRIME for value in hashes) for a, b in self.params)
+
+
+class SemanticCache:
+    """
+    Кэш почти одинаковых запросов: похожие описания ограничений получают сохраненный ответ без вызова AI.
+    Текст нормализуется в множество основ слов; LSH по MinHash-подписям (bands x rows)
+    быстро находит кандидатов, а точное сходство Жаккара сравнивается с порогом.
+    Индекс живет в памяти и восстанавливается из exercise_recommendations при старте.
+    """
+
+    def __init__(self):
+        self.threshold = settings.AI_SEMANTIC_CACHE_THRESHOLD
+        self.bands = max(1, settings.AI_SEMANTIC_CACHE_BANDS)
+        self.rows = max(1, settings.AI_SEMANTIC_CACHE_NUM_PERM // self.bands)
+        self._hasher = MinHasher(self.bands * self.rows)
+        self._entries: "OrderedDict[int, Tuple[str, FrozenSet[str], Tuple[int, ...], str]]" = OrderedDict()
+        self._buckets: Dict[Tuple[str, int, Tuple[int, ...]], Set[int]] = {}
+        self._by_tokens: Dict[Tuple[str, FrozenSet[str]], int] = {}
+        self._next_id = 0
+        self._loaded = False
+
+        self.lookups = 0
+        self.hits = 0
+        self.candidates_checked = 0
+        self.hit_similarity_sum = 0.0
+        self.evictions = 0
+
+    def _band_keys(self, endpoint: str, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield endpoint, band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def lookup(self, endpoint: str, text: str) -> Optional[str]:
+        """Сохраненный ответ на самый похожий запрос, если сходство не ниже порога"""
+        self.lookups += 1
+        tokens = shingles(text)
+        if not tokens:
+            return None
+        signature = self._hasher.signature(tokens)
+        candidates: Set[int] = set()
+        for key in self._band_keys(endpoint, signature):
+            candidates.update(self._buckets.get(key, ()))
+
+        best_similarity, best_response = 0.0, None
+        for entry_id in candidates:
+            self.candidates_checked += 1
+            _, entry_tokens, _, response = self._entries[entry_id]
+            similarity = jaccard(tokens, entry_tokens)
+            if similarity > best_similarity:
+                best_similarity, best_response = similarity, response
+
+        if best_response is None or best_similarity < self.threshold:
+            return None
+        self.hits += 1
+        self.hit_similarity_sum += best_similarity
+        logger.info(f"Семантический кэш: попадание (сходство {best_similarity:.2f}, эндпоинт {endpoint})")
+        return best_response
+
+    def add(self, endpoint: str, text: str, response: str):
+        """Добавляет запрос и ответ в индекс (старые записи вытесняются при переполнении)"""
+        tokens = shingles(text)
+        if not tokens:
+            return
+        existing = self._by_tokens.get((endpoint, tokens))
+        if existing is not None:
+            # Та же формулировка после нормализации - обновляем ответ, индекс не меняется
+            self._entries[existing] = self._entries[existing][:3] + (response,)
+            self._entries.move_to_end(existing)
+            return
+        signature = self._hasher.signature(tokens)
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (endpoint, tokens, signature, response)
+        self._by_tokens[(endpoint, tokens)] = entry_id
+        for key in self._band_keys(endpoint, signature):
+            self._buckets.setdefault(key, set()).add(entry_id)
+        while len(self._entries) > settings.AI_SEMANTIC_CACHE_MAX_ENTRIES:
+            self._evict_oldest()
+
+    def _evict_oldest(self):
+        entry_id, (endpoint, tokens, signature, _) = self._entries.popitem(last=False)
+        del self._by_tokens[(endpoint, tokens)]
+        for key in self._band_keys(endpoint, signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+        self.evictions += 1
+
+    async def load(self):
+        """
+        Восстанавливает индекс из последних рекомендаций в Postgres (вызывается при старте приложения).
+        Берутся только ответы модели: офлайн, демо и прочие локальные ответы в индекс не попадают,
+        как и при пополнении во время работы.
+        """
+        if self._loaded or not settings.AI_SEMANTIC_CACHE_ENABLED:
+            return
+        try:
+            rows = await asyncio.to_thread(
+                run_in_session,
+                crud_exercise_recommendation.get_recent_for_index,
+                settings.AI_SEMANTIC_CACHE_MAX_ENTRIES,
+                LOCAL_SOURCES
+            )
+        except Exception as e:
+            logger.warning(f"Семантический кэш: не удалось загрузить рекомендации из БД: {e}")
+            return
+        # Строки идут от новых к старым - добавляем в обратном порядке, чтобы новые вытеснялись последними
+        for limitations_type, user_limitations, response in reversed(rows):
+            self.add("exercise_recommendations", similarity_text(limitations_type, user_limitations), response)
+        self._loaded = True
+        logger.info(f"Семантический кэш: загружено записей - {len(self._entries)}")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.AI_SEMANTIC_CACHE_ENABLED,
+            "threshold": self.threshold,
+            "bands": self.bands,
+            "rows": self.rows,
+            "entries": len(self._entries),
+            "max_entries": settings.AI_SEMANTIC_CACHE_MAX_ENTRIES,
+            "buckets": len(self._buckets),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "avg_hit_similarity": round(self.hit_similarity_sum / self.hits, 3) if self.hits else 0.0,
+            "avg_candidates": round(self.candidates_checked / self.lookups, 2) if self.lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+def similarity_text(limitations_type: Optional[str], user_limitations: Optional[str]) -> str:
+    """Текст рекомендации для сравнения: тип ограничений и описание пользователя"""
+    return f"{limitations_type or ''} {user_limitations or ''}"
+
+
+# Общий семантический кэш
+semantic_cache = SemanticCache()
@@ -0,0 +1,66 @@
+# app/services/singleflight.py
+import asyncio
+import logging
+from typing import Dict, Any, Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Реестр запросов "в полете": одновременные одинаковые вызовы (по отпечатку)
+    ожидают один общий upstream-вызов вместо того, чтобы выполнять свой.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+        self.leaders = 0
+        self.coalesced = 0
+        self.cancelled_waiters = 0
+        self.errors = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет func() один раз для всех одновременных вызовов с одинаковым ключом.
+        Общий вызов идет в отдельной задаче и защищен asyncio.shield: отмена
+        одного ожидающего (клиент отключился) не отменяет вызов для остальных.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.create_task(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._on_done(key, t))
+        else:
+            self.coalesced += 1
+            logger.info(f"Запрос объединен с уже выполняющимся (ожидающих: {self.coalesced})")
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                self.cancelled_waiters += 1
+            raise
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Возвращает статистику объединения запросов"""
+        return {
+            "in_flight": len(self._in_flight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "cancelled_waiters": self.cancelled_waiters,
+            "errors": self.errors,
+        }
+
+
+# Общий реестр для запросов к AI
+ai_single_flight = SingleFlight()
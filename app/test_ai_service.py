@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import sys
 import os
@@ -6,6 +7,7 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.services.ai_service import (
+    ai_service,
     generate_workout_plan,
     generate_exercise_recommendations,
     generate_weekly_challenge, 
@@ -18,17 +20,17 @@ async def test_ai_services():
     
     # Тест генерации плана тренировок
     print("1. 📋 ТЕСТ ПЛАНОВ ТРЕНИРОВОК:")
-    workout_plan = await generate_workout_plan("Хочу план для похудения для начинающих")
+    workout_plan = await generate_workout_plan("Хочу план для похудения", "weight_loss", "beginner", 45)
     print(workout_plan[:500] + "...\n")
     
     # Тест рекомендаций при травмах
     print("2. 🏥 ТЕСТ РЕКОМЕНДАЦИЙ ПРИ ТРАВМАХ:")
-    recommendations = await generate_exercise_recommendations("Болит спина и колени")
+    recommendations = await generate_exercise_recommendations("Тип ограничений: травма. Описание: Болит спина и колени")
     print(recommendations[:500] + "...\n")
     
     # Тест генерации испытаний
     print("3. 🏆 ТЕСТ ИСПЫТАНИЙ:")
-    challenge = await generate_weekly_challenge("силовая тренировка")
+    challenge = await generate_weekly_challenge("силовая тренировка", {"target_reps": 300, "target_sets": 3})
     print(challenge[:500] + "...\n")
     
     # Тест анализа рисков
@@ -39,4 +41,11 @@ async def test_ai_services():
     print("✅ ВСЕ ТЕСТЫ ЗАВЕРШЕНЫ!")
 
 if __name__ == "__main__":
+    # --stub: вместо OpenRouter - локальная заглушка (scripts/openrouter_stub.py)
+    parser = argparse.ArgumentParser(description="Проверка AI сервисов")
+    parser.add_argument("--stub", action="store_true", help="Запросы к локальной заглушке OpenRouter")
+    if parser.parse_args().stub:
+        from scripts.openrouter_stub import OpenRouterStub
+        ai_service.base_url = OpenRouterStub().start()
+        ai_service.api_key = ai_service.api_key or "stub-key"
     asyncio.run(test_ai_services())
\ No newline at end of file
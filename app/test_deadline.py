@@ -0,0 +1,27 @@
+import math
+
+import pytest
+
+from app.config import settings
+from app.services.deadline import deadline_seconds_for
+
+
+@pytest.mark.parametrize("header_value", ["nan", "NaN", "inf", "-inf", "infinity", "-5", "0", "abc", "", None])
+def test_invalid_header_falls_back_to_route_default(header_value):
+    """Некорректный заголовок (в том числе nan/inf) - бюджет маршрута по умолчанию"""
+    seconds = deadline_seconds_for("/workout-plans", header_value)
+    assert math.isfinite(seconds)
+    assert seconds == min(settings.AI_DEADLINE_SECONDS, settings.AI_DEADLINE_MAX_SECONDS)
+
+
+def test_invalid_header_uses_longest_route_prefix():
+    seconds = deadline_seconds_for("/injury-predictions/", "nan")
+    assert seconds == min(settings.AI_DEADLINE_ROUTES["/injury-predictions"], settings.AI_DEADLINE_MAX_SECONDS)
+
+
+def test_header_value_is_used():
+    assert deadline_seconds_for("/workout-plans", "7.5") == 7.5
+
+
+def test_header_value_is_capped():
+    assert deadline_seconds_for("/workout-plans", "1e9") == settings.AI_DEADLINE_MAX_SECONDS
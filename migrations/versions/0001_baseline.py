@@ -0,0 +1,161 @@
+"""baseline: исходная схема (как ее создавал Base.metadata.create_all)
+
+Базы, созданные раньше через create_all при старте приложения, уже содержат эти
+таблицы - миграция создает только отсутствующие, поэтому alembic upgrade head
+работает и на новой, и на существующей базе без ручного alembic stamp.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _missing(table_name: str) -> bool:
+    if context.is_offline_mode():
+        return True
+    return not sa.inspect(op.get_bind()).has_table(table_name)
+
+
+def upgrade() -> None:
+    if _missing("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("telegram_id", sa.BigInteger(), nullable=True),
+            sa.Column("google_id", sa.String(255), nullable=True),
+            sa.Column("email", sa.String(255), nullable=False),
+            sa.Column("username", sa.String(100), nullable=False),
+            sa.Column("password", sa.String(255), nullable=False),
+            sa.Column("fitness_level", sa.String(20)),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_telegram_id", "users", ["telegram_id"], unique=True)
+        op.create_index("ix_users_google_id", "users", ["google_id"], unique=True)
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if _missing("user_anthropometrics"):
+        op.create_table(
+            "user_anthropometrics",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("height_cm", sa.Integer(), nullable=False),
+            sa.Column("weight_kg", sa.Numeric(5, 2), nullable=False),
+            sa.Column("age", sa.Integer(), nullable=False),
+            sa.Column("gender", sa.String(20), nullable=False),
+            sa.Column("injuries", sa.Text()),
+            sa.Column("fitness_goals", sa.Text()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+            sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_user_anthropometrics_id", "user_anthropometrics", ["id"])
+
+    if _missing("workout_plans"):
+        op.create_table(
+            "workout_plans",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("user_request", sa.Text(), nullable=False),
+            sa.Column("ai_generated_plan", sa.Text(), nullable=False),
+            sa.Column("plan_type", sa.String(50), nullable=False),
+            sa.Column("difficulty", sa.String(20)),
+            sa.Column("duration_minutes", sa.Integer()),
+            sa.Column("is_completed", sa.Boolean()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_workout_plans_id", "workout_plans", ["id"])
+
+    if _missing("exercise_recommendations"):
+        op.create_table(
+            "exercise_recommendations",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("user_limitations", sa.Text(), nullable=False),
+            sa.Column("limitations_type", sa.String(100), nullable=False),
+            sa.Column("ai_recommended_exercises", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_exercise_recommendations_id", "exercise_recommendations", ["id"])
+
+    if _missing("weekly_challenges"):
+        op.create_table(
+            "weekly_challenges",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("ai_generated_challenge", sa.Text(), nullable=False),
+            sa.Column("week_number", sa.Integer(), nullable=False),
+            sa.Column("challenge_type", sa.String(50), nullable=False),
+            sa.Column("target_metrics", postgresql.JSONB()),
+            sa.Column("completed", sa.Boolean()),
+            sa.Column("completed_at", sa.TIMESTAMP()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_weekly_challenges_id", "weekly_challenges", ["id"])
+
+    if _missing("workout_history"):
+        op.create_table(
+            "workout_history",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("plan_id", sa.Integer(), sa.ForeignKey("workout_plans.id")),
+            sa.Column("exercises_completed", postgresql.JSONB(), nullable=False),
+            sa.Column("session_duration", sa.Integer(), nullable=False),
+            sa.Column("perceived_exertion", sa.Integer()),
+            sa.Column("user_feedback", sa.Text()),
+            sa.Column("notes", sa.Text()),
+            sa.Column("completed_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_workout_history_id", "workout_history", ["id"])
+
+    if _missing("injury_predictions"):
+        op.create_table(
+            "injury_predictions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("workout_plan_id", sa.Integer(), sa.ForeignKey("workout_plans.id")),
+            sa.Column("exercises_analyzed", postgresql.JSONB(), nullable=False),
+            sa.Column("ai_risk_prediction", sa.Text(), nullable=False),
+            sa.Column("risk_level", sa.String(50)),
+            sa.Column("risk_factors", postgresql.JSONB()),
+            sa.Column("recommendations", sa.Text()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_injury_predictions_id", "injury_predictions", ["id"])
+
+    if _missing("ai_interactions"):
+        op.create_table(
+            "ai_interactions",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("interaction_type", sa.String(50), nullable=False),
+            sa.Column("user_input", sa.Text(), nullable=False),
+            sa.Column("ai_prompt", sa.Text(), nullable=False),
+            sa.Column("ai_response", sa.Text(), nullable=False),
+            sa.Column("model_used", sa.String(100), nullable=False),
+            sa.Column("tokens_used", sa.Integer()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_ai_interactions_id", "ai_interactions", ["id"])
+
+
+def downgrade() -> None:
+    for table_name in (
+        "ai_interactions",
+        "injury_predictions",
+        "workout_history",
+        "weekly_challenges",
+        "exercise_recommendations",
+        "workout_plans",
+        "user_anthropometrics",
+        "users",
+    ):
+        op.drop_table(table_name)
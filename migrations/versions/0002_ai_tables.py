@@ -0,0 +1,105 @@
+"""ai tables: кэш ответов, очередь задач, AI-бюджет, словари сжатия, latency_ms журнала
+
+Как и baseline, создает только отсутствующее: на базах, где приложение уже
+создало эти таблицы через create_all, миграция ничего не меняет.
+Перевод AI-текстов в bytea (сжатие) - отдельно: python -m scripts.text_dictionary migrate.
+
+Revision ID: 0002_ai_tables
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0002_ai_tables"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def _missing(table_name: str, column_name: str = None) -> bool:
+    if context.is_offline_mode():
+        return True
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table_name):
+        return True
+    if column_name is None:
+        return False
+    return column_name not in {column["name"] for column in inspector.get_columns(table_name)}
+
+
+def upgrade() -> None:
+    if _missing("ai_interactions", "latency_ms"):
+        op.add_column("ai_interactions", sa.Column("latency_ms", sa.Integer()))
+
+    if _missing("ai_response_cache"):
+        op.create_table(
+            "ai_response_cache",
+            sa.Column("cache_key", sa.String(64), primary_key=True),
+            sa.Column("endpoint", sa.String(50)),
+            sa.Column("model_used", sa.String(100), nullable=False),
+            sa.Column("response", sa.Text(), nullable=False),
+            sa.Column("hit_count", sa.Integer()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+            sa.Column("expires_at", sa.TIMESTAMP(), nullable=False),
+        )
+        op.create_index("ix_ai_response_cache_expires_at", "ai_response_cache", ["expires_at"])
+
+    if _missing("ai_jobs"):
+        op.create_table(
+            "ai_jobs",
+            sa.Column("id", sa.String(32), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("job_type", sa.String(50), nullable=False),
+            sa.Column("payload", postgresql.JSONB(), nullable=False),
+            sa.Column("status", sa.String(20), nullable=False),
+            sa.Column("attempts", sa.Integer(), nullable=False),
+            sa.Column("max_attempts", sa.Integer(), nullable=False),
+            sa.Column("result_id", sa.Integer()),
+            sa.Column("error", sa.Text()),
+            sa.Column("run_after", sa.TIMESTAMP(), server_default=sa.func.now()),
+            sa.Column("locked_by", sa.String(100)),
+            sa.Column("locked_at", sa.TIMESTAMP()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+            sa.Column("finished_at", sa.TIMESTAMP()),
+        )
+        op.create_index("ix_ai_jobs_status", "ai_jobs", ["status"])
+
+    if _missing("ai_budget_days"):
+        op.create_table(
+            "ai_budget_days",
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("budget_rub", sa.Float(), nullable=False),
+            sa.Column("spent_rub", sa.Float(), nullable=False),
+            sa.Column("updated_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+
+    if _missing("ai_budget_leases"):
+        op.create_table(
+            "ai_budget_leases",
+            sa.Column("day", sa.Date(), sa.ForeignKey("ai_budget_days.day", ondelete="CASCADE"), primary_key=True),
+            sa.Column("holder", sa.String(100), primary_key=True),
+            sa.Column("reserved_rub", sa.Float(), nullable=False),
+            sa.Column("renewed_at", sa.TIMESTAMP(), nullable=False),
+        )
+
+    if _missing("text_dictionaries"):
+        op.create_table(
+            "text_dictionaries",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("column_key", sa.String(64), nullable=False),
+            sa.Column("dictionary", sa.LargeBinary(), nullable=False),
+            sa.Column("sample_count", sa.Integer(), nullable=False),
+            sa.Column("sample_bytes", sa.Integer(), nullable=False),
+            sa.Column("ratio", sa.Float()),
+            sa.Column("created_at", sa.TIMESTAMP(), server_default=sa.func.now()),
+        )
+        op.create_index("ix_text_dictionaries_id", "text_dictionaries", ["id"])
+        op.create_index("ix_text_dictionaries_column_key", "text_dictionaries", ["column_key"])
+
+
+def downgrade() -> None:
+    for table_name in ("text_dictionaries", "ai_budget_leases", "ai_budget_days", "ai_jobs", "ai_response_cache"):
+        op.drop_table(table_name)
+    op.drop_column("ai_interactions", "latency_ms")
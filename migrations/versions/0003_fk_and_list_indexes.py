@@ -0,0 +1,71 @@
+"""indexes: внешние ключи и списки пользователя (CREATE INDEX CONCURRENTLY)
+
+Без индексов по user_id / plan_id / workout_plan_id каждый список пользователя
+и каждая проверка внешнего ключа при удалении пользователя или плана - полный
+просмотр таблицы. Индексы строятся CONCURRENTLY (без блокировки записи), поэтому
+вне транзакции миграции (autocommit_block). Прерванная сборка оставляет
+невалидный индекс - он удаляется и строится заново при повторном запуске.
+Проверка, что запросы используют индексы: python -m scripts.explain_indexes
+
+Revision ID: 0003_fk_and_list_indexes
+Revises: 0002_ai_tables
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0003_fk_and_list_indexes"
+down_revision = "0002_ai_tables"
+branch_labels = None
+depends_on = None
+
+# (имя, таблица, колонки). Имена совпадают с индексами в моделях app/models
+INDEXES = [
+    # Списки от новых к старым с курсором (app/pagination.py); ведущий user_id покрывает и внешний ключ
+    ("ix_workout_plans_user_created_at_id", "workout_plans", ["user_id", "created_at DESC", "id DESC"]),
+    ("ix_exercise_recommendations_user_created_at_id", "exercise_recommendations", ["user_id", "created_at DESC", "id DESC"]),
+    ("ix_weekly_challenges_user_created_at_id", "weekly_challenges", ["user_id", "created_at DESC", "id DESC"]),
+    ("ix_injury_predictions_user_created_at_id", "injury_predictions", ["user_id", "created_at DESC", "id DESC"]),
+    ("ix_ai_interactions_user_created_at_id", "ai_interactions", ["user_id", "created_at DESC", "id DESC"]),
+    ("ix_workout_history_user_completed_at_id", "workout_history", ["user_id", "completed_at DESC", "id DESC"]),
+    # Испытание пользователя на неделю (get_current_week, предгенерация)
+    ("ix_weekly_challenges_user_id_week_number", "weekly_challenges", ["user_id", "week_number"]),
+    # Остальные внешние ключи
+    ("ix_user_anthropometrics_user_id", "user_anthropometrics", ["user_id"]),
+    ("ix_ai_jobs_user_id", "ai_jobs", ["user_id"]),
+    ("ix_workout_history_plan_id", "workout_history", ["plan_id"]),
+    ("ix_injury_predictions_workout_plan_id", "injury_predictions", ["workout_plan_id"]),
+]
+
+
+def _is_invalid(name: str) -> bool:
+    """Индекс остался невалидным после прерванного CREATE INDEX CONCURRENTLY"""
+    if context.is_offline_mode():
+        return False
+    return op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).first() is not None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table_name, columns in INDEXES:
+            if _is_invalid(name):
+                op.drop_index(name, table_name=table_name, postgresql_concurrently=True)
+            op.create_index(
+                name,
+                table_name,
+                [sa.text(column) for column in columns],
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table_name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,33 @@
+"""recommendation source: источник ответа в exercise_recommendations.model_used
+
+Семантический кэш при старте берет только рекомендации, сгенерированные моделью
+(не офлайн, демо или ответ при исчерпанном бюджете). Старые строки без источника
+в индекс не попадают.
+
+Revision ID: 0004_recommendation_source
+Revises: 0003_fk_and_list_indexes
+Create Date: 2026-10-18
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+revision = "0004_recommendation_source"
+down_revision = "0003_fk_and_list_indexes"
+branch_labels = None
+depends_on = None
+
+
+def _missing_column(table_name: str, column_name: str) -> bool:
+    if context.is_offline_mode():
+        return True
+    columns = sa.inspect(op.get_bind()).get_columns(table_name)
+    return column_name not in {column["name"] for column in columns}
+
+
+def upgrade() -> None:
+    if _missing_column("exercise_recommendations", "model_used"):
+        op.add_column("exercise_recommendations", sa.Column("model_used", sa.String(100)))
+
+
+def downgrade() -> None:
+    op.drop_column("exercise_recommendations", "model_used")
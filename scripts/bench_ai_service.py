@@ -0,0 +1,185 @@
+"""
+Нагрузочный замер AIService на локальной заглушке OpenRouter.
+
+Прогоняет запросы через _make_ai_request (или потоковый путь) со всеми
+механизмами приложения - допуском, бюджетом, хеджированием, здоровьем моделей
+и фолбэком - и выводит пропускную способность, хвосты задержки и источники
+ответов (какая модель ответила, сколько раз сработал фолбэк или резервный режим).
+
+Бюджет, кэш ответов и журнал ai_interactions переключаются на варианты
+в памяти, поэтому Postgres не нужен (DATABASE_URL и SECRET_KEY все равно
+должны быть заданы - в окружении или .env).
+
+Запуск из корня репозитория:
+    python -m scripts.bench_ai_service                          # здоровые модели
+    python -m scripts.bench_ai_service --scenario flaky -n 500 -c 50
+    python -m scripts.bench_ai_service --scenario timeouts --stream
+    python -m scripts.bench_ai_service --profiles profiles.json  # свои профили (см. openrouter_stub)
+    python -m scripts.bench_ai_service --url http://127.0.0.1:8089/api/v1/chat/completions  # внешняя заглушка
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Замер не должен трогать Postgres: бюджет, кэш и журнал - в памяти процесса
+os.environ.setdefault("AI_BUDGET_BACKEND", "memory")
+os.environ.setdefault("AI_CACHE_DB_ENABLED", "false")
+os.environ.setdefault("AI_LOG_ENABLED", "false")
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+from app.config import settings  # noqa: E402
+from app.logging_config import setup_logging, shutdown_logging  # noqa: E402
+from app.services.ai_service import ai_service, AIResult  # noqa: E402
+from app.services.admission import AdmissionRejected  # noqa: E402
+from app.services.budget_ledger import budget_ledger  # noqa: E402
+from app.services.http_client import ai_http_client  # noqa: E402
+from scripts.openrouter_stub import OpenRouterStub, DEFAULT_MODEL  # noqa: E402
+
+PROMPT = "Составь план тренировки на 45 минут для среднего уровня. Запрос {index}: {text}"
+PROMPT_TEXT = "хочу укрепить спину и ноги, есть гантели и турник"
+
+
+def scenario_profiles(scenario: str, models: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Готовые профили заглушки: первая модель в списке деградирует, остальные здоровы"""
+    first = models[0]
+    base = {DEFAULT_MODEL: {"latency_ms": 600, "latency_p95_ms": 1500}}
+    if scenario == "flaky":
+        base[first] = {"rate_5xx": 0.3}
+    elif scenario == "rate-limited":
+        base[first] = {"rate_429": 0.5}
+    elif scenario == "slow":
+        base[first] = {"latency_ms": 3000, "latency_p95_ms": 12000}
+    elif scenario == "timeouts":
+        base[first] = {"timeout_rate": 0.2, "timeout_seconds": settings.AI_HTTP_READ_TIMEOUT + 5}
+    elif scenario == "outage":
+        base.update({model: {"rate_5xx": 1.0} for model in models})
+    return base
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_request(index: int, stream: bool, max_tokens: int) -> Dict[str, Any]:
+    """Один запрос; возвращает источник ответа, полную задержку и время до первого фрагмента"""
+    prompt = PROMPT.format(index=index, text=PROMPT_TEXT)
+    started_at = time.monotonic()
+    first_chunk_at: Optional[float] = None
+    try:
+        if stream:
+            outcome: Dict[str, Any] = {"model_used": "demo", "tokens_used": None}
+            async for _ in ai_service._stream_generate(prompt, max_tokens, "bench", False, None, outcome):
+                if first_chunk_at is None:
+                    first_chunk_at = time.monotonic()
+            source = outcome["model_used"]
+        else:
+            result: AIResult = await ai_service._make_ai_request_result(
+                prompt, max_tokens, endpoint="bench", use_cache=False
+            )
+            source = result.model_used
+    except AdmissionRejected:
+        source = "rejected"
+    except Exception as e:
+        source = f"error:{type(e).__name__}"
+    finished_at = time.monotonic()
+    return {
+        "source": source,
+        "latency": finished_at - started_at,
+        "ttfb": (first_chunk_at or finished_at) - started_at,
+    }
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    await ai_http_client.start()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(index: int):
+        async with semaphore:
+            return await run_request(index, args.stream, args.max_tokens)
+
+    started_at = time.monotonic()
+    try:
+        results = await asyncio.gather(*(limited(index) for index in range(args.requests)))
+    finally:
+        elapsed = time.monotonic() - started_at
+        await budget_ledger.close()
+        await ai_http_client.close()
+
+    latencies = [result["latency"] for result in results]
+    sources = Counter(result["source"] for result in results)
+    first_model = ai_service.model_list[0]
+    report = {
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(len(results) / elapsed, 2) if elapsed else 0.0,
+        "latency_s": {
+            name: round(percentile(latencies, fraction), 3)
+            for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0))
+        },
+        "sources": dict(sources.most_common()),
+        "fallback_to_other_model": sum(
+            count for source, count in sources.items() if source in ai_service.model_list and source != first_model
+        ),
+        "degraded": sum(sources[source] for source in ("offline", "demo", "budget")),
+        "rejected": sources["rejected"],
+        "hedging": ai_service.get_hedging_statistics(),
+        "models": [
+            {key: model[key] for key in ("model", "state", "ewma_latency_seconds", "error_rate", "successes", "failures")}
+            for model in ai_service.model_health.get_statistics()
+        ],
+    }
+    if args.stream:
+        ttfb = [result["ttfb"] for result in results]
+        report["ttfb_s"] = {name: round(percentile(ttfb, fraction), 3) for name, fraction in (("p50", 0.5), ("p99", 0.99))}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный замер AIService на заглушке OpenRouter")
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    parser.add_argument("-c", "--concurrency", type=int, default=20)
+    parser.add_argument("--scenario", default="healthy", choices=["healthy", "flaky", "rate-limited", "slow", "timeouts", "outage"])
+    parser.add_argument("--profiles", help="JSON-файл с профилями моделей (поверх сценария)")
+    parser.add_argument("--url", help="Адрес уже запущенной заглушки (иначе заглушка поднимается в процессе)")
+    parser.add_argument("--stream", action="store_true", help="Потоковые запросы (stream=true)")
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_logging()
+    stub = None
+    if args.url:
+        ai_service.base_url = args.url
+    else:
+        profiles = scenario_profiles(args.scenario, ai_service.model_list)
+        if args.profiles:
+            with open(args.profiles, encoding="utf-8") as profiles_file:
+                for model, fields in json.load(profiles_file).items():
+                    profiles.setdefault(model, {}).update(fields)
+        stub = OpenRouterStub(profiles, seed=args.seed)
+        ai_service.base_url = stub.start()
+    if not ai_service.api_key:
+        ai_service.api_key = "stub-key"
+
+    try:
+        report = asyncio.run(run_benchmark(args))
+        if stub is not None:
+            report["stub"] = stub.get_statistics()
+    finally:
+        if stub is not None:
+            stub.stop()
+        shutdown_logging()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
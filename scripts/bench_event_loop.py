@@ -0,0 +1,151 @@
+"""
+Замер блокировки event loop запросами к БД из async-маршрутов.
+
+Несколько одновременных "запросов" выполняют одну и ту же работу с БД тремя способами:
+    sync    - синхронный CRUD прямо внутри async def (как было в create_* маршрутах)
+    thread  - синхронный CRUD в пуле потоков (run_in_threadpool + run_in_session)
+    async   - AsyncSession + async_crud_* (asyncpg)
+Параллельно идет "пульс": задача, которая каждые --interval-ms мс засыпает и меряет,
+на сколько позже проснулась. Опоздание пульса - время, когда event loop не мог
+обслуживать другие запросы (стриминг, health-check, ответы из кэша).
+
+Нужен Postgres (DATABASE_URL). Запуск из корня репозитория:
+    python -m scripts.bench_event_loop                      # -c 20 -n 20, все режимы
+    python -m scripts.bench_event_loop --mode sync --mode async -c 50 --sleep-ms 5
+    python -m scripts.bench_event_loop --user-id 42         # список планов конкретного пользователя
+
+--sleep-ms добавляет к каждой операции SELECT pg_sleep(...) - имитация медленного запроса
+или сетевой задержки до БД в облаке.
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Dict, List
+
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+from sqlalchemy import func, select  # noqa: E402
+from starlette.concurrency import run_in_threadpool  # noqa: E402
+
+from app.crud import async_crud_workout_plan, crud_workout_plan  # noqa: E402
+from app.database import AsyncSessionLocal, SessionLocal, async_engine, engine, run_in_session  # noqa: E402
+import app.models  # noqa: E402,F401  Регистрирует связи моделей
+
+MODES = ("sync", "thread", "async")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def sync_operation(db, user_id: int, limit: int, sleep_seconds: float):
+    crud_workout_plan.get_by_user_id(db, user_id, 0, limit)
+    if sleep_seconds:
+        db.execute(select(func.pg_sleep(sleep_seconds)))
+    db.rollback()
+
+
+async def run_operation(mode: str, user_id: int, limit: int, sleep_seconds: float):
+    if mode == "sync":
+        # Так выглядел async-маршрут с Depends(get_db): каждый запрос к БД останавливает event loop
+        db = SessionLocal()
+        try:
+            sync_operation(db, user_id, limit, sleep_seconds)
+        finally:
+            db.close()
+    elif mode == "thread":
+        await run_in_threadpool(run_in_session, sync_operation, user_id, limit, sleep_seconds)
+    else:
+        async with AsyncSessionLocal() as db:
+            await async_crud_workout_plan.get_by_user_id(db, user_id, 0, limit)
+            if sleep_seconds:
+                await db.execute(select(func.pg_sleep(sleep_seconds)))
+
+
+async def heartbeat(interval: float, lags: List[float], stop: asyncio.Event):
+    """Опоздания пробуждений относительно interval (секунды)"""
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - started_at - interval))
+
+
+async def run_mode(mode: str, args) -> Dict[str, Any]:
+    sleep_seconds = args.sleep_ms / 1000
+    # Прогрев: соединения в пулах и подготовленные запросы не должны попасть в замер
+    await run_operation(mode, args.user_id, args.limit, 0.0)
+
+    lags: List[float] = []
+    latencies: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(heartbeat(args.interval_ms / 1000, lags, stop))
+
+    async def worker():
+        for _ in range(args.operations):
+            started_at = time.perf_counter()
+            await run_operation(mode, args.user_id, args.limit, sleep_seconds)
+            latencies.append(time.perf_counter() - started_at)
+            # Точка переключения между "запросами", как у настоящего маршрута после ответа
+            await asyncio.sleep(0)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started_at
+    stop.set()
+    await monitor
+
+    stalled = sum(lag for lag in lags if lag >= args.stall_threshold_ms / 1000)
+    return {
+        "mode": mode,
+        "operations": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "ops_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "op_latency_ms": {
+            name: round(percentile(latencies, fraction) * 1000, 2) for name, fraction in (("p50", 0.5), ("p99", 0.99))
+        },
+        "loop_lag_ms": {
+            name: round(percentile(lags, fraction) * 1000, 2)
+            for name, fraction in (("p50", 0.5), ("p99", 0.99), ("max", 1.0))
+        },
+        "stalled_s": round(stalled, 3),
+        "stalled_share": round(stalled / elapsed, 3) if elapsed else 0.0,
+        "heartbeats": len(lags),
+    }
+
+
+async def run_benchmark(args) -> List[Dict[str, Any]]:
+    try:
+        return [await run_mode(mode, args) for mode in args.mode or MODES]
+    finally:
+        await async_engine.dispose()
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Блокировка event loop синхронными и асинхронными запросами к БД")
+    parser.add_argument("--mode", action="append", choices=MODES, help="Режим (можно несколько), по умолчанию все")
+    parser.add_argument("-c", "--concurrency", type=int, default=20)
+    parser.add_argument("-n", "--operations", type=int, default=20, help="Операций на одного клиента")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=20, help="Размер страницы списка планов")
+    parser.add_argument("--sleep-ms", type=float, default=0.0, help="Доп. SELECT pg_sleep на операцию")
+    parser.add_argument("--interval-ms", type=float, default=5.0, help="Период пульса event loop")
+    parser.add_argument("--stall-threshold-ms", type=float, default=10.0, help="Опоздание пульса, считающееся остановкой")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(args))
+    print(f"{'режим':<8}{'опер/с':>9}{'p50 мс':>9}{'p99 мс':>9}{'лаг p99':>10}{'лаг max':>10}{'стоял, с':>10}{'доля':>7}")
+    for result in results:
+        print(
+            f"{result['mode']:<8}{result['ops_per_s']:>9}{result['op_latency_ms']['p50']:>9}{result['op_latency_ms']['p99']:>9}"
+            f"{result['loop_lag_ms']['p99']:>10}{result['loop_lag_ms']['max']:>10}{result['stalled_s']:>10}{result['stalled_share']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Бенчмарк разбора ответов анализа риска травмы.
+
+Сравнивает однопроходный parse_injury_risk_response с прежним разбором
+(цепочка регулярных выражений, построчный поиск и подсчет слов, отдельный
+проход для рекомендаций) на корпусе сохраненных ответов.
+
+Запуск из корня репозитория:
+    python -m scripts.bench_injury_parser                      # встроенные примеры
+    python -m scripts.bench_injury_parser --corpus responses/  # каталог *.txt
+    python -m scripts.bench_injury_parser --from-db 1000       # ai_risk_prediction из БД
+"""
+import argparse
+import re
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from app.services.injury_parser import parse_injury_risk_response
+
+SAMPLE_RESPONSES = [
+    """1. Уровень риска: Высокий
+Большой рабочий вес в становой тяге при травме поясницы в анамнезе.
+
+2. Основные факторы риска
+- Травма поясницы в анамнезе
+- Рабочий вес выше 1.5 веса тела
+- Нет разминки перед тяжелыми подходами
+
+3. Рекомендации по снижению риска
+- Разминка 10-15 минут с легким весом
+- Снизить рабочий вес на 20-30%
+- Использовать тяжелоатлетический пояс
+
+4. Альтернативные безопасные упражнения
+- Румынская тяга с гантелями, меньше нагрузка на поясницу
+- Гиперэкстензия, укрепляет разгибатели спины без осевой нагрузки
+""",
+    """### 1. **Уровень риска:** Средний
+Умеренная нагрузка, но есть ограничения по коленям.
+
+### 2. Основные факторы риска
+1. Боль в колене при глубоком приседе
+2. Высокий объем прыжков
+
+### 3. Рекомендации по снижению риска
+a) Приседать до параллели
+b) Заменить прыжки на велотренажер
+
+### 4. Альтернативные безопасные упражнения
+- Жим ногами в ограниченной амплитуде
+""",
+    """1. Risk level: low
+The plan is balanced.
+
+2. Risk factors
+- Minor lack of mobility work
+
+3. Recommendations
+- Add stretching after sessions
+""",
+    """Анализ показывает, что риск травмы скорее низкий: нагрузка умеренная,
+упражнения базовые. Тем не менее низкий уровень подготовки требует
+внимания к технике. Советы: следите за дыханием и не торопитесь.
+""",
+]
+
+
+# ---- Прежний разбор (без диагностического вывода, который стоил еще дороже) ----
+
+def legacy_risk_level(ai_response: str) -> str:
+    if not ai_response:
+        return "medium"
+    text_lower = ai_response.lower()
+    patterns = [
+        r'1\.\s*[уу]ровень\s+[рp]иска\s*[:\-]\s*(низкий|средний|высокий)',
+        r'#+\s*1\.\s*[уу]ровень\s+[рp]иска\s*[:\-]\s*(низкий|средний|высокий)',
+        r'[уу]ровень\s+[рp]иска\s*[:\-]\s*(низкий|средний|высокий)',
+        r'[рp]иск\s*[:\-]\s*(низкий|средний|высокий)',
+        r'\*\*[уу]ровень\s+[рp]иска:\*\*\s*(низкий|средний|высокий)',
+        r'(?:риск|опасность|уровень)\s+—\s*(низкий|средний|высокий)',
+        r'1\.\s*risk\s+level\s*[:\-]\s*(low|medium|high)',
+        r'risk\s+level\s*[:\-]\s*(low|medium|high)',
+    ]
+    for pattern in patterns:
+        for match in re.finditer(pattern, text_lower, re.IGNORECASE):
+            risk_word = match.group(1).lower()
+            if risk_word in ['низкий', 'low']:
+                return 'low'
+            elif risk_word in ['средний', 'medium']:
+                return 'medium'
+            elif risk_word in ['высокий', 'high']:
+                return 'high'
+    for line in text_lower.split('\n')[:10]:
+        line = line.strip()
+        if 'высокий' in line and any(word in line for word in ['риск', 'уровень', 'опасность']):
+            return 'high'
+        elif 'средний' in line and any(word in line for word in ['риск', 'уровень']):
+            return 'medium'
+        elif 'низкий' in line and any(word in line for word in ['риск', 'уровень']):
+            return 'low'
+    high_count = text_lower.count('высокий') + text_lower.count('high')
+    medium_count = text_lower.count('средний') + text_lower.count('medium')
+    low_count = text_lower.count('низкий') + text_lower.count('low')
+    if high_count > medium_count and high_count > low_count:
+        return 'high'
+    elif medium_count > high_count and medium_count > low_count:
+        return 'medium'
+    elif low_count > high_count and low_count > medium_count:
+        return 'low'
+    return 'medium'
+
+
+def legacy_recommendations(ai_response: str) -> Optional[str]:
+    if not ai_response:
+        return None
+    lines = ai_response.split('\n')
+    keywords = ['рекомендации:', 'советы:', 'советы по снижению риска:',
+                'рекомендации по снижению риска:', 'что делать:', 'как снизить риск:']
+    for i, line in enumerate(lines):
+        if any(keyword in line.lower().strip() for keyword in keywords):
+            result_lines = []
+            for next_line in lines[i + 1:i + 10]:
+                stripped = next_line.strip()
+                if stripped and not stripped.startswith(('#', '**', '###', '---', '==')):
+                    result_lines.append(stripped)
+                elif result_lines and stripped.startswith(('#', '**', '###')):
+                    break
+            return '\n'.join(result_lines) or None
+    return None
+
+
+def legacy_parse(text: str):
+    return legacy_risk_level(text), legacy_recommendations(text)
+
+
+# ---- Корпус и замеры ----
+
+def load_corpus(corpus_dir: Optional[str], from_db: Optional[int]) -> List[str]:
+    if corpus_dir:
+        return [path.read_text(encoding="utf-8") for path in sorted(Path(corpus_dir).glob("*.txt"))]
+    if from_db:
+        from app.database import SessionLocal
+        from app.compressed_text import as_text
+        from app.models.injury_prediction import InjuryPrediction
+        db = SessionLocal()
+        try:
+            rows = db.query(InjuryPrediction.ai_risk_prediction).order_by(InjuryPrediction.id.desc()).limit(from_db).all()
+            return [as_text(row[0]) for row in rows if row[0]]
+        finally:
+            db.close()
+    return SAMPLE_RESPONSES
+
+
+def measure(parse: Callable[[str], object], corpus: List[str], rounds: int) -> float:
+    """Среднее время разбора одного ответа, мкс"""
+    started_at = time.perf_counter()
+    for _ in range(rounds):
+        for text in corpus:
+            parse(text)
+    return (time.perf_counter() - started_at) / (rounds * len(corpus)) * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора ответов анализа риска травмы")
+    parser.add_argument("--corpus", help="Каталог с ответами ИИ (*.txt)")
+    parser.add_argument("--from-db", type=int, help="Взять N последних ответов из injury_predictions")
+    parser.add_argument("--rounds", type=int, help="Повторов корпуса (по умолчанию ~20000 разборов)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, args.from_db)
+    if not corpus:
+        raise SystemExit("Корпус пуст")
+    rounds = args.rounds or max(1, 20000 // len(corpus))
+
+    legacy_us = measure(legacy_parse, corpus, rounds)
+    parser_us = measure(parse_injury_risk_response, corpus, rounds)
+
+    reports = [parse_injury_risk_response(text) for text in corpus]
+    agreement = sum(1 for text, report in zip(corpus, reports) if legacy_risk_level(text) == report.level)
+    sections = Counter()
+    for report in reports:
+        sections["level_found"] += report.level_found
+        sections["factors"] += bool(report.factors)
+        sections["recommendations"] += bool(report.recommendations)
+        sections["alternatives"] += bool(report.alternatives)
+
+    print(f"Ответов в корпусе: {len(corpus)}, средняя длина: {sum(map(len, corpus)) // len(corpus)} символов")
+    print(f"Прежний разбор:     {legacy_us:8.1f} мкс/ответ")
+    print(f"Однопроходный:      {parser_us:8.1f} мкс/ответ (x{legacy_us / parser_us:.2f})")
+    print(f"Совпадение уровня риска с прежним разбором: {agreement}/{len(corpus)}")
+    print("Найдено разделов: " + ", ".join(f"{name} {count}/{len(corpus)}" for name, count in sections.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Замер ожидания соединения из пула БД, пока AI-маршруты ждут модель.
+
+Моделирует нагрузку: --ai одновременных "AI-запросов" читают из БД, ждут модель
+--ai-seconds секунд и делают итоговый запрос, а --fast клиентов в это время делают
+короткие запросы (как списки планов или /users/me). Два режима:
+    hold     - соединение держится все время ожидания модели (как было)
+    release  - перед ожиданием release_connection, итоговый запрос берет соединение заново
+Выводит ожидание свободного соединения (checkout) и задержку быстрых запросов
+по метрикам пула (app/pool_metrics.py) - те же цифры отдает GET /ai/db-pool.
+
+Нужен Postgres (DATABASE_URL). Запуск из корня репозитория:
+    python -m scripts.bench_pool_checkout                          # оба режима
+    python -m scripts.bench_pool_checkout --ai 20 --ai-seconds 10 --fast 10
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Dict, List
+
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+from sqlalchemy import text  # noqa: E402
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError  # noqa: E402
+
+from app.database import AsyncSessionLocal, async_engine, release_connection  # noqa: E402
+from app.pool_metrics import pool_metrics  # noqa: E402
+
+MODES = ("hold", "release")
+
+
+async def ai_request(mode: str, ai_seconds: float):
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SELECT 1"))
+        if mode == "release":
+            await release_connection(db)
+        await asyncio.sleep(ai_seconds)  # Ожидание ответа модели
+        await db.execute(text("SELECT 1"))
+        await db.commit()
+
+
+async def fast_request(latencies: List[float], errors: List[str]):
+    started_at = time.perf_counter()
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(text("SELECT 1"))
+        latencies.append(time.perf_counter() - started_at)
+    except PoolTimeoutError:
+        errors.append("pool_timeout")
+
+
+async def run_mode(mode: str, args) -> Dict[str, Any]:
+    metrics = pool_metrics["async"]
+    metrics.reset()
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    deadline = time.perf_counter() + args.ai_seconds
+
+    async def fast_client():
+        while time.perf_counter() < deadline:
+            await fast_request(latencies, errors)
+            await asyncio.sleep(args.fast_interval_ms / 1000)
+
+    ai_tasks = [asyncio.create_task(ai_request(mode, args.ai_seconds)) for _ in range(args.ai)]
+    await asyncio.sleep(0.1)  # AI-запросы успели занять соединения
+    await asyncio.gather(*(fast_client() for _ in range(args.fast)))
+    ai_results = await asyncio.gather(*ai_tasks, return_exceptions=True)
+
+    statistics = metrics.get_statistics()
+    ordered = sorted(latencies)
+    return {
+        "mode": mode,
+        "fast_requests": len(latencies),
+        "fast_p50_ms": round(ordered[len(ordered) // 2] * 1000, 1) if ordered else None,
+        "fast_max_ms": round(ordered[-1] * 1000, 1) if ordered else None,
+        "pool_timeouts": len(errors) + sum(isinstance(result, PoolTimeoutError) for result in ai_results),
+        "checkout_wait_ms": statistics["checkout_wait_ms"],
+        "max_in_use": statistics["max_in_use"],
+    }
+
+
+async def run_benchmark(args) -> List[Dict[str, Any]]:
+    try:
+        return [await run_mode(mode, args) for mode in args.mode or MODES]
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ожидание соединения из пула БД при долгих AI-запросах")
+    parser.add_argument("--mode", action="append", choices=MODES, help="Режим (можно несколько), по умолчанию оба")
+    parser.add_argument("--ai", type=int, default=20, help="Одновременных AI-запросов")
+    parser.add_argument("--ai-seconds", type=float, default=5.0, help="Ожидание модели, с")
+    parser.add_argument("--fast", type=int, default=10, help="Клиентов с короткими запросами")
+    parser.add_argument("--fast-interval-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    for result in asyncio.run(run_benchmark(args)):
+        print(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Проверка по EXPLAIN, что ключевые запросы используют индексы (миграция 0003_fk_and_list_indexes).
+
+Запросы списков берутся из настоящих CRUD-методов: вызов выполняется в транзакции,
+отправленный в БД SQL перехватывается и повторяется с EXPLAIN (FORMAT JSON). Проверки
+внешних ключей - запросы, которые Postgres делает при удалении пользователя или плана.
+В плане ищется Index Scan / Index Only Scan / Bitmap Index Scan по ожидаемому индексу.
+
+По умолчанию последовательный просмотр запрещен (SET LOCAL enable_seqscan = off): на маленькой
+базе планировщик честно выбирает seq scan, а проверка должна показать, что индекс есть
+и подходит запросу. --natural - планы без подсказок (на базе с реальными объемами).
+
+Нужен Postgres (DATABASE_URL) после alembic upgrade head. Запуск из корня репозитория:
+    python -m scripts.explain_indexes
+    python -m scripts.explain_indexes --natural --user-id 42 -v
+Код возврата 1, если хотя бы один запрос не использует ожидаемый индекс.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+from sqlalchemy import event, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.crud import (  # noqa: E402
+    crud_ai_interaction,
+    crud_anthropometrics,
+    crud_exercise_recommendation,
+    crud_injury_prediction,
+    crud_weekly_challenge,
+    crud_workout_history,
+    crud_workout_plan,
+)
+from app.database import SessionLocal, engine  # noqa: E402
+import app.models  # noqa: E402,F401  Регистрирует связи моделей
+
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+# Курсор "после самой новой строки" - страница 2+ со сравнением (время, id)
+FAR_CURSOR = (datetime(2100, 1, 1), 2 ** 31 - 1)
+
+
+def build_checks(user_id: int, plan_id: int) -> List[Tuple[str, Set[str], Callable[[Session], Any]]]:
+    """(название, допустимые индексы, вызов, отправляющий запрос в БД)"""
+    def sql(statement: str, **params):
+        return lambda db: db.execute(text(statement), params).all()
+
+    return [
+        ("планы: первая страница", {"ix_workout_plans_user_created_at_id"},
+         lambda db: crud_workout_plan.get_by_user_id(db, user_id, 0, 20)),
+        ("планы: страница по курсору", {"ix_workout_plans_user_created_at_id"},
+         lambda db: crud_workout_plan.get_by_user_id(db, user_id, 0, 20, after=FAR_CURSOR)),
+        ("рекомендации", {"ix_exercise_recommendations_user_created_at_id"},
+         lambda db: crud_exercise_recommendation.get_by_user_id(db, user_id, 0, 20, after=FAR_CURSOR)),
+        ("испытания", {"ix_weekly_challenges_user_created_at_id"},
+         lambda db: crud_weekly_challenge.get_by_user_id(db, user_id, 0, 20, after=FAR_CURSOR)),
+        ("испытание недели", {"ix_weekly_challenges_user_id_week_number", "ix_weekly_challenges_user_created_at_id"},
+         lambda db: crud_weekly_challenge.get_current_week(db, user_id, 1, datetime(2000, 1, 1))),
+        ("история тренировок", {"ix_workout_history_user_completed_at_id"},
+         lambda db: crud_workout_history.get_by_user_id(db, user_id, 0, 20, after=FAR_CURSOR)),
+        ("анализы риска травм", {"ix_injury_predictions_user_created_at_id"},
+         lambda db: crud_injury_prediction.get_by_user_id(db, user_id, 0, 20, after=FAR_CURSOR)),
+        ("журнал AI-запросов", {"ix_ai_interactions_user_created_at_id"},
+         lambda db: crud_ai_interaction.get_by_user_id(db, user_id, 0, 20, after=FAR_CURSOR)),
+        ("антропометрия", {"ix_user_anthropometrics_user_id"},
+         lambda db: crud_anthropometrics.get_by_user_id(db, user_id)),
+        ("FK: история -> план", {"ix_workout_history_plan_id"},
+         sql("SELECT 1 FROM workout_history WHERE plan_id = :plan_id", plan_id=plan_id)),
+        ("FK: анализ риска -> план", {"ix_injury_predictions_workout_plan_id"},
+         sql("SELECT 1 FROM injury_predictions WHERE workout_plan_id = :plan_id", plan_id=plan_id)),
+        ("FK: задачи -> пользователь", {"ix_ai_jobs_user_id"},
+         sql("SELECT 1 FROM ai_jobs WHERE user_id = :user_id", user_id=user_id)),
+    ]
+
+
+def capture_statements(db: Session, call: Callable[[Session], Any]) -> List[Tuple[str, Any]]:
+    """SQL и параметры, которые call отправил в БД"""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        call(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def plan_indexes(node: Dict[str, Any], found: Set[str]) -> Set[str]:
+    """Индексы, по которым план читает данные"""
+    if node.get("Node Type") in INDEX_NODES:
+        found.add(node.get("Index Name"))
+    for child in node.get("Plans", []):
+        plan_indexes(child, found)
+    return found
+
+
+def explain(db: Session, statement: str, parameters: Any) -> Dict[str, Any]:
+    result = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+    plan = result if isinstance(result, list) else json.loads(result)
+    return plan[0]["Plan"]
+
+
+def run_checks(args) -> List[Dict[str, Any]]:
+    results = []
+    db = SessionLocal()
+    try:
+        for name, expected, call in build_checks(args.user_id, args.plan_id):
+            if not args.natural:
+                db.execute(text("SET LOCAL enable_seqscan = off"))
+            used: Set[str] = set()
+            plans = []
+            for statement, parameters in capture_statements(db, call):
+                plan = explain(db, statement, parameters)
+                plans.append(plan)
+                plan_indexes(plan, used)
+            db.rollback()
+            results.append({
+                "name": name,
+                "expected": sorted(expected),
+                "used": sorted(used),
+                "ok": bool(used & expected),
+                "plans": plans,
+            })
+    finally:
+        db.close()
+        engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Проверка по EXPLAIN, что ключевые запросы используют индексы")
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--plan-id", type=int, default=1)
+    parser.add_argument("--natural", action="store_true", help="Не запрещать seq scan (планы на реальных объемах)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Печатать планы")
+    args = parser.parse_args()
+
+    results = run_checks(args)
+    for result in results:
+        status = "ok  " if result["ok"] else "FAIL"
+        used = ", ".join(result["used"]) or "seq scan"
+        print(f"{status} {result['name']:<30} {used}")
+        if args.verbose or not result["ok"]:
+            for plan in result["plans"]:
+                print(json.dumps(plan, ensure_ascii=False, indent=2))
+    failed = [result["name"] for result in results if not result["ok"]]
+    if failed:
+        print(f"Без ожидаемого индекса: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
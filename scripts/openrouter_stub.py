@@ -0,0 +1,256 @@
+"""
+Локальный сервер, совместимый с OpenRouter chat/completions, для нагрузочных
+замеров AIService без обращения к настоящему API.
+
+Для каждой модели задается профиль: распределение задержки (логнормальное по
+медиане и p95), доли ответов 429 и 5xx, доля "зависших" запросов (соединение
+держится timeout_seconds и закрывается без ответа), размер ответа в токенах
+и скорость потоковой отдачи. Ответы содержат usage, поток - события SSE
+с usage в последнем фрагменте, как у OpenRouter.
+
+Запуск из корня репозитория:
+    python -m scripts.openrouter_stub --port 8089
+    python -m scripts.openrouter_stub --port 8089 --profiles profiles.json
+
+profiles.json: {"*": {"latency_ms": 800}, "deepseek/deepseek-chat-v3.1": {"rate_5xx": 0.3}}
+Приложение направляется на заглушку через OPENROUTER_BASE_URL=http://127.0.0.1:8089/api/v1/chat/completions
+
+Служебные адреса: GET /_stub/stats - счетчики по моделям, PUT /_stub/profiles - изменить профили на лету.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, NamedTuple, Optional
+
+DEFAULT_MODEL = "*"
+_Z95 = 1.645  # Квантиль нормального распределения для p95
+
+
+class ModelProfile(NamedTuple):
+    """Поведение одной модели в заглушке"""
+    latency_ms: float = 800.0  # Медиана задержки до ответа (до первого фрагмента в потоке)
+    latency_p95_ms: float = 2000.0
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 60.0
+    completion_tokens: int = 400
+    tokens_per_chunk: int = 8
+    chunk_delay_ms: float = 20.0
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """Задержка в секундах из логнормального распределения с заданными медианой и p95"""
+        median = max(self.latency_ms, 0.0) / 1000
+        if median == 0:
+            return 0.0
+        sigma = math.log(max(self.latency_p95_ms / self.latency_ms, 1.0)) / _Z95
+        return median * math.exp(rng.gauss(0.0, sigma))
+
+
+class OpenRouterStub:
+    """Сервер-заглушка в отдельном потоке: start() возвращает адрес chat/completions"""
+
+    def __init__(self, profiles: Optional[Dict[str, Dict[str, Any]]] = None, seed: Optional[int] = None):
+        self.profiles: Dict[str, ModelProfile] = {DEFAULT_MODEL: ModelProfile()}
+        self.update_profiles(profiles or {})
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self.stats: Dict[str, Counter] = defaultdict(Counter)
+
+    def update_profiles(self, profiles: Dict[str, Dict[str, Any]]):
+        """Меняет поля профилей; новые модели наследуют профиль "*" """
+        for model, fields in profiles.items():
+            base = self.profiles.get(model, self.profiles[DEFAULT_MODEL])
+            self.profiles[model] = base._replace(**fields)
+
+    def profile_for(self, model: str) -> ModelProfile:
+        return self.profiles.get(model, self.profiles[DEFAULT_MODEL])
+
+    def decide(self, model: str) -> str:
+        """Исход запроса: ok, 429, 5xx или timeout"""
+        profile = self.profile_for(model)
+        with self._lock:
+            roll = self._rng.random()
+        for outcome, rate in (("429", profile.rate_429), ("5xx", profile.rate_5xx), ("timeout", profile.timeout_rate)):
+            if roll < rate:
+                return outcome
+            roll -= rate
+        return "ok"
+
+    def latency(self, model: str) -> float:
+        with self._lock:
+            return self.profile_for(model).sample_latency(self._rng)
+
+    def count(self, model: str, outcome: str):
+        with self._lock:
+            self.stats[model][outcome] += 1
+
+    def get_statistics(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {model: dict(counter) for model, counter in self.stats.items()}
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        handler = type("StubHandler", (_StubHandler,), {"stub": self})
+        self._server = ThreadingHTTPServer((host, port), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_port}/api/v1/chat/completions"
+
+    def serve_forever(self, host: str, port: int):
+        self.start(host, port)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _completion_text(model: str, tokens: int) -> str:
+    # Примерно 4 символа на токен, как в оценке стоимости приложения
+    words = max(1, tokens * 4 // 8)
+    return f"Ответ заглушки ({model}). " + " ".join("упражнение" if i % 2 else "подход" for i in range(words))
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    stub: OpenRouterStub
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент не дождался ответа (отмененная попытка или истекший срок)
+            pass
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path.startswith("/_stub/stats"):
+            self._send_json(200, {"models": self.stub.get_statistics()})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_PUT(self):
+        if self.path.startswith("/_stub/profiles"):
+            self.stub.update_profiles(self._read_json())
+            self._send_json(200, {model: profile._asdict() for model, profile in self.stub.profiles.items()})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        body = self._read_json()
+        model = body.get("model", "")
+        profile = self.stub.profile_for(model)
+        outcome = self.stub.decide(model)
+        self.stub.count(model, outcome)
+
+        if outcome == "timeout":
+            # Держим соединение без ответа, клиент должен отвалиться по своему таймауту
+            time.sleep(profile.timeout_seconds)
+            self.close_connection = True
+            return
+
+        time.sleep(self.stub.latency(model))
+        if outcome == "429":
+            self._send_json(429, {"error": {"code": 429, "message": "Rate limit exceeded (stub)"}}, {"Retry-After": "1"})
+            return
+        if outcome == "5xx":
+            self._send_json(502, {"error": {"code": 502, "message": "Upstream error (stub)"}})
+            return
+
+        prompt_chars = sum(len(message.get("content") or "") for message in body.get("messages", []))
+        completion_tokens = min(profile.completion_tokens, int(body.get("max_tokens") or profile.completion_tokens))
+        usage = {
+            "prompt_tokens": max(1, prompt_chars // 4),
+            "completion_tokens": completion_tokens,
+            "total_tokens": max(1, prompt_chars // 4) + completion_tokens,
+        }
+        text = _completion_text(model, completion_tokens)
+
+        if body.get("stream"):
+            self._stream(model, text, usage, profile)
+            return
+        self._send_json(200, {
+            "id": f"stub-{time.monotonic_ns()}",
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    def _stream(self, model: str, text: str, usage: Dict[str, int], profile: ModelProfile):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(payload: Dict[str, Any]):
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode())
+            self.wfile.flush()
+
+        try:
+            self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+            words = text.split(" ")
+            words_per_chunk = max(1, profile.tokens_per_chunk // 2)
+            for start in range(0, len(words), words_per_chunk):
+                piece = " ".join(words[start:start + words_per_chunk]) + " "
+                event({"model": model, "choices": [{"index": 0, "delta": {"content": piece}}]})
+                time.sleep(profile.chunk_delay_ms / 1000)
+            event({"model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент отключился посреди потока (отмена хеджированной попытки)
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка OpenRouter chat/completions с задержками и ошибками")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--profiles", help="JSON-файл с профилями моделей")
+    parser.add_argument("--seed", type=int, help="Зерно генератора случайных исходов")
+    args = parser.parse_args()
+
+    profiles = {}
+    if args.profiles:
+        with open(args.profiles, encoding="utf-8") as profiles_file:
+            profiles = json.load(profiles_file)
+    stub = OpenRouterStub(profiles, seed=args.seed)
+    print(f"Заглушка OpenRouter: http://{args.host}:{args.port}/api/v1/chat/completions")
+    stub.serve_forever(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
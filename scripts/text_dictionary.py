@@ -0,0 +1,284 @@
+"""
+Словари сжатия AI-текстов: обучение, перевод колонок на bytea со сжатием и отчет.
+
+Колонки со сжатием - все колонки моделей с типом CompressedText
+(ai_generated_plan, ai_recommended_exercises, ai_generated_challenge, ai_risk_prediction).
+
+Порядок включения сжатия на существующей БД:
+    python -m scripts.text_dictionary migrate                 # text -> bytea, сжатие строк без словаря
+    python -m scripts.text_dictionary train                   # словари по последним ответам
+    python -m scripts.text_dictionary migrate --recompress    # пересжатие строк активными словарями
+    AI_TEXT_COMPRESSION_ENABLED=true                          # и перезапуск приложения
+
+Смена колонки на bytea переписывает таблицу под эксклюзивной блокировкой, поэтому
+migrate запускается при остановленном приложении; сжатие строк идет пачками по id
+с коммитом каждой пачки, прерванный проход можно просто повторить.
+Новая версия словаря (train) не мешает старым строкам: в каждом значении записана
+версия, которой оно сжато.
+
+Отчет по БД (размер таблиц, степень сжатия и стоимость чтения/записи на выборке):
+    python -m scripts.text_dictionary report
+Отчет без БД на синтетических ответах офлайн-генератора:
+    python -m scripts.text_dictionary report --synthetic 2000
+"""
+import argparse
+import random
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import LargeBinary, bindparam, func, select, text, type_coerce, update
+
+from app.compressed_text import MARKER_DICT_ZSTD, MARKER_PLAIN_ZSTD, compressed_columns, text_codec, value_version, zstandard
+from app.config import settings
+from app.crud import crud_text_dictionary
+from app.database import Base, SessionLocal, engine
+import app.models  # noqa: F401  Регистрирует все таблицы в Base.metadata
+
+HOLDOUT_FRACTION = 0.1
+
+
+def column_values(db, table, column, limit: Optional[int] = None, newest: bool = True) -> List[bytes]:
+    """Сырые значения колонки (bytea или text) - без распаковки типом колонки"""
+    query = select(type_coerce(column, LargeBinary)).where(column.isnot(None))
+    query = query.order_by(table.c.id.desc() if newest else table.c.id)
+    if limit:
+        query = query.limit(limit)
+    return [value if isinstance(value, bytes) else str(value).encode("utf-8") for value in db.execute(query).scalars()]
+
+
+def measure(column_key: str, texts: Sequence[str], version: Optional[int]) -> Dict[str, float]:
+    """Степень сжатия и время записи/чтения одного значения на выборке"""
+    raw_bytes = stored_bytes = 0
+    compress_seconds = decompress_seconds = 0.0
+    for value in texts:
+        started_at = time.perf_counter()
+        data = text_codec.compress(column_key, value, version=version or 0)
+        compress_seconds += time.perf_counter() - started_at
+        started_at = time.perf_counter()
+        text_codec.decompress(data)
+        decompress_seconds += time.perf_counter() - started_at
+        raw_bytes += len(value.encode("utf-8"))
+        stored_bytes += len(data)
+    count = max(len(texts), 1)
+    return {
+        "ratio": raw_bytes / stored_bytes if stored_bytes else 0.0,
+        "avg_raw": raw_bytes / count,
+        "avg_stored": stored_bytes / count,
+        "compress_us": compress_seconds / count * 1e6,
+        "decompress_us": decompress_seconds / count * 1e6,
+    }
+
+
+def train_dictionary(texts: List[str], dict_size: int) -> Tuple[bytes, List[str], List[str]]:
+    """Обучает словарь на части выборки; возвращает словарь, обучающую и отложенную выборки"""
+    texts = list(texts)
+    random.Random(1).shuffle(texts)
+    holdout_size = max(1, int(len(texts) * HOLDOUT_FRACTION))
+    holdout, training = texts[:holdout_size], texts[holdout_size:]
+    dictionary = zstandard.train_dictionary(
+        dict_size, [value.encode("utf-8") for value in training], level=settings.AI_TEXT_COMPRESSION_LEVEL
+    )
+    return dictionary.as_bytes(), training, holdout
+
+
+def print_measurement(title: str, result: Dict[str, float]):
+    print(
+        f"  {title:<14} x{result['ratio']:5.2f}  {result['avg_raw']:8.0f} -> {result['avg_stored']:7.0f} байт,"
+        f" запись {result['compress_us']:7.1f} мкс, чтение {result['decompress_us']:6.1f} мкс"
+    )
+
+
+def cmd_train(args):
+    columns = selected_columns(args.column)
+    db = SessionLocal()
+    try:
+        text_codec.reload()
+        for column_key, (table, column) in columns.items():
+            texts = [text_codec.decompress(value) for value in column_values(db, table, column, args.samples)]
+            texts = [value for value in texts if len(value.encode("utf-8")) >= settings.AI_TEXT_COMPRESSION_MIN_BYTES]
+            if len(texts) < args.min_samples:
+                print(f"{column_key}: мало образцов ({len(texts)} < {args.min_samples}), словарь не обучен")
+                continue
+            dictionary, training, holdout = train_dictionary(texts, args.dict_size)
+            previous = text_codec.active_version(column_key)
+            row = crud_text_dictionary.create(db, {
+                "column_key": column_key,
+                "dictionary": dictionary,
+                "sample_count": len(training),
+                "sample_bytes": sum(len(value.encode("utf-8")) for value in training),
+            })
+            text_codec.register(row.id, column_key, dictionary)
+            result = measure(column_key, holdout, row.id)
+            row.ratio = round(result["ratio"], 3)
+            db.commit()
+            print(f"{column_key}: словарь версии {row.id} ({len(dictionary)} байт, {len(training)} образцов)")
+            print_measurement("без словаря", measure(column_key, holdout, None))
+            if previous:
+                print_measurement(f"версия {previous}", measure(column_key, holdout, previous))
+            print_measurement(f"версия {row.id}", result)
+    finally:
+        db.close()
+
+
+def cmd_migrate(args):
+    columns = selected_columns(args.column)
+    text_codec.reload()
+    for column_key, (table, column) in columns.items():
+        with engine.begin() as connection:
+            data_type = connection.execute(
+                text("SELECT data_type FROM information_schema.columns WHERE table_name = :table AND column_name = :column"),
+                {"table": table.name, "column": column.name}
+            ).scalar()
+            if data_type == "text":
+                print(f"{table.name}.{column.name}: text -> bytea")
+                connection.execute(text(
+                    f'ALTER TABLE {table.name} ALTER COLUMN "{column.name}" TYPE bytea USING convert_to("{column.name}", \'UTF8\')'
+                ))
+        backfill(table, column, column_key, args.batch_size, args.recompress)
+    if not settings.AI_TEXT_COMPRESSION_ENABLED:
+        print("Колонки переведены на bytea - включите AI_TEXT_COMPRESSION_ENABLED=true и перезапустите приложение")
+
+
+def backfill(table, column, column_key: str, batch_size: int, recompress: bool):
+    """Сжимает строки пачками по id: несжатые, а с recompress - и сжатые не активной версией словаря"""
+    active = text_codec.active_version(column_key)
+    statement = update(table).where(table.c.id == bindparam("row_id")).values(
+        {column.name: bindparam("value", type_=LargeBinary)}
+    )
+    after_id, updated, scanned = 0, 0, 0
+    raw_bytes = stored_bytes = 0
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(
+                select(table.c.id, type_coerce(column, LargeBinary))
+                .where(table.c.id > after_id, column.isnot(None))
+                .order_by(table.c.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            changes = []
+            for row_id, value in rows:
+                value = bytes(value)
+                version = value_version(value)
+                compressed = value[:1] in (MARKER_PLAIN_ZSTD, MARKER_DICT_ZSTD)
+                if compressed and (not recompress or version == active):
+                    continue
+                source = text_codec.decompress(value)
+                new_value = text_codec.compress(column_key, source)
+                if new_value != value:
+                    changes.append({"row_id": row_id, "value": new_value})
+                    raw_bytes += len(value)
+                    stored_bytes += len(new_value)
+            if changes:
+                connection.execute(statement, changes)
+            scanned += len(rows)
+            updated += len(changes)
+            after_id = rows[-1][0]
+        print(f"\r{table.name}.{column.name}: просмотрено {scanned}, сжато {updated}", end="", flush=True)
+    saved = f", {raw_bytes} -> {stored_bytes} байт" if updated else ""
+    print(f"\r{table.name}.{column.name}: просмотрено {scanned}, сжато {updated}{saved}")
+
+
+def cmd_report(args):
+    if args.synthetic:
+        report_synthetic(args.synthetic, args.dict_size)
+        return
+    columns = selected_columns(args.column)
+    db = SessionLocal()
+    try:
+        text_codec.reload()
+        for column_key, (table, column) in columns.items():
+            total_rows = db.execute(select(func.count()).select_from(table)).scalar()
+            stored_total = db.execute(select(func.coalesce(func.sum(func.octet_length(column)), 0))).scalar()
+            table_size = db.execute(text("SELECT pg_total_relation_size(:table)"), {"table": table.name}).scalar()
+            values = column_values(db, table, column, args.samples)
+            texts = [text_codec.decompress(value) for value in values]
+            raw_sample = sum(len(value.encode("utf-8")) for value in texts)
+            stored_sample = sum(len(value) for value in values)
+            print(
+                f"{column_key} ({table.name}): строк {total_rows}, в колонке {stored_total / 1024 / 1024:.1f} МБ,"
+                f" таблица с индексами и TOAST {table_size / 1024 / 1024:.1f} МБ"
+            )
+            if not texts:
+                continue
+            ratio = raw_sample / stored_sample if stored_sample else 0.0
+            print(f"  хранится сейчас: x{ratio:.2f} (оценка несжатого объема {stored_total * ratio / 1024 / 1024:.1f} МБ)")
+            print_measurement("без словаря", measure(column_key, texts, None))
+            active = text_codec.active_version(column_key)
+            if active:
+                print_measurement(f"версия {active}", measure(column_key, texts, active))
+    finally:
+        db.close()
+
+
+def report_synthetic(count: int, dict_size: int):
+    """Отчет на ответах офлайн-генератора (повторяющаяся структура, как у ответов моделей)"""
+    from app.services.offline_engine import offline_engine
+
+    rng = random.Random(1)
+    requests = ["болит колено", "хочу похудеть", "грыжа поясницы", "набрать массу", "после родов", "бег по утрам", "турник и гантели"]
+    corpora = {
+        "ai_generated_plan": [
+            offline_engine.workout_plan(
+                f"{rng.choice(requests)} {index}", rng.choice(["strength", "cardio", "flexibility", "mixed"]),
+                rng.choice(["beginner", "intermediate", "advanced"]), rng.choice([30, 45, 60, 90])
+            )
+            for index in range(count)
+        ],
+        "ai_recommended_exercises": [
+            offline_engine.exercise_recommendations(f"{rng.choice(requests)} и {rng.choice(requests)} {index}")
+            for index in range(count)
+        ],
+        "ai_generated_challenge": [
+            offline_engine.weekly_challenge(rng.choice(["strength", "cardio", "endurance"]), {"reps": rng.randint(50, 500)})
+            for _ in range(count)
+        ],
+    }
+    for version, (column_key, texts) in enumerate(corpora.items(), 1):
+        dictionary, _, holdout = train_dictionary(texts, dict_size)
+        text_codec.register(version, column_key, dictionary)
+        print(f"{column_key}: {count} синтетических ответов, словарь {len(dictionary)} байт")
+        print_measurement("без словаря", measure(column_key, holdout, None))
+        print_measurement("со словарем", measure(column_key, holdout, version))
+
+
+def selected_columns(column_key: Optional[str]):
+    columns = compressed_columns(Base.metadata)
+    if column_key:
+        if column_key not in columns:
+            raise SystemExit(f"Неизвестная колонка: {column_key}. Доступны: {', '.join(columns)}")
+        columns = {column_key: columns[column_key]}
+    return columns
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Словари сжатия AI-текстов: обучение, миграция колонок, отчет")
+    parser.add_argument("--column", help="Только одна колонка (например ai_generated_plan)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train = commands.add_parser("train", help="Обучить новую версию словаря по последним ответам")
+    train.add_argument("--samples", type=int, default=settings.AI_TEXT_DICT_SAMPLES)
+    train.add_argument("--min-samples", type=int, default=100)
+    train.add_argument("--dict-size", type=int, default=settings.AI_TEXT_DICT_SIZE)
+    train.set_defaults(handler=cmd_train)
+
+    migrate = commands.add_parser("migrate", help="Перевести колонки на bytea и сжать существующие строки")
+    migrate.add_argument("--batch-size", type=int, default=500)
+    migrate.add_argument("--recompress", action="store_true", help="Пересжать строки, сжатые не активной версией словаря")
+    migrate.set_defaults(handler=cmd_migrate)
+
+    report = commands.add_parser("report", help="Размер колонок, степень сжатия и стоимость записи/чтения")
+    report.add_argument("--samples", type=int, default=500)
+    report.add_argument("--synthetic", type=int, help="Без БД: N ответов офлайн-генератора на колонку")
+    report.add_argument("--dict-size", type=int, default=settings.AI_TEXT_DICT_SIZE)
+    report.set_defaults(handler=cmd_report)
+
+    args = parser.parse_args()
+    if zstandard is None:
+        raise SystemExit("Нужен пакет zstandard: pip install zstandard")
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()